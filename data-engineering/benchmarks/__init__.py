@@ -0,0 +1,6 @@
+"""Extraction benchmarks: deterministic synthetic PDF corpora and per-stage timings.
+
+Run from data-engineering/:
+
+    python -m benchmarks.run --sizes 10,50,200 --out bench.json
+"""
@@ -0,0 +1,87 @@
+"""Deterministic synthetic PDF corpora for the extraction benchmarks.
+
+Every generator is seeded, so the same (kind, pages, seed) always produces
+the same page content and the same timings are comparable run-to-run.
+"""
+
+import random
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import fitz
+
+CORPUS_KINDS = ("single", "two_column", "scanned", "mixed")
+
+_WORDS = ("county", "ordinance", "shall", "permit", "zoning", "district", "board", "section",
+          "provided", "that", "the", "of", "any", "such", "use", "or", "building", "lot", "area")
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def _single_column(page: fitz.Page, rng: random.Random, p: int):
+    page.insert_text((72, 54), f"CHAPTER {p // 10 + 1}. GENERAL PROVISIONS", fontsize=10)
+    y = 84
+    for s in range(44):
+        if s % 9 == 0:
+            line = f"Sec. {p + 1}-{s // 9 + 1}. {_sentence(rng, 4)}"
+        elif s % 9 == 4:
+            line = f"({'abcdefgh'[s // 9 % 8]}) {_sentence(rng, 9)}"
+        else:
+            line = _sentence(rng, 11)
+        page.insert_text((72, y), line[:95], fontsize=10)
+        y += 15
+
+
+def _two_column(page: fitz.Page, rng: random.Random, p: int):
+    page.insert_text((230, 40), f"CODE OF ORDINANCES {p + 1}", fontsize=9)
+    for col_x in (54, 324):
+        y = 72
+        for s in range(46):
+            line = f"Sec. {p + 1}-{s}." if s % 12 == 0 else _sentence(rng, 5)
+            page.insert_text((col_x, y), line[:48], fontsize=9)
+            y += 14
+
+
+def _scanned(page: fitz.Page, rng: random.Random, p: int):
+    # Lay the text out on a scratch page and paste it back as a gray image, like a scanner would.
+    scratch = fitz.open()
+    src = scratch.new_page(width=page.rect.width, height=page.rect.height)
+    _single_column(src, rng, p)
+    pix = src.get_pixmap(dpi=150, colorspace=fitz.csGRAY)
+    scratch.close()
+    page.insert_image(page.rect, pixmap=pix)
+
+
+_PAGE_MAKERS: Dict[str, Callable] = {
+    "single": _single_column,
+    "two_column": _two_column,
+    "scanned": _scanned,
+}
+
+
+def make_corpus(path: Path, kind: str, pages: int, seed: int = 0) -> Path:
+    """Write a synthetic PDF of the given kind and page count to path.
+
+    Kinds: 'single' (one text column with section headings and enumerated
+    paragraphs), 'two_column' (legal two-column layout with a running
+    header), 'scanned' (image-only pages, no text layer) and 'mixed'
+    (cycles single, two_column, single, scanned, plus a blank separator
+    every 25 pages).
+    """
+    if kind not in CORPUS_KINDS:
+        raise ValueError(f"Unknown corpus kind: {kind} (expected one of {CORPUS_KINDS})")
+    rng = random.Random(f"{kind}:{seed}")
+    cycle: List[str] = ["single", "two_column", "single", "scanned"]
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page(width=612, height=792)
+        if kind != "mixed":
+            _PAGE_MAKERS[kind](page, rng, p)
+        elif p % 25 != 24:
+            _PAGE_MAKERS[cycle[p % len(cycle)]](page, rng, p)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(path), garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return path
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare parquet layouts for page records: pyarrow defaults vs main.parquet_write_options.
+
+Builds one partition's worth of page records (--docs documents of --pages
+pages of the mixed synthetic corpus, spread over a few counties) and writes it
+
+  default : pq.write_table with pyarrow defaults (snappy, every column
+            dictionary-encoded, one row group), in extraction order
+  tuned   : main._write_table_any, as compaction writes it — sorted by
+            (doc_id, page), ROW_GROUP_PAGES-row row groups, zstd, dictionaries
+            only on low-cardinality columns, statistics and page index
+
+and reports file size, full-scan time and a doc_id point lookup (time and
+row groups whose doc_id statistics could match) as JSON.
+
+Args:
+  --docs : documents in the partition (default 40)
+  --pages : pages per document (default 50)
+  --repeat : runs per timing, best kept (default 5)
+  --seed : corpus seed (default 0)
+  --out : also write the JSON report here
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import main
+from benchmarks.corpus import make_corpus
+from benchmarks.run import _best_of, _layout_texts
+
+COUNTIES = ("Fulton", "DeKalb", "Cobb", "Gwinnett")
+
+
+def build_records(texts: List[str], docs: int) -> pa.Table:
+    """docs documents of len(texts) pages each, in extraction (not sorted) order."""
+    ts = main.now_iso()
+    rows = []
+    for d in range(docs):
+        name = f"county-code-{d:04d}.pdf"
+        doc_id = hashlib.sha1(f"/in/{name}".encode("utf-8")).hexdigest()[:20]
+        for p, text in enumerate(texts[d % len(texts):] + texts[:d % len(texts)]):
+            text = f"{text}\nOrdinance {d}-{p} of {COUNTIES[d % len(COUNTIES)]} County."  # no two pages alike
+            rows.append({
+                "doc_id": doc_id, "source_name": name, "page": p + 1, "text": text, "is_ocr": False,
+                "char_len": len(text), "sha256": main.sha256_text(f"{name}|{p + 1}|{text}"),
+                "extracted_at": ts, "env": "prod", "zone": "text", "state": "GA",
+                "county": COUNTIES[d % len(COUNTIES)],
+            })
+    return pa.Table.from_pylist(rows, schema=main.RECORD_SCHEMA)
+
+
+def _row_groups_matching(path: Path, doc_id: str) -> int:
+    """Row groups a reader must open for doc_id == x, judging by their doc_id min/max statistics."""
+    meta = pq.ParquetFile(path).metadata
+    col = meta.schema.to_arrow_schema().get_field_index("doc_id")
+    hits = 0
+    for rg in range(meta.num_row_groups):
+        stats = meta.row_group(rg).column(col).statistics
+        if stats is None or not stats.has_min_max or stats.min <= doc_id <= stats.max:
+            hits += 1
+    return hits
+
+
+def measure_layout(path: Path, doc_id: str, repeat: int) -> Dict:
+    meta = pq.ParquetFile(path).metadata
+    return {
+        "bytes": path.stat().st_size,
+        "row_groups": meta.num_row_groups,
+        "scan_s": round(_best_of(lambda: pq.read_table(path, partitioning=None), repeat), 6),
+        "lookup_s": round(_best_of(lambda: pq.read_table(path, partitioning=None,
+                                                          filters=[("doc_id", "=", doc_id)]), repeat), 6),
+        "lookup_row_groups": _row_groups_matching(path, doc_id),
+    }
+
+
+def run_layout_benchmark(docs: int, pages: int, work_dir: Path, repeat: int = 5, seed: int = 0) -> Dict:
+    """Write both layouts under work_dir and measure them.
+
+    Returns:
+        {"meta": {...}, "default": {...}, "tuned": {...}, "size_ratio", "scan_speedup", "lookup_speedup"}.
+    """
+    pdf = work_dir / f"mixed-{pages}-s{seed}.pdf"
+    if not pdf.exists():
+        make_corpus(pdf, "mixed", pages, seed)
+    table = build_records(_layout_texts(pdf), docs)
+    target = table.column("doc_id")[table.num_rows // 2].as_py()
+
+    default_path = work_dir / "default.parquet"
+    pq.write_table(table, default_path)
+    tuned_path = work_dir / "tuned.parquet"
+    main._write_table_any(table.sort_by([("doc_id", "ascending"), ("page", "ascending")]), str(tuned_path),
+                          sort_by=("doc_id", "page"))
+
+    default = measure_layout(default_path, target, repeat)
+    tuned = measure_layout(tuned_path, target, repeat)
+    return {
+        "meta": {"docs": docs, "pages": pages, "rows": table.num_rows, "seed": seed, "repeat": repeat,
+                 "pyarrow": pa.__version__, "options": {k: v for k, v in main.parquet_write_options(
+                     main.RECORD_SCHEMA).items() if k != "write_statistics"},
+                 "row_group_rows": main.ROW_GROUP_PAGES},
+        "default": default,
+        "tuned": tuned,
+        "size_ratio": round(tuned["bytes"] / default["bytes"], 3),
+        "scan_speedup": round(default["scan_s"] / max(tuned["scan_s"], 1e-9), 2),
+        "lookup_speedup": round(default["lookup_s"] / max(tuned["lookup_s"], 1e-9), 2),
+    }
+
+
+def main_cli(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Compare default and tuned parquet layouts for page records")
+    ap.add_argument("--docs", type=int, default=40, help="Documents in the partition")
+    ap.add_argument("--pages", type=int, default=50, help="Pages per document")
+    ap.add_argument("--repeat", type=int, default=5, help="Runs per timing (best time kept)")
+    ap.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    ap.add_argument("--out", default=None, help="Write the JSON report to this file as well as stdout")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench-layout-") as tmp:
+        report = run_layout_benchmark(args.docs, args.pages, Path(tmp), args.repeat, args.seed)
+
+    d, t = report["default"], report["tuned"]
+    print(f"[info] default: {d['bytes'] / 1e6:.2f} MB, scan {d['scan_s'] * 1e3:.1f} ms, "
+          f"lookup {d['lookup_s'] * 1e3:.1f} ms ({d['lookup_row_groups']}/{d['row_groups']} row groups)",
+          file=sys.stderr)
+    print(f"[info] tuned:   {t['bytes'] / 1e6:.2f} MB, scan {t['scan_s'] * 1e3:.1f} ms, "
+          f"lookup {t['lookup_s'] * 1e3:.1f} ms ({t['lookup_row_groups']}/{t['row_groups']} row groups)",
+          file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+        print(f"[ok] wrote {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Time the extractor's hot stages on synthetic corpora and emit JSON.
+
+Stages (functions from main.py):
+  page_text_layout          : every page of the single / two_column / scanned / mixed corpora
+  page_text_layout_fast     : the same pages through the word-tuple path (LAYOUT_MODE=fast)
+  ocr_page_to_text          : the scanned corpus, first --ocr-pages pages (skipped if Tesseract is unavailable)
+  remove_orphan_enumerators : the layout text of the mixed corpus
+  write_parquet             : page records of the mixed corpus, written to a local temp file
+
+Each (stage, corpus, size) is measured in a fresh spawned process, so
+peak_rss_mb is that measurement's own high-water mark rather than the
+whole run's. seconds is the best of --repeat runs.
+
+Args:
+  --sizes : comma-separated page counts (default 10,50,200)
+  --stages : comma-separated subset of the stages above (default all)
+  --repeat : runs per measurement, best time kept (default 3)
+  --ocr-pages : cap on pages OCR'd per measurement (default 20)
+  --seed : corpus seed (default 0)
+  --corpus-dir : where generated PDFs are cached (default: a temp dir)
+  --out : also write the JSON report here
+  --compare : previous JSON report; rows whose pages/sec dropped by more than --tolerance are flagged
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fitz
+import numpy as np
+import pyarrow as pa
+
+import main
+from benchmarks.corpus import CORPUS_KINDS, make_corpus
+
+STAGES = ("page_text_layout", "page_text_layout_fast", "ocr_page_to_text", "remove_orphan_enumerators", "write_parquet")
+
+# Corpora each stage is measured on
+STAGE_CORPORA = {
+    "page_text_layout": CORPUS_KINDS,
+    "page_text_layout_fast": CORPUS_KINDS,
+    "ocr_page_to_text": ("scanned",),
+    "remove_orphan_enumerators": ("mixed",),
+    "write_parquet": ("mixed",),
+}
+
+# ------------------------ Measurement (runs in a child process) ------------------------
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB on Linux
+
+def _layout_texts(pdf: Path) -> List[str]:
+    with fitz.open(pdf) as doc:
+        return [main.page_text_layout(page) for page in doc]
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def measure(stage: str, pdf: Path, repeat: int, ocr_pages: int) -> Dict:
+    """Time one stage on one corpus file.
+
+    Returns:
+        Dict with keys pages, bytes (input bytes the MB/s figure is based on),
+        seconds, peak_rss_mb — or skipped (reason) when the stage cannot run.
+    """
+    tmp = None
+    if stage in ("page_text_layout", "page_text_layout_fast"):
+        from_page = main.PageLayout.from_page_fast if stage == "page_text_layout_fast" else main.PageLayout.from_page
+        with fitz.open(pdf) as doc:
+            pages = doc.page_count
+
+        def run():
+            with fitz.open(pdf) as doc:
+                for page in doc:
+                    main.layout_text(from_page(page))
+
+        n_bytes = pdf.stat().st_size
+
+    elif stage == "ocr_page_to_text":
+        doc = fitz.open(pdf)
+        pages = min(doc.page_count, ocr_pages)
+        try:
+            main.ocr_page_to_text(doc.load_page(0), main.OCR_DPI, main.OCR_LANG)
+        except Exception as e:  # no tesseract binary / tessdata on this machine
+            doc.close()
+            return {"skipped": f"OCR unavailable: {e}"}
+
+        def run():
+            for i in range(pages):
+                main.ocr_page_to_text(doc.load_page(i), main.OCR_DPI, main.OCR_LANG)
+
+        n_bytes = pdf.stat().st_size * pages // max(1, doc.page_count)
+
+    elif stage == "remove_orphan_enumerators":
+        texts = _layout_texts(pdf)
+        pages = len(texts)
+
+        def run():
+            for t in texts:
+                main.remove_orphan_enumerators(t)
+
+        n_bytes = sum(len(t.encode("utf-8")) for t in texts)
+
+    elif stage == "write_parquet":
+        texts = _layout_texts(pdf)
+        pages = len(texts)
+        ts = main.now_iso()
+        records = [{
+            "doc_id": "bench", "source_name": pdf.name, "page": i + 1, "text": t, "is_ocr": False,
+            "char_len": len(t), "sha256": main.sha256_text(t), "extracted_at": ts,
+            "env": "bench", "zone": "text", "state": "bench", "county": "bench",
+        } for i, t in enumerate(texts)]
+        tmp = tempfile.TemporaryDirectory(prefix="bench-parquet-")
+        out_path = str(Path(tmp.name) / "bench_text.parquet")
+
+        def run():
+            main.write_parquet(records, out_path)
+
+        n_bytes = sum(len(t.encode("utf-8")) for t in texts)
+
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    # write_parquet prints an [ok] line per call; keep the report on stdout clean
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            seconds = _best_of(run, repeat)
+        finally:
+            sys.stdout = stdout
+            if tmp is not None:
+                tmp.cleanup()
+    if stage == "ocr_page_to_text":
+        doc.close()
+    return {"pages": pages, "bytes": n_bytes, "seconds": seconds, "peak_rss_mb": round(_peak_rss_mb(), 1)}
+
+def _row(stage: str, corpus: str, size: int, m: Dict) -> Dict:
+    row = {"stage": stage, "corpus": corpus, "size": size}
+    if "skipped" in m:
+        row["skipped"] = m["skipped"]
+        return row
+    secs = max(m["seconds"], 1e-9)
+    row.update({
+        "pages": m["pages"],
+        "seconds": round(m["seconds"], 6),
+        "pages_per_sec": round(m["pages"] / secs, 2),
+        "mb_per_sec": round(m["bytes"] / secs / 1e6, 3),
+        "input_mb": round(m["bytes"] / 1e6, 3),
+        "peak_rss_mb": m["peak_rss_mb"],
+    })
+    return row
+
+# ------------------------ Driver ------------------------
+
+def run_benchmarks(sizes: List[int],
+                   stages: List[str],
+                   corpus_dir: Path,
+                   repeat: int = 3,
+                   ocr_pages: int = 20,
+                   seed: int = 0,
+                   isolate: bool = True) -> Dict:
+    """Generate (or reuse) the corpora and measure every requested stage at every size.
+
+    With isolate=True each measurement runs in its own spawned process.
+
+    Returns:
+        The report: {"meta": {...}, "results": [row, ...]}.
+    """
+    results = []
+    for stage in stages:
+        for corpus in STAGE_CORPORA[stage]:
+            for size in sizes:
+                pdf = corpus_dir / f"{corpus}-{size}-s{seed}.pdf"
+                if not pdf.exists():
+                    make_corpus(pdf, corpus, size, seed)
+                if isolate:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+                        m = ex.submit(measure, stage, pdf, repeat, ocr_pages).result()
+                else:
+                    m = measure(stage, pdf, repeat, ocr_pages)
+                row = _row(stage, corpus, size, m)
+                if "skipped" in row:
+                    print(f"[warn] {stage} on {corpus} ({size} pages) skipped: {row['skipped']}", file=sys.stderr)
+                else:
+                    print(f"[info] {stage:<26} {corpus:<10} {size:>5} pages: "
+                          f"{row['pages_per_sec']:>9.1f} pages/s {row['mb_per_sec']:>8.2f} MB/s "
+                          f"peak {row['peak_rss_mb']:.0f} MB", file=sys.stderr)
+                results.append(row)
+
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pymupdf": fitz.VersionBind,
+        "numpy": np.__version__,
+        "pyarrow": pa.__version__,
+        "ocr_engine": main.OCR_ENGINE,
+        "ocr_dpi": main.OCR_DPI,
+        "repeat": repeat,
+        "seed": seed,
+        "sizes": sizes,
+    }
+    return {"meta": meta, "results": results}
+
+def compare_reports(old: Dict, new: Dict, tolerance: float) -> List[Dict]:
+    """Rows whose pages/sec fell by more than tolerance (0.1 = 10%) against old."""
+    key = lambda r: (r["stage"], r["corpus"], r["size"])
+    before = {key(r): r for r in old.get("results", []) if "pages_per_sec" in r}
+    regressions = []
+    for r in new["results"]:
+        prev = before.get(key(r))
+        if prev is None or "pages_per_sec" not in r:
+            continue
+        ratio = r["pages_per_sec"] / max(prev["pages_per_sec"], 1e-9)
+        if ratio < 1 - tolerance:
+            regressions.append({"stage": r["stage"], "corpus": r["corpus"], "size": r["size"],
+                                "before": prev["pages_per_sec"], "after": r["pages_per_sec"],
+                                "ratio": round(ratio, 3)})
+    return regressions
+
+def main_cli(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Benchmark the PDF extractor stages on synthetic corpora")
+    ap.add_argument("--sizes", default="10,50,200", help="Comma-separated corpus sizes in pages")
+    ap.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best time kept)")
+    ap.add_argument("--ocr-pages", type=int, default=20, help="Max pages OCR'd per measurement")
+    ap.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    ap.add_argument("--corpus-dir", default=None, help="Directory to cache generated PDFs (default: temp dir)")
+    ap.add_argument("--out", default=None, help="Write the JSON report to this file as well as stdout")
+    ap.add_argument("--compare", default=None, help="Previous JSON report to flag regressions against")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="Allowed pages/sec drop before flagging")
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        ap.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    tmp = None
+    if args.corpus_dir:
+        corpus_dir = Path(args.corpus_dir)
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="bench-corpus-")
+        corpus_dir = Path(tmp.name)
+
+    try:
+        report = run_benchmarks(sizes, stages, corpus_dir, args.repeat, args.ocr_pages, args.seed)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["regressions"] = compare_reports(json.load(f), report, args.tolerance)
+        for r in report["regressions"]:
+            print(f"[warn] regression: {r['stage']} {r['corpus']} {r['size']} pages: "
+                  f"{r['before']} → {r['after']} pages/s ({r['ratio']:.0%})", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+        print(f"[ok] wrote {args.out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main_cli()
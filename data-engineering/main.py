@@ -13,39 +13,95 @@ Args:
   --out   : s3://bucket/env=prod[/] (recommended) OR a local dir (for local runs)
   --env/--zone/--state/--county : optional metadata (still written into parquet)
   --no-ocr : disable OCR fallback
+  --ocr-workers : OCR pages on a dedicated pool of N processes per extracting process (0 = inline)
+  --ocr-engine : auto | tesserocr (in-process, kept warm) | pytesseract (subprocess per page)
+  --ocr-classify : skip blank/decorative pages before rendering; OCR scans at low DPI, escalating on low confidence
+  --strip-boilerplate : strip running headers/footers that recur on most pages of a PDF
+  --layout-mode : dict (span-level, default) | fast (word tuples, no image blocks; born-digital PDFs)
+  --chunk-size / --chunk-overlap : also write zone=text_chunk chunk records from the same pass (0 = off)
   --s3-max : limit number of PDFs processed from S3 (0 = no limit)
+  --workers : extract PDFs in N worker processes (1 = sequential, default)
+  --max-inflight : cap on PDFs submitted to the pool at once (default 2 × workers)
+  --split-pages : with --workers > 1, split PDFs longer than this into page ranges (0 = never)
+  --io-workers / --prefetch : S3 download threads / max PDFs downloaded ahead of extraction
+  --inmem-max-mb : keep S3 PDFs up to this size in memory, no temp file (0 = off)
+  --upload-workers : upload S3 outputs in the background on N threads (0 = inline in the writer)
+  --force : ignore the incremental manifest and re-extract every PDF
+  --doc-timeout / --page-timeout : opt-in wall-clock budget per PDF / per page in seconds (default 0 = none)
+  --retry-quarantined : try PDFs on the quarantine list again instead of skipping them
+  --no-metrics : skip the <out>/_metrics_<run>.parquet timing sidecar
+  --shard-index / --shard-count : process only this task's stable hash shard of the listed PDFs
+  --queue / --lease-root : claim PDFs through a lease-based work queue (own shard first, then steal)
+  --schedule : cost (largest predicted extraction time first, default) | listing
+  --shard-by : hash (stable, default) | cost (balance predicted time across shards)
+
+Incremental runs:
+- <out>/_extract_manifest.parquet records input key, ETag, size, output path,
+  extractor version and page count for every PDF written. Inputs whose ETag and
+  size are unchanged and whose output still exists are skipped before download.
+- <out>/_quarantine.parquet lists PDFs that ran past --doc-timeout/--page-timeout
+  or killed their worker; unchanged ones are skipped until --retry-quarantined.
+
+Compaction:
+  python main.py compact --out s3://bucket/env=prod/ [--prefix zone=text/state=GA/] [--target-mb 128]
+- Rewrites each partition's per-PDF files into ~--target-mb part files sorted by
+  (doc_id, page), and publishes <partition>/_files.json listing every file with
+  its row count. Readers can plan from that index instead of listing and opening
+  every file.
+
+Duplicate detection:
+  python main.py dedup --out s3://bucket/env=prod/ [--prefix zone=text/] [--drop] [--threshold 0.85]
+- Sets dup_of on page/chunk records whose text exactly or nearly (MinHash/LSH)
+  repeats an earlier record, or drops them with --drop.
 
 Notes:
 - For LOCAL inputs, --out is treated as a directory/prefix and we’ll write <stem>.parquet (no state/county mapping).
 - For S3 inputs, the output path is derived from INPUT KEY’s state=... and county=...
+- S3 PDFs are downloaded just ahead of extraction and deleted once written, so
+  local disk holds roughly (--prefetch + --max-inflight) PDFs at a time.
 """
 
 import argparse
+import fcntl
 import hashlib
+import heapq
+import io
+import json
 import os
+import resource
+import signal
 import sys
 import time
+import zlib
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 import re
 import tempfile
 import shutil
+import socket
+import threading
+from contextlib import contextmanager
+from collections import Counter, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 
 import fitz  # PyMuPDF
+import numpy as np
 from PIL import Image
 import pytesseract
-import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 
-# Optional pyarrow fs for s3 write
+# Optional in-process Tesseract engine; pytesseract (one subprocess per page) is the fallback
 try:
-    import pyarrow.fs as pafs
+    import tesserocr
 except Exception:
-    pafs = None
+    tesserocr = None
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 # ------------------------ Tunables ------------------------
@@ -56,6 +112,25 @@ OCR_LANG       = os.getenv("OCR_LANG", "eng")
 OCR_TIMEOUT_S  = int(os.getenv("OCR_TIMEOUT_S", "12"))
 MAX_OCR_PAGES  = int(os.getenv("MAX_OCR_PAGES", "20"))
 ALLOW_OCR      = os.getenv("ALLOW_OCR", "true").lower() != "false"  # --no-ocr overrides
+OCR_WORKERS    = int(os.getenv("OCR_WORKERS", "0"))  # OCR processes per extracting process (0 = OCR inline)
+OCR_ENGINE     = os.getenv("OCR_ENGINE", "auto")       # auto | tesserocr | pytesseract
+TESSDATA_PATH  = os.getenv("TESSDATA_PREFIX", "")      # tessdata dir for tesserocr ('' = library default)
+OCR_BINARIZE   = os.getenv("OCR_BINARIZE", "false").lower() == "true"  # hand OCR 1-bit packed pixels
+OCR_BINARIZE_THRESHOLD = int(os.getenv("OCR_BINARIZE_THRESHOLD", "160"))  # gray >= this is white
+OCR_MAX_MPIX   = float(os.getenv("OCR_MAX_MPIX", "0"))  # downscale renders above this many megapixels (0 = off)
+
+# Pre-render page classifier (skip / low-DPI / full-DPI OCR)
+OCR_CLASSIFY   = os.getenv("OCR_CLASSIFY", "false").lower() == "true"  # --ocr-classify
+OCR_LOW_DPI    = int(os.getenv("OCR_LOW_DPI", "150"))           # first pass for image-covered pages
+OCR_ESCALATE_CONF = float(os.getenv("OCR_ESCALATE_CONF", "60"))  # re-OCR at OCR_DPI below this mean confidence
+OCR_CLASSIFY_MIN_COVERAGE = float(os.getenv("OCR_CLASSIFY_MIN_COVERAGE", "0.3"))  # image area / page area
+OCR_CLASSIFY_MIN_DRAWINGS = int(os.getenv("OCR_CLASSIFY_MIN_DRAWINGS", "50"))     # vector paths (outlined text)
+
+# Running header/footer stripping (per document)
+STRIP_BOILERPLATE    = os.getenv("STRIP_BOILERPLATE", "false").lower() == "true"  # --strip-boilerplate
+BOILERPLATE_BAND     = float(os.getenv("BOILERPLATE_BAND", "0.08"))      # top/bottom share of page height
+BOILERPLATE_MIN_RATIO = float(os.getenv("BOILERPLATE_MIN_RATIO", "0.5"))  # recur on at least this share of pages
+BOILERPLATE_MIN_PAGES = int(os.getenv("BOILERPLATE_MIN_PAGES", "3"))      # shorter documents are left alone
 
 # Two-column detection (tuned)
 MIN_GAP_RATIO         = 0.12     # ~12% of page width
@@ -66,10 +141,68 @@ MIN_BLOCKS_PER_COLUMN = 4        # require more evidence per column
 GUTTER_MID_BAND       = (0.35, 0.65)  # require mid in central 35–65% of width
 TRIM_TOP_BOTTOM_RATIO = 0.08          # ignore top/bottom 8% of items when finding gutter
 
+# 3+ column detection (projection histogram); 2 keeps the classic two-column rules only
+MAX_COLUMNS           = int(os.getenv("MAX_COLUMNS", "2"))
+MIN_GUTTER_PT         = 10.0     # narrowest whitespace run accepted as a gutter
+
 Y_TOL = 2.0  # row grouping tolerance (points)
 
+# Text-layer extraction: dict (spans, default) | fast (word tuples from a lean TextPage)
+LAYOUT_MODE = os.getenv("LAYOUT_MODE", "dict")
+FAST_TEXT_FLAGS = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP  # no image blocks
+
 APPLY_ENUMERATOR_CLEAN = True
 
+# Parallel extraction
+INFLIGHT_PER_WORKER = 2  # PDFs queued per worker process when --max-inflight is unset
+SPLIT_PAGES    = int(os.getenv("SPLIT_PAGES", "400"))  # split docs above this many pages into ranges (0 = never)
+IO_WORKERS     = int(os.getenv("IO_WORKERS", "4"))       # S3 download threads
+INMEM_MAX_MB   = float(os.getenv("INMEM_MAX_MB", "0"))   # S3 PDFs up to this size skip local disk (0 = off)
+
+# Watchdog (wall-clock budgets; 0 = off, the default — long code books can legitimately take a while)
+DOC_TIMEOUT_S  = float(os.getenv("DOC_TIMEOUT_S", "0"))   # per PDF (per page range when split), e.g. 1800
+PAGE_TIMEOUT_S = float(os.getenv("PAGE_TIMEOUT_S", "0"))  # per page: layout pass plus inline OCR, e.g. 300
+WATCHDOG_CPU_GRACE_S = int(os.getenv("WATCHDOG_CPU_GRACE_S", "60"))  # pool workers die this far past DOC_TIMEOUT_S of CPU
+WORKER_RETRIES = 1  # a PDF whose worker died is re-run alone this many times before it is quarantined
+
+# Scheduling cost model (predicted seconds per PDF; see estimate_cost)
+PLAN_S_PER_MB        = float(os.getenv("PLAN_S_PER_MB", "0.05"))     # download + parse, per MB of PDF
+PLAN_S_PER_PAGE      = float(os.getenv("PLAN_S_PER_PAGE", "0.03"))   # layout pass, per page
+PLAN_S_PER_OCR_PAGE  = float(os.getenv("PLAN_S_PER_OCR_PAGE", "2.0"))  # OCR, per scanned page
+PLAN_BYTES_PER_PAGE  = int(os.getenv("PLAN_BYTES_PER_PAGE", "60000"))  # page count guess when it is unknown
+PLAN_SCANNED_BYTES_PER_PAGE = int(os.getenv("PLAN_SCANNED_BYTES_PER_PAGE", "150000"))  # heavier pages are scans
+PLAN_PROBE_PAGES     = int(os.getenv("PLAN_PROBE_PAGES", "8"))        # text layers sampled per local PDF
+
+# Chunking (0 = page records only)
+CHUNK_SIZE    = int(os.getenv("CHUNK_SIZE", "0"))      # max characters per chunk
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))  # characters shared by consecutive chunks
+
+# Duplicate detection (`main.py dedup`)
+DEDUP_NUM_PERM  = int(os.getenv("DEDUP_NUM_PERM", "128"))     # MinHash permutations per record
+DEDUP_BANDS     = int(os.getenv("DEDUP_BANDS", "16"))         # LSH bands (DEDUP_NUM_PERM / bands rows each)
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))  # estimated Jaccard for a near-duplicate
+DEDUP_SHINGLE   = int(os.getenv("DEDUP_SHINGLE", "5"))         # words per shingle
+DEDUP_MIN_CHARS = int(os.getenv("DEDUP_MIN_CHARS", "200"))     # shorter texts are only matched exactly
+
+# Parquet output
+ROW_GROUP_PAGES   = int(os.getenv("ROW_GROUP_PAGES", "500"))     # page records per parquet row group
+COMPACT_TARGET_MB = int(os.getenv("COMPACT_TARGET_MB", "128"))   # target size of compacted partition files
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")      # zstd | snappy | gzip | brotli | lz4 | none
+PARQUET_COMPRESSION_LEVEL = int(os.getenv("PARQUET_COMPRESSION_LEVEL", "3"))  # zstd/gzip/brotli only
+PARQUET_DICT_COLUMNS = tuple(c for c in os.getenv(   # low-cardinality columns to dictionary-encode
+    "PARQUET_DICT_COLUMNS",
+    "doc_id,source_name,env,zone,state,county,extracted_at,dup_of,run_id,level,input_key,out_path,ocr_kind",
+).split(",") if c)
+PARQUET_NO_STATS_COLUMNS = ("text",)  # min/max of page text is useless for pruning and bloats the footer
+PARQUET_PAGE_INDEX = os.getenv("PARQUET_PAGE_INDEX", "true").lower() != "false"  # column/offset indexes
+
+# S3 client / transfers
+S3_MAX_POOL          = int(os.getenv("S3_MAX_POOL", "32"))          # HTTP connections per process
+S3_PART_MB           = int(os.getenv("S3_PART_MB", "8"))            # ranged-GET / multipart part size
+S3_RANGE_CONCURRENCY = int(os.getenv("S3_RANGE_CONCURRENCY", "8"))  # concurrent parts per object
+UPLOAD_WORKERS       = int(os.getenv("UPLOAD_WORKERS", "2"))        # background output uploads (0 = in the writer)
+UPLOAD_QUEUE         = int(os.getenv("UPLOAD_QUEUE", "8"))          # spooled outputs awaiting upload before extraction waits
+
 # ------------------------ Small helpers ------------------------
 
 def sha256_text(s: str) -> str:
@@ -98,14 +231,21 @@ def slugify_filename(name: str) -> str:
     base = re.sub(r"[^\w\-. ]+", "_", base)
     return base
 
+def open_pdf(pdf_path: Path, pdf_bytes: Optional[bytes] = None) -> fitz.Document:
+    """Open a PDF from memory when its bytes are given, otherwise from disk."""
+    if pdf_bytes is not None:
+        return fitz.open(stream=pdf_bytes, filetype="pdf")
+    return fitz.open(str(pdf_path))
+
 # ------------------------ OCR ------------------------
 
 def ocr_page_to_text(page: fitz.Page, dpi: int = OCR_DPI, lang: str = OCR_LANG) -> str:
     """Render a PDF page to an image and extract text via Tesseract OCR.
 
     Used as a fallback when PyMuPDF's native text extraction yields too little
-    content (e.g. scanned pages). The page is rasterized at the given DPI,
-    then passed to Tesseract. Returns an empty string on timeout.
+    content (e.g. scanned pages). The page is rasterized in grayscale at the
+    given DPI and the pixmap's sample buffer is handed to the OCR engine
+    without an intermediate PIL copy. Returns an empty string on timeout.
 
     Args:
         page: A PyMuPDF page object to OCR.
@@ -115,190 +255,542 @@ def ocr_page_to_text(page: fitz.Page, dpi: int = OCR_DPI, lang: str = OCR_LANG)
     Returns:
         Extracted text with normalized newlines, or '' on failure.
     """
+    pix, eff_dpi = render_page_for_ocr(page, dpi)
+    samples, width, height, bpp, stride = ocr_image_from_pixmap(pix, copy=False)
+    return ocr_pixels_to_text(samples, width, height, lang=lang, dpi=eff_dpi,
+                              bytes_per_pixel=bpp, bytes_per_line=stride)
+
+def render_page_for_ocr(page: fitz.Page, dpi: int = OCR_DPI) -> Tuple[fitz.Pixmap, int]:
+    """Rasterize a page in grayscale for OCR.
+
+    A letter page at 250 DPI is ~6 MB gray instead of ~19 MB RGB. Pages that
+    would exceed OCR_MAX_MPIX megapixels (oversized plats, maps) are rendered
+    at a lower resolution instead.
+
+    Returns:
+        Tuple of (pixmap, effective_dpi).
+    """
     zoom = dpi / 72.0
+    if OCR_MAX_MPIX > 0:
+        mpix = page.rect.width * page.rect.height * zoom * zoom / 1e6
+        if mpix > OCR_MAX_MPIX:
+            zoom *= (OCR_MAX_MPIX / mpix) ** 0.5
     mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat, alpha=False)
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
+    return pix, int(round(zoom * 72))
+
+def ocr_image_from_pixmap(pix: fitz.Pixmap, copy: bool) -> Tuple[object, int, int, int, int]:
+    """Describe a grayscale pixmap as OCR input: (samples, width, height, bytes_per_pixel, bytes_per_line).
+
+    With copy=False the samples are a memoryview onto the pixmap (valid only
+    while pix is alive); copy=True returns bytes that can be pickled to an
+    OCR pool. With OCR_BINARIZE, pixels are thresholded and bit-packed
+    (bytes_per_pixel=0, 1 = white, as tesserocr expects), 1/8 the size.
+    """
+    if OCR_BINARIZE:
+        gray = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+        packed = np.packbits(gray >= OCR_BINARIZE_THRESHOLD, axis=1)
+        return packed.tobytes(), pix.width, pix.height, 0, packed.shape[1]
+    samples = pix.samples if copy else pix.samples_mv
+    return samples, pix.width, pix.height, pix.n, pix.stride
+
+class _OcrEngineInitError(RuntimeError):
+    """The in-process engine could not load (missing library or language data)."""
+
+_OCR_LOCAL = threading.local()  # per-thread warm tesserocr API (PyTessBaseAPI is not thread-safe)
+
+def resolve_ocr_engine() -> str:
+    """Name of the OCR backend to use in this thread: 'tesserocr' or 'pytesseract'."""
+    name = OCR_ENGINE.lower()
+    if name == "pytesseract":
+        return name
+    if name not in ("auto", "tesserocr"):
+        raise ValueError(f"Unknown OCR_ENGINE: {OCR_ENGINE}")
+    if name == "auto" and (tesserocr is None or getattr(_OCR_LOCAL, "broken", False)):
+        return "pytesseract"
+    return "tesserocr"
+
+def _tesserocr_api(lang: str):
+    """This thread's PyTessBaseAPI for lang, created once and kept warm across pages."""
+    api = getattr(_OCR_LOCAL, "api", None)
+    if api is not None and _OCR_LOCAL.lang == lang:
+        return api
+    if tesserocr is None:
+        raise _OcrEngineInitError("tesserocr is not installed")
+    if api is not None:
+        api.End()
+        _OCR_LOCAL.api = None
+    try:
+        api = tesserocr.PyTessBaseAPI(path=TESSDATA_PATH, lang=lang) if TESSDATA_PATH \
+            else tesserocr.PyTessBaseAPI(lang=lang)
+    except RuntimeError as e:
+        raise _OcrEngineInitError(str(e)) from e
+    _OCR_LOCAL.api, _OCR_LOCAL.lang = api, lang
+    return api
+
+def _ocr_tesserocr(samples, width: int, height: int, bpp: int, stride: int, lang: str, dpi: int,
+                   with_conf: bool = False) -> Tuple[str, float]:
+    """In-process OCR: the language model stays loaded between pages.
+
+    SetImageBytes only accepts bytes, so a memoryview costs one copy here.
+    MeanTextConf is read from the same recognition pass when asked for.
+    """
+    api = _tesserocr_api(lang)
+    if not isinstance(samples, bytes):
+        samples = bytes(samples)
+    api.SetImageBytes(samples, width, height, bpp, stride)
+    api.SetSourceResolution(dpi)
+    if not api.Recognize(timeout=OCR_TIMEOUT_S * 1000):
+        return "", -1.0
+    return api.GetUTF8Text() or "", float(api.MeanTextConf()) if with_conf else -1.0
+
+_PIL_MODES = {0: ("1", "1"), 1: ("L", "L"), 3: ("RGB", "RGB")}  # bytes_per_pixel -> (mode, rawmode)
+
+def _ocr_pytesseract(samples, width: int, height: int, bpp: int, stride: int, lang: str, dpi: int,
+                     with_conf: bool = False) -> Tuple[str, float]:
+    """Subprocess OCR via the tesseract CLI (start-up and model load on every page).
+
+    Image.frombuffer shares the sample buffer for gray input rather than copying it.
+    With with_conf, image_to_data is used instead and the text is rebuilt
+    line by line from its words, so one call yields both.
+    """
+    mode, rawmode = _PIL_MODES[bpp]
+    img = Image.frombuffer(mode, (width, height), samples, "raw", rawmode, stride, 1)
     try:
-        txt = pytesseract.image_to_string(img, lang=lang, timeout=OCR_TIMEOUT_S) or ""
+        if not with_conf:
+            return pytesseract.image_to_string(img, lang=lang, timeout=OCR_TIMEOUT_S) or "", -1.0
+        data = pytesseract.image_to_data(img, lang=lang, timeout=OCR_TIMEOUT_S,
+                                         output_type=pytesseract.Output.DICT)
     except RuntimeError:
+        return "", -1.0
+    lines: Dict[Tuple, List[str]] = {}
+    confs = []
+    for word, conf, *key in zip(data["text"], data["conf"], data["block_num"], data["par_num"], data["line_num"]):
+        if word and word.strip() and float(conf) >= 0:
+            lines.setdefault(tuple(key), []).append(word)
+            confs.append(float(conf))
+    text = "\n".join(" ".join(words) for words in lines.values())
+    return text, sum(confs) / len(confs) if confs else 0.0
+
+OCR_BACKENDS: Dict[str, Callable[..., Tuple[str, float]]] = {
+    "tesserocr": _ocr_tesserocr,
+    "pytesseract": _ocr_pytesseract,
+}
+
+def ocr_pixels_to_text_conf(samples,
+                            width: int,
+                            height: int,
+                            lang: str = OCR_LANG,
+                            dpi: int = OCR_DPI,
+                            bytes_per_pixel: int = 1,
+                            bytes_per_line: Optional[int] = None) -> Tuple[str, float]:
+    """ocr_pixels_to_text that also returns the engine's mean word confidence (0-100)."""
+    return _run_ocr(samples, width, height, lang, dpi, bytes_per_pixel, bytes_per_line, with_conf=True)
+
+def ocr_pixels_to_text(samples,
+                       width: int,
+                       height: int,
+                       lang: str = OCR_LANG,
+                       dpi: int = OCR_DPI,
+                       bytes_per_pixel: int = 1,
+                       bytes_per_line: Optional[int] = None) -> str:
+    """Run Tesseract on raw pixels (bytes or any buffer) from ocr_image_from_pixmap.
+
+    bytes_per_pixel follows tesserocr: 1 = gray, 3 = RGB, 0 = bit-packed
+    binary. Needs no PyMuPDF objects, so it can run in an OCR pool process. The engine
+    is chosen by resolve_ocr_engine; with OCR_ENGINE=auto a tesserocr engine
+    that fails to initialise (e.g. missing tessdata) drops this process back
+    to pytesseract. Returns '' on timeout.
+    """
+    return _run_ocr(samples, width, height, lang, dpi, bytes_per_pixel, bytes_per_line)[0]
+
+def _run_ocr(samples, width, height, lang, dpi, bytes_per_pixel, bytes_per_line,
+             with_conf: bool = False) -> Tuple[str, float]:
+    """Dispatch to the OCR backend; returns (text, mean confidence or -1 if not requested)."""
+    bpp = bytes_per_pixel
+    stride = bytes_per_line or (width * bpp if bpp else (width + 7) // 8)
+    engine = resolve_ocr_engine()
+    try:
+        txt, conf = OCR_BACKENDS[engine](samples, width, height, bpp, stride, lang, dpi, with_conf)
+    except _OcrEngineInitError as e:
+        if OCR_ENGINE.lower() != "auto":
+            raise
+        print(f"[warn] tesserocr unavailable ({e}); falling back to pytesseract", file=sys.stderr)
+        _OCR_LOCAL.broken = True
+        txt, conf = OCR_BACKENDS["pytesseract"](samples, width, height, bpp, stride, lang, dpi, with_conf)
+    return txt.replace("\r\n", "\n").replace("\r", "\n").strip(), conf
+
+# Page classes from classify_page
+OCR_SKIP, OCR_LOW, OCR_FULL = "skip", "low", "full"
+
+def classify_page(page: fitz.Page) -> str:
+    """Decide, before rendering, whether a text-poor page is worth OCR and at what DPI.
+
+    Only cheap PyMuPDF signals are used (no rasterization): image placements
+    and their bounding boxes from get_image_info (pixels are not decoded) and
+    the number of vector drawing paths. Called only for pages whose text
+    layer is already too short (see iter_page_range).
+
+    - Images covering >= OCR_CLASSIFY_MIN_COVERAGE of the page (scans,
+      photographed pages): OCR_LOW — a first pass at OCR_LOW_DPI, escalated
+      to OCR_DPI when its confidence is low (see ocr_page_classified).
+    - Many vector paths (>= OCR_CLASSIFY_MIN_DRAWINGS; text converted to
+      outlines, plats with lettering): OCR_FULL, thin strokes need full DPI.
+    - Anything else (blank separators, a small logo or seal, ruled lines,
+      a page with only a stray header in its text layer): OCR_SKIP.
+
+    Returns:
+        One of OCR_SKIP, OCR_LOW, OCR_FULL.
+    """
+    page_rect = page.rect
+    area = abs(page_rect) or 1.0
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page_rect) for info in page.get_image_info())
+    if covered / area >= OCR_CLASSIFY_MIN_COVERAGE:
+        return OCR_LOW
+    if len(page.get_cdrawings()) >= OCR_CLASSIFY_MIN_DRAWINGS:
+        return OCR_FULL
+    return OCR_SKIP
+
+def ocr_page_classified(page: fitz.Page, kind: str, lang: str = OCR_LANG) -> str:
+    """OCR a page according to its classify_page result.
+
+    OCR_FULL goes straight to ocr_page_to_text at OCR_DPI. OCR_LOW renders at
+    OCR_LOW_DPI first and re-runs at OCR_DPI only if that pass found text
+    with a mean confidence below OCR_ESCALATE_CONF; a low-DPI pass that finds
+    no text at all (a cover photo, an illustration) is not escalated.
+    """
+    if kind == OCR_SKIP:
         return ""
-    return txt.replace("\r\n", "\n").replace("\r", "\n").strip()
+    if kind == OCR_LOW and OCR_LOW_DPI < OCR_DPI:
+        pix, eff_dpi = render_page_for_ocr(page, OCR_LOW_DPI)
+        samples, width, height, bpp, stride = ocr_image_from_pixmap(pix, copy=False)
+        txt, conf = ocr_pixels_to_text_conf(samples, width, height, lang=lang, dpi=eff_dpi,
+                                            bytes_per_pixel=bpp, bytes_per_line=stride)
+        if not _needs_escalation(txt, conf):
+            return txt
+    return ocr_page_to_text(page, OCR_DPI, lang)
+
+def _needs_escalation(txt: str, conf: float) -> bool:
+    return bool(txt.strip()) and 0 <= conf < OCR_ESCALATE_CONF
 
 # ------------------------ Layout-aware extraction ------------------------
 
-def _collect_items_dict(page: fitz.Page):
-    """Extract all text line items from a page using PyMuPDF's dict mode.
-
-    Iterates over text blocks and their lines, collecting each non-empty line
-    as a dict with its block index, bounding-box coordinates (x, y, x1), and
-    concatenated span text. Non-text blocks (e.g. images) are skipped.
-
-    Args:
-        page: A PyMuPDF page object.
-
-    Returns:
-        List of dicts, each with keys: 'bidx' (block index), 'y' (top y),
-        'x' (left x), 'x1' (right x), 'text' (line text content).
+class PageLayout:
+    """Text lines of one page, extracted once and stored column-wise.
+
+    page.get_text("dict") is called a single time per page; every non-empty
+    line becomes one row of the x0/y0/x1/bidx arrays plus an entry in text.
+    Column detection, reading-order sorting, the OCR decision and the record
+    builder all work from this object (and from index arrays into it)
+    instead of re-extracting the page or building a dict per line.
+
+    Attributes:
+        x0, y0, x1: float64 arrays of line bbox left, top and right (points).
+        bidx: int64 array of the block index each line came from.
+        text: List of line texts (right-stripped).
+        width: Page width in points.
+        height: Page height in points.
     """
-    d = page.get_text("dict") or {}
-    items = []
-    for b_idx, b in enumerate(d.get("blocks", [])):
-        if b.get("type", 0) != 0:
-            continue
-        for ln in b.get("lines", []):
-            spans = ln.get("spans", [])
-            if not spans:
-                continue
-            x0, y0, x1, y1 = ln.get("bbox", (0, 0, 0, 0))
-            txt = "".join((s.get("text") or "") for s in spans)
-            txt = txt.replace("\r\n", "\n").replace("\r", "\n")
-            if not txt.strip():
-                continue
-            items.append({"bidx": b_idx, "y": y0, "x": x0, "x1": x1, "text": txt.rstrip()})
-    return items
 
-def _items_to_columns(items: List[dict], page_width: float):
-    """Detect whether a page has a two-column layout and split items accordingly.
+    __slots__ = ("x0", "y0", "x1", "bidx", "text", "width", "height")
+
+    def __init__(self, x0, y0, x1, bidx, text: List[str], width: float, height: float):
+        self.x0 = np.asarray(x0, dtype=np.float64)
+        self.y0 = np.asarray(y0, dtype=np.float64)
+        self.x1 = np.asarray(x1, dtype=np.float64)
+        self.bidx = np.asarray(bidx, dtype=np.int64)
+        self.text = text
+        self.width = width
+        self.height = height
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @classmethod
+    def from_page(cls, page: fitz.Page) -> "PageLayout":
+        """Collect every non-empty text line on a page using PyMuPDF's dict mode.
+
+        Lines are the concatenated text of their spans; non-text blocks
+        (e.g. images) and whitespace-only lines are skipped.
+        """
+        d = page.get_text("dict") or {}
+        x0s, y0s, x1s, bidxs, texts = [], [], [], [], []
+        for b_idx, b in enumerate(d.get("blocks", [])):
+            if b.get("type", 0) != 0:
+                continue
+            for ln in b.get("lines", []):
+                spans = ln.get("spans", [])
+                if not spans:
+                    continue
+                x0, y0, x1, _ = ln.get("bbox", (0, 0, 0, 0))
+                txt = "".join((s.get("text") or "") for s in spans)
+                txt = txt.replace("\r\n", "\n").replace("\r", "\n")
+                if not txt.strip():
+                    continue
+                x0s.append(x0)
+                y0s.append(y0)
+                x1s.append(x1)
+                bidxs.append(b_idx)
+                texts.append(txt.rstrip())
+        return cls(x0s, y0s, x1s, bidxs, texts, page.rect.width, page.rect.height)
+
+    @classmethod
+    def from_page_fast(cls, page: fitz.Page) -> "PageLayout":
+        """Collect text lines from PyMuPDF's word tuples instead of dict mode.
+
+        get_text("dict") builds a Python dict per span (font, size, color,
+        origin) that from_page throws away. Here the page is parsed once into
+        a TextPage with FAST_TEXT_FLAGS (image blocks are not kept) and only
+        (x0, y0, x1, y1, word, block_no, line_no, word_no) tuples come back;
+        consecutive words of one (block_no, line_no) are joined into a line
+        whose bbox is their union.
+
+        Matches from_page except that whitespace inside a line collapses to
+        single spaces and leading whitespace is dropped (see
+        tests/test_layout.py for the equivalence check).
+        """
+        words = page.get_text("words", textpage=page.get_textpage(flags=FAST_TEXT_FLAGS))
+        x0s, y0s, x1s, bidxs, texts = [], [], [], [], []
+        key = None
+        line: List[str] = []
+        for x0, y0, x1, _, word, b_no, l_no, _ in words:
+            if (b_no, l_no) != key:
+                if line:
+                    texts.append(" ".join(line))
+                key = (b_no, l_no)
+                line = []
+                x0s.append(x0)
+                y0s.append(y0)
+                x1s.append(x1)
+                bidxs.append(b_no)
+            else:
+                x0s[-1] = min(x0s[-1], x0)
+                y0s[-1] = min(y0s[-1], y0)
+                x1s[-1] = max(x1s[-1], x1)
+            line.append(word)
+        if line:
+            texts.append(" ".join(line))
+        return cls(x0s, y0s, x1s, bidxs, texts, page.rect.width, page.rect.height)
+
+    def centers(self, idx: np.ndarray) -> np.ndarray:
+        """Horizontal line centers (x0+x1)/2 for the given rows."""
+        return 0.5 * (self.x0[idx] + self.x1[idx])
+
+def _trim_bands(layout: PageLayout, idx: np.ndarray, need: int) -> np.ndarray:
+    """Drop the top/bottom TRIM_TOP_BOTTOM_RATIO of lines (headers/footers), unless too few remain."""
+    y = layout.y0[idx]
+    ys = np.sort(y)
+    k = int(len(ys) * TRIM_TOP_BOTTOM_RATIO)
+    y_lo = ys[k] if k < len(ys) else ys[0]
+    y_hi = ys[-k-1] if k > 0 else ys[-1]
+    keep = (y_lo <= y) & (y <= y_hi)
+    return idx[keep] if np.count_nonzero(keep) >= need else idx
+
+def _items_to_columns(layout: PageLayout, idx: np.ndarray):
+    """Detect whether a page has a two-column layout and split its lines accordingly.
 
     Finds the largest horizontal gap between line centers (the "gutter") after
-    trimming header/footer bands. The gutter must pass several sanity checks:
-    it must be in the central band of the page, wide enough relative to page
-    width, and have enough items on each side.
+    trimming header/footer bands, via the diffs of the sorted centers. The
+    gutter must pass several sanity checks: it must be in the central band of
+    the page, wide enough relative to page width, and have enough items on
+    each side.
 
     Args:
-        items: Line items from _collect_items_dict.
-        page_width: The width of the PDF page in points.
+        layout: The page's PageLayout.
+        idx: Row indices (into layout) to consider.
 
     Returns:
-        Tuple of (left_items, right_items, gutter_x). If no two-column layout
-        is detected, returns (items, [], None).
+        Tuple of (left_idx, right_idx, gutter_x). If no two-column layout
+        is detected, returns (idx, empty, None).
     """
+    none = (idx, idx[:0], None)
+    page_width = layout.width
+
     # Need enough signals to even consider a split
     need = max(4, 2 * MIN_BLOCKS_PER_COLUMN)
-    if len(items) < need:
-        return items, [], None
+    if len(idx) < need:
+        return none
 
     # Trim top/bottom bands to avoid headers/footers polluting gutter search
-    ys = sorted(it["y"] for it in items)
-    if ys:
-        k = int(len(ys) * TRIM_TOP_BOTTOM_RATIO)
-        y_lo = ys[k] if k < len(ys) else ys[0]
-        y_hi = ys[-k-1] if k > 0 else ys[-1]
-        trimmed = [it for it in items if y_lo <= it["y"] <= y_hi]
-        if len(trimmed) >= need:
-            work = trimmed
-        else:
-            work = items
-    else:
-        work = items
-
-    # Use true line centers (x0+x1)/2. Fallback to x if x1 missing.
-    centers = []
-    for it in work:
-        x0 = it.get("x", 0.0)
-        x1 = it.get("x1", None)
-        c  = 0.5 * (x0 + x1) if isinstance(x1, (int, float)) else float(x0)
-        centers.append(c)
-
-    if len(centers) < need:
-        return items, [], None
-
-    centers.sort()
-    max_gap, mid = 0.0, None
-    for i in range(len(centers) - 1):
-        gap = centers[i+1] - centers[i]
-        if gap > max_gap:
-            max_gap = gap
-            mid = 0.5 * (centers[i+1] + centers[i])
-
-    if mid is None:
-        return items, [], None
+    work = _trim_bands(layout, idx, need)
+
+    # Largest gap between sorted true line centers (x0+x1)/2; first one wins ties
+    centers = np.sort(layout.centers(work))
+    gaps = np.diff(centers)
+    i = int(np.argmax(gaps))
+    max_gap = float(gaps[i])
+    if max_gap <= 0.0:
+        return none
+    mid = 0.5 * (float(centers[i+1]) + float(centers[i]))
 
     # Stronger interior checks
     if not (EDGE_MARGIN_RATIO * page_width < mid < (1.0 - EDGE_MARGIN_RATIO) * page_width):
-        return items, [], None
+        return none
 
     lo_band, hi_band = GUTTER_MID_BAND
     if not (lo_band * page_width <= mid <= hi_band * page_width):
-        return items, [], None
+        return none
 
     if max_gap < (MIN_GAP_RATIO * page_width):
-        return items, [], None
+        return none
 
     # Split by center (not x+100)
-    left, right = [], []
-    for it in items:
-        x0 = it.get("x", 0.0)
-        x1 = it.get("x1", None)
-        c  = 0.5 * (x0 + x1) if isinstance(x1, (int, float)) else float(x0)
-        (left if c <= mid else right).append(it)
+    on_left = layout.centers(idx) <= mid
+    left, right = idx[on_left], idx[~on_left]
 
     if len(left) < MIN_BLOCKS_PER_COLUMN or len(right) < MIN_BLOCKS_PER_COLUMN:
-        return items, [], None
+        return none
 
     return left, right, mid
 
+def _histogram_gutters(layout: PageLayout, idx: np.ndarray) -> List[float]:
+    """Find column gutters (3+ columns) from a horizontal projection histogram.
 
-def _sort_items(items: List[dict]):
-    """Sort line items into reading order (top-to-bottom, left-to-right).
-
-    Groups items into rows based on vertical proximity (within Y_TOL points),
-    sorts each row left-to-right by x-coordinate, then flattens into a single
-    ordered list.
-
-    Args:
-        items: Line items from _collect_items_dict or _items_to_columns.
+    Each line's [x0, x1) extent is added to a 1-point-wide coverage histogram
+    (header/footer bands trimmed). Interior runs at least MIN_GUTTER_PT wide
+    that almost no line covers are gutters; the widest MAX_COLUMNS - 1 are
+    kept, and every resulting column must hold MIN_BLOCKS_PER_COLUMN lines.
 
     Returns:
-        List of items reordered into natural reading sequence.
+        Sorted gutter x positions, or [] if no multi-column layout is found.
     """
-    if not items:
+    need = 3 * MIN_BLOCKS_PER_COLUMN
+    if len(idx) < need:
         return []
-    items = sorted(items, key=lambda it: it["y"])
-    rows, cur = [], []
-    last_y = None
-    for it in items:
-        if last_y is None or abs(it["y"] - last_y) <= Y_TOL:
-            cur.append(it)
-            last_y = it["y"] if last_y is None else (last_y + it["y"]) / 2.0
-        else:
-            cur.sort(key=lambda z: (round(z["x"], 2), z["bidx"]))
-            rows.append(cur)
-            cur = [it]
-            last_y = it["y"]
-    if cur:
-        cur.sort(key=lambda z: (round(z["x"], 2), z["bidx"]))
-        rows.append(cur)
-    return [it for row in rows for it in row]
+    work = _trim_bands(layout, idx, need)
+
+    nbins = int(np.ceil(layout.width)) + 1
+    lo = np.clip(np.floor(layout.x0[work]).astype(np.int64), 0, nbins - 1)
+    hi = np.clip(np.ceil(layout.x1[work]).astype(np.int64), 0, nbins - 1)
+    delta = np.zeros(nbins + 1, dtype=np.int64)
+    np.add.at(delta, lo, 1)
+    np.add.at(delta, hi, -1)
+    cover = np.cumsum(delta)[:nbins]
+
+    # Runs of (nearly) empty bins strictly inside the text area
+    allowed = int(0.02 * len(work))  # tolerate a stray full-width line
+    empty = np.r_[False, cover[lo.min():hi.max()] <= allowed, False].astype(np.int8)
+    edges = np.diff(empty)
+    starts = np.flatnonzero(edges == 1) + lo.min()
+    stops = np.flatnonzero(edges == -1) + lo.min()
+    widths = stops - starts
+    inner = (widths >= MIN_GUTTER_PT) & (starts > lo.min()) & (stops < hi.max())
+    if not inner.any():
+        return []
+    starts, stops, widths = starts[inner], stops[inner], widths[inner]
+    keep = np.argsort(-widths, kind="stable")[:max(1, MAX_COLUMNS - 1)]
+    gutters = np.sort(0.5 * (starts[keep] + stops[keep]))
 
-def page_text_layout(page: fitz.Page) -> str:
-    """Extract text from a PDF page with layout-aware reading order.
+    counts = np.bincount(np.searchsorted(gutters, layout.centers(idx)), minlength=len(gutters) + 1)
+    if counts.min() < MIN_BLOCKS_PER_COLUMN:
+        return []
+    return gutters.tolist()
+
+def _round2(x: np.ndarray) -> np.ndarray:
+    """round(x, 2) with Python's (correctly rounded) semantics, vectorized.
+
+    np.round scales by 100 first, which can land on the other side of a .5
+    tie; those few values are re-rounded in Python so sort keys match exactly.
+    """
+    r = np.round(x, 2)
+    scaled = x * 100.0
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if tie.any():
+        r[tie] = [round(v, 2) for v in x[tie].tolist()]
+    return r
+
+def _row_ids(y_sorted: np.ndarray) -> np.ndarray:
+    """Row number for each line of a y-sorted page (rows start where y jumps > Y_TOL).
+
+    The reading-order rule compares each y to a running average of the
+    current row, not to the previous line. A gap > Y_TOL from the previous
+    line always starts a row, so those breaks come from a cumulative diff;
+    only segments whose total y-span exceeds Y_TOL (dense, drifting lines)
+    can split further, and those are replayed with the scalar rule.
+    """
+    n = len(y_sorted)
+    breaks = np.zeros(n, dtype=bool)
+    breaks[1:] = np.diff(y_sorted) > Y_TOL
+    starts = np.flatnonzero(breaks)
+    starts = np.r_[0, starts]
+    stops = np.r_[starts[1:], n]
+    drifting = (y_sorted[stops - 1] - y_sorted[starts]) > Y_TOL
+    if drifting.any():
+        ys = y_sorted.tolist()
+        for s, e in zip(starts[drifting].tolist(), stops[drifting].tolist()):
+            last_y = ys[s]
+            for j in range(s + 1, e):
+                if abs(ys[j] - last_y) <= Y_TOL:
+                    last_y = (last_y + ys[j]) / 2.0
+                else:
+                    breaks[j] = True
+                    last_y = ys[j]
+    return np.cumsum(breaks)
 
-    Handles both single-column and two-column layouts. For two-column pages,
-    text is read left column first (top to bottom), then right column, with
-    columns separated by a blank line. For single-column pages, items are
-    sorted in standard reading order.
+def _sort_items(layout: PageLayout, idx: np.ndarray) -> np.ndarray:
+    """Sort lines into reading order (top-to-bottom, left-to-right).
+
+    Stable-sorts by y, groups lines into rows (see _row_ids), then orders
+    each row left-to-right by (round(x, 2), block index) with one lexsort.
 
     Args:
-        page: A PyMuPDF page object.
+        layout: The page's PageLayout.
+        idx: Row indices (into layout) to order.
 
     Returns:
-        The full page text as a single string in reading order.
+        The row indices reordered into natural reading sequence.
     """
-    items = _collect_items_dict(page)
-    if not items:
+    if len(idx) == 0:
+        return idx
+    by_y = idx[np.argsort(layout.y0[idx], kind="stable")]
+    rows = _row_ids(layout.y0[by_y])
+    return by_y[np.lexsort((layout.bidx[by_y], _round2(layout.x0[by_y]), rows))]
+
+def layout_text(layout: PageLayout) -> str:
+    """Join a page's lines in layout-aware reading order.
+
+    Handles single-column and two-column layouts (and, with MAX_COLUMNS > 2,
+    three or more columns found by _histogram_gutters). Multi-column pages are
+    read column by column, left to right, with columns separated by a blank
+    line. For single-column pages, lines are sorted in standard reading order.
+    """
+    if len(layout) == 0:
         return ""
-    left, right, gutter = _items_to_columns(items, page.rect.width)
+    idx = np.arange(len(layout))
+    texts = layout.text
+
+    def join_items(its: np.ndarray) -> str:
+        return "\n".join(texts[r] for r in _sort_items(layout, its).tolist() if texts[r].strip())
 
-    def join_items(its: List[dict]) -> str:
-        ordered = _sort_items(its)
-        return "\n".join(it["text"] for it in ordered if it["text"].strip())
+    if MAX_COLUMNS > 2:
+        gutters = _histogram_gutters(layout, idx)
+        if len(gutters) >= 2:
+            col = np.searchsorted(gutters, layout.centers(idx))
+            parts = (join_items(idx[col == c]) for c in range(len(gutters) + 1))
+            return "\n\n".join(s for s in parts if s).strip()
 
+    left, right, gutter = _items_to_columns(layout, idx)
     if gutter is None:
-        return join_items(items).strip()
+        return join_items(idx).strip()
     return "\n\n".join(s for s in (join_items(left), join_items(right)) if s).strip()
 
+def page_layout(page: fitz.Page) -> PageLayout:
+    """The page's PageLayout via the LAYOUT_MODE extraction path (--layout-mode)."""
+    if LAYOUT_MODE == "fast":
+        return PageLayout.from_page_fast(page)
+    return PageLayout.from_page(page)
+
+def page_text_layout(page: fitz.Page) -> str:
+    """Extract text from a PDF page with layout-aware reading order.
+
+    Args:
+        page: A PyMuPDF page object.
+
+    Returns:
+        The full page text as a single string in reading order.
+    """
+    return layout_text(page_layout(page))
+
 # ------------------------ Enumerator cleaner ------------------------
 
 _BARE_ENUM_RE = re.compile(
@@ -350,123 +842,1053 @@ def remove_orphan_enumerators(text: str) -> str:
         i += 1
     return "\n".join(out)
 
+# ------------------------ Header/footer boilerplate ------------------------
+
+TOP, BOTTOM = "top", "bottom"
+
+def band_lines(layout: PageLayout, band: float = BOILERPLATE_BAND) -> List[Tuple[str, str]]:
+    """(TOP|BOTTOM, line text) for the layout lines starting in the top or bottom band of the page."""
+    limit = band * layout.height
+    top = np.flatnonzero(layout.y0 < limit)
+    bottom = np.flatnonzero(layout.y0 > layout.height - limit)
+    return ([(TOP, layout.text[r]) for r in top.tolist()]
+            + [(BOTTOM, layout.text[r]) for r in bottom.tolist()])
+
+def _boilerplate_key(line: str) -> str:
+    """Compare band lines ignoring case, spacing and numbers ("Page 3", "Supp. No. 12", "CD2:14")."""
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+def boilerplate_keys(bands: Dict[int, List[Tuple[str, str]]],
+                     min_ratio: float = BOILERPLATE_MIN_RATIO,
+                     min_pages: int = BOILERPLATE_MIN_PAGES) -> set:
+    """The (TOP|BOTTOM, key) band lines that recur on at least min_ratio of a document's pages.
+
+    Args:
+        bands: {page_index: band_lines(...)} for every page of the document.
+        min_ratio: Share of pages a line must appear on.
+        min_pages: Documents with fewer pages are never stripped.
+    """
+    if len(bands) < min_pages:
+        return set()
+    counts = Counter(k for lines in bands.values() for k in {(w, _boilerplate_key(t)) for w, t in lines})
+    need = max(2, min_ratio * len(bands))
+    return {k for k, c in counts.items() if c >= need}
+
+def strip_boilerplate(text: str, lines: List[Tuple[str, str]], keys: set) -> str:
+    """Remove one page's running header/footer lines from its layout text.
+
+    Each band line whose key is boilerplate removes one matching text line:
+    the first occurrence for a header, the last for a footer, so body text
+    that happens to repeat a header further down is kept.
+    """
+    out = text.split("\n")
+    removed = False
+    for where, line in lines:
+        if (where, _boilerplate_key(line)) not in keys:
+            continue
+        hits = [j for j, t in enumerate(out) if t == line]
+        if hits:
+            del out[hits[0] if where == TOP else hits[-1]]
+            removed = True
+    if not removed:
+        return text
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(out)).strip()
+
+# ------------------------ Watchdog ------------------------
+
+# Quarantine reasons (see ExtractionTimeout and _run_pool)
+DOC_TIMEOUT = "doc_timeout"
+PAGE_TIMEOUT = "page_timeout"
+WORKER_DIED = "worker_died"
+
+_WATCHDOG = threading.local()  # .current: the Watchdog governing this thread, if any
+_IN_POOL_WORKER = False        # set by _init_worker; enables the RLIMIT_CPU backstop
+
+class ExtractionTimeout(Exception):
+    """A document or one of its pages ran past its wall-clock budget (see Watchdog).
+
+    Attributes:
+        reason: DOC_TIMEOUT or PAGE_TIMEOUT.
+        page: 0-based index of the page being extracted, if known.
+        budget_s: The budget that ran out, in seconds.
+    """
+
+    def __init__(self, reason: str, page: Optional[int] = None, budget_s: float = 0.0):
+        super().__init__(reason, page, budget_s)  # args must round-trip through pickle
+        self.reason, self.page, self.budget_s = reason, page, budget_s
+
+    def __str__(self):
+        where = f" on page {self.page + 1}" if self.page is not None else ""
+        what = "document" if self.reason == DOC_TIMEOUT else "page"
+        return f"{what} exceeded its {self.budget_s:g}s budget{where}"
+
+class Watchdog:
+    """Wall-clock budgets for one document and for each of its pages.
+
+    Use as a context manager around the extraction of one document (or page
+    range); iter_page_range calls watchdog_page at every page start. In a
+    process's main thread the budgets are enforced with SIGALRM: the timer is
+    re-armed at each page start for whichever deadline comes first, and the
+    handler raises ExtractionTimeout in whatever Python code is running.
+    Elsewhere (coordinator threads, thread pools) the same deadlines are only
+    checked at page boundaries.
+
+    A signal handler cannot interrupt one long C call (MuPDF stuck inside a
+    single get_text), so in pool workers the document budget is backed by an
+    RLIMIT_CPU soft limit WATCHDOG_CPU_GRACE_S above it: the kernel kills a
+    worker spinning past that and _run_pool reports the PDF as WORKER_DIED.
+
+    A watchdog entered while another governs the thread does nothing; the
+    outer one keeps its budgets.
+    """
+
+    def __init__(self, doc_s: Optional[float] = None, page_s: Optional[float] = None):
+        self.doc_s = DOC_TIMEOUT_S if doc_s is None else doc_s
+        self.page_s = PAGE_TIMEOUT_S if page_s is None else page_s
+        self.active = self.signals = False
+        self.page: Optional[int] = None
+        self.doc_deadline = self.page_deadline = None
+        self._prev_handler = self._prev_cpu = None
+
+    def __enter__(self) -> "Watchdog":
+        if getattr(_WATCHDOG, "current", None) is not None or (self.doc_s <= 0 and self.page_s <= 0):
+            return self
+        self.active = True
+        _WATCHDOG.current = self
+        if self.doc_s > 0:
+            self.doc_deadline = time.monotonic() + self.doc_s
+        self.signals = threading.current_thread() is threading.main_thread()
+        if self.signals:
+            self._prev_handler = signal.signal(signal.SIGALRM, self._fire)
+            self._arm()
+            if _IN_POOL_WORKER and self.doc_s > 0:
+                self._limit_cpu()
+        return self
+
+    def __exit__(self, *exc):
+        if not self.active:
+            return False
+        if self.signals:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._prev_handler)
+            if self._prev_cpu is not None:
+                resource.setrlimit(resource.RLIMIT_CPU, self._prev_cpu)
+        _WATCHDOG.current = None
+        return False
+
+    def page_started(self, i: Optional[int]):
+        """Check the deadlines, then start page i's budget (None: no page budget)."""
+        now = time.monotonic()
+        self.check(now)
+        self.page = i
+        self.page_deadline = now + self.page_s if self.page_s > 0 and i is not None else None
+        if self.signals:
+            self._arm(now)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left of the document budget (None = unlimited)."""
+        return None if self.doc_deadline is None else max(0.0, self.doc_deadline - time.monotonic())
+
+    def check(self, now: Optional[float] = None):
+        """Raise ExtractionTimeout if a deadline has passed."""
+        now = time.monotonic() if now is None else now
+        if self.doc_deadline is not None and now >= self.doc_deadline:
+            raise ExtractionTimeout(DOC_TIMEOUT, self.page, self.doc_s)
+        if self.page_deadline is not None and now >= self.page_deadline:
+            raise ExtractionTimeout(PAGE_TIMEOUT, self.page, self.page_s)
+
+    def _arm(self, now: Optional[float] = None):
+        deadlines = [d for d in (self.doc_deadline, self.page_deadline) if d is not None]
+        if deadlines:
+            now = time.monotonic() if now is None else now
+            signal.setitimer(signal.ITIMER_REAL, max(min(deadlines) - now, 0.001))
+        else:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    def _fire(self, signum, frame):
+        self.check(time.monotonic() + 0.001)  # the timer and the monotonic clock may disagree slightly
+        self._arm()
+
+    def _limit_cpu(self):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        limit = int(usage.ru_utime + usage.ru_stime + self.doc_s + WATCHDOG_CPU_GRACE_S) + 1
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        if soft == resource.RLIM_INFINITY or limit < soft:
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+            self._prev_cpu = (soft, hard)
+
+def watchdog_page(i: Optional[int]):
+    """Tell this thread's Watchdog (if any) that page i is starting."""
+    wd = getattr(_WATCHDOG, "current", None)
+    if wd is not None:
+        wd.page_started(i)
+
+def watchdog_remaining() -> Optional[float]:
+    """Seconds left of this thread's document budget (None = no budget)."""
+    wd = getattr(_WATCHDOG, "current", None)
+    return None if wd is None else wd.remaining()
+
+def watchdog_check():
+    """Raise ExtractionTimeout if this thread's Watchdog has run out."""
+    wd = getattr(_WATCHDOG, "current", None)
+    if wd is not None:
+        wd.check()
+
 # ------------------------ Extraction core ------------------------
 
+def split_page_ranges(page_count: int, range_pages: int) -> List[Tuple[int, int]]:
+    """Split [0, page_count) into contiguous (start, stop) ranges of at most range_pages."""
+    if range_pages <= 0 or page_count <= range_pages:
+        return [(0, page_count)]
+    return [(s, min(s + range_pages, page_count)) for s in range(0, page_count, range_pages)]
+
+# ------------------------ OCR process pool ------------------------
+
+_OCR_POOL: Optional[ProcessPoolExecutor] = None
+_OCR_POOL_KEY = None  # (pid, tunables) the pool was started with
+_OCR_POOL_LOCK = threading.Lock()
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """Return this process's OCR pool of OCR_WORKERS processes, creating it on first use.
+
+    The pool lives as long as the process that owns it (the main process of a
+    sequential run, or each extraction pool worker), so OCR processes start
+    once per run instead of once per PDF and keep their tesserocr engine warm
+    across documents. It is rebuilt when the tunables it was started with
+    change. Like the S3 client, a pool inherited through fork is never used.
+    """
+    global _OCR_POOL, _OCR_POOL_KEY
+    key = (os.getpid(), tuple(sorted(_worker_overrides().items())))
+    with _OCR_POOL_LOCK:
+        if _OCR_POOL is not None and _OCR_POOL_KEY != key:
+            if _OCR_POOL_KEY[0] == os.getpid():
+                _OCR_POOL.shutdown(wait=True, cancel_futures=True)
+            _OCR_POOL = None
+        if _OCR_POOL is None:
+            _OCR_POOL = ProcessPoolExecutor(max_workers=OCR_WORKERS, initializer=_init_worker,
+                                            initargs=(_worker_overrides(),))
+            _OCR_POOL_KEY = key
+        return _OCR_POOL
+
+def discard_ocr_pool(wait: bool = False):
+    """Shut down this process's OCR pool (if any); the next get_ocr_pool starts a new one."""
+    global _OCR_POOL, _OCR_POOL_KEY
+    with _OCR_POOL_LOCK:
+        pool, key = _OCR_POOL, _OCR_POOL_KEY
+        _OCR_POOL = _OCR_POOL_KEY = None
+    if pool is not None and key[0] == os.getpid():
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+class OcrWindow:
+    """Page-ordered OCR of one document's candidate pages on this process's OCR pool.
+
+    Candidates are added in page order and rendered here, then OCR'd by
+    get_ocr_pool() while the caller carries on. They are submitted only while
+    accepted + in-flight < MAX_OCR_PAGES, so the pages that end up OCR'd are
+    exactly those the inline loop would pick. A low-DPI pass that needs
+    escalating keeps its page pending and goes back to the head of the queue
+    at full DPI, so that still holds.
+
+    Attributes:
+        texts: {page_index: [layout_text, ocr_text_or_None]}, filled by the
+            caller; settle() sets ocr_text when OCR produced more text.
+        timings: {page_index: {"ocr_s", ...}}; settle() adds OCR seconds.
+        pending: Page indices queued or in flight (not yet safe to emit).
+        used: Accepted OCR results so far (the caller adds inline ones too).
+    """
+
+    def __init__(self, texts: Dict[int, List], timings: Dict[int, Dict]):
+        self.texts, self.timings = texts, timings
+        self.pending = set()
+        self.used = 0
+        self._queue: deque = deque()  # (page index, OCR_LOW | OCR_FULL) awaiting OCR, in page order
+        self._inflight: Dict = {}     # future -> (page index, kind)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._queue or self._inflight)
+
+    def add(self, i: int, kind: str):
+        """Queue page i for OCR (kind is OCR_LOW or OCR_FULL)."""
+        self._queue.append((i, kind))
+        self.pending.add(i)
+
+    def settle(self, block: bool):
+        """Collect finished OCR; with block, wait for at least one (under the document budget)."""
+        if self._inflight:
+            while True:
+                done, _ = wait(self._inflight, timeout=watchdog_remaining() if block else 0,
+                               return_when=FIRST_COMPLETED)
+                if done or not block:
+                    break
+                watchdog_check()  # the document budget ran out waiting for OCR
+            escalate = []
+            for fut in done:
+                i, kind = self._inflight.pop(fut)
+                result, secs = fut.result()
+                self.timings[i]["ocr_s"] += secs
+                if kind == OCR_LOW:
+                    candidate, conf = result
+                    if _needs_escalation(candidate, conf):
+                        escalate.append(i)  # still pending: goes back to the head of the queue
+                        continue
+                else:
+                    candidate = result
+                self.pending.discard(i)
+                if len(candidate.strip()) > len(self.texts[i][0].strip()):
+                    self.texts[i][1] = candidate
+                    self.used += 1
+            self._queue.extendleft((i, OCR_FULL) for i in sorted(escalate, reverse=True))
+        if self.used >= MAX_OCR_PAGES:
+            # Budget spent: queued candidates will never be submitted
+            self.pending.difference_update(i for i, _ in self._queue)
+            self._queue.clear()
+
+    def pump(self, doc: fitz.Document):
+        """Render and submit queued pages of doc while OCR workers and budget allow."""
+        while (self._queue and len(self._inflight) < OCR_WORKERS
+               and self.used + len(self._inflight) < MAX_OCR_PAGES):
+            i, kind = self._queue.popleft()
+            low = kind == OCR_LOW and OCR_LOW_DPI < OCR_DPI
+            pix, eff_dpi = render_page_for_ocr(doc.load_page(i), OCR_LOW_DPI if low else OCR_DPI)
+            samples, width, height, bpp, stride = ocr_image_from_pixmap(pix, copy=True)
+            del pix
+            fn = ocr_pixels_to_text_conf if low else ocr_pixels_to_text
+            fut = get_ocr_pool().submit(_timed_call, fn, samples, width, height, OCR_LANG, eff_dpi, bpp, stride)
+            self._inflight[fut] = (i, OCR_LOW if low else OCR_FULL)
+
+    def cancel(self):
+        """Drop in-flight work nobody will collect (the pool outlives the document)."""
+        for fut in self._inflight:
+            fut.cancel()
+
+def iter_page_range(pdf_path: Path,
+                    start: int,
+                    stop: int,
+                    pdf_bytes: Optional[bytes] = None,
+                    timings: Optional[Dict[int, Dict]] = None,
+                    bands: Optional[Dict[int, List[Tuple[str, str]]]] = None,
+                    ocr_candidates: Optional[Dict[int, str]] = None) -> Iterator[Tuple[int, str, Optional[str]]]:
+    """Extract text-layer (and, where needed, OCR) text for pages [start, stop).
+
+    Opens its own PyMuPDF handle so it can run in any worker process. OCR is
+    attempted on the same pages the sequential loop would consider, capped at
+    MAX_OCR_PAGES accepted results.
+
+    With ocr_candidates, no OCR runs here: every page that would be
+    considered for OCR is recorded as {page_index: kind} (classify_page's
+    result, or OCR_FULL) and yielded with ocr_text None. Page ranges of a
+    split document use this, so the caller can spend the document's single
+    MAX_OCR_PAGES budget in page order (see extract_pdf_to_records).
+
+    With OCR_WORKERS > 0, OCR candidates found during the layout pass are
+    rendered and queued to this process's OCR pool (get_ocr_pool, shared by
+    every document the process extracts) through an OcrWindow, while the
+    layout pass carries on with the following pages.
+
+    With OCR_CLASSIFY, classify_page decides per candidate whether to skip
+    OCR or to start at OCR_LOW_DPI / OCR_DPI (see ocr_page_classified).
+
+    Pages are yielded in order as soon as no OCR is pending at or before
+    them, so only the OCR window is ever held in memory.
+
+    Each page start is reported to the thread's Watchdog, if one is active,
+    so a page that overruns PAGE_TIMEOUT_S raises ExtractionTimeout.
+
+    Args:
+        pdf_path: Path to the PDF file on disk.
+        start: First page index (0-based, inclusive).
+        stop: Last page index (exclusive).
+        pdf_bytes: PDF contents, if held in memory instead of at pdf_path.
+        timings: If given, filled with {page_index: {"layout_s", "ocr_s",
+            "ocr_kind"}} (OCR time is measured where the OCR ran, so it
+            excludes time queued for the OCR pool).
+        bands: If given, filled with {page_index: band_lines(layout)} for
+            header/footer detection (see boilerplate_keys).
+        ocr_candidates: If given, filled with OCR candidates instead of
+            running OCR (see above).
+
+    Yields:
+        (page_index, layout_text, ocr_text_or_None), in page order.
+        ocr_text is only set when OCR produced more text than the layout pass.
+    """
+    texts: Dict[int, List] = {}  # page index -> [layout_text, ocr_text_or_None], until yielded
+    next_emit = start
+    if timings is None:
+        timings = {}
+    window = OcrWindow(texts, timings)  # only fed when OCR_WORKERS > 0
+
+    try:
+        with open_pdf(pdf_path, pdf_bytes) as doc:
+            for i in range(start, stop):
+                watchdog_page(i)
+                t0 = time.perf_counter()
+                page = doc.load_page(i)
+                layout = page_layout(page)
+                txt = layout_text(layout)
+                texts[i] = [txt, None]
+                if bands is not None:
+                    bands[i] = band_lines(layout)
+                timings[i] = {"layout_s": time.perf_counter() - t0, "ocr_s": 0.0, "ocr_kind": None}
+
+                needs_ocr = (
+                    ALLOW_OCR
+                    and len(txt.strip()) < MIN_TEXT_LEN
+                    and window.used < MAX_OCR_PAGES
+                )
+                if needs_ocr:
+                    kind = OCR_SKIP
+                    if len(layout) <= 2:
+                        kind = classify_page(page) if OCR_CLASSIFY else OCR_FULL
+                    if ocr_candidates is not None:
+                        ocr_candidates[i] = kind  # the caller decides, within the document budget
+                    else:
+                        timings[i]["ocr_kind"] = kind
+                    if kind != OCR_SKIP and ocr_candidates is None:
+                        if OCR_WORKERS > 0:
+                            window.add(i, kind)
+                        else:
+                            t0 = time.perf_counter()
+                            candidate = ocr_page_classified(page, kind, OCR_LANG)
+                            timings[i]["ocr_s"] = time.perf_counter() - t0
+                            if len(candidate.strip()) > len(txt.strip()):
+                                texts[i][1] = candidate
+                                window.used += 1
+
+                if window.busy:
+                    window.settle(block=False)
+                    window.pump(doc)
+                while next_emit <= i and next_emit not in window.pending:
+                    yield (next_emit, *texts.pop(next_emit))
+                    next_emit += 1
+
+            watchdog_page(None)  # the OCR drain is only under the document budget
+            while window.busy:
+                window.pump(doc)
+                window.settle(block=True)
+                while next_emit < stop and next_emit not in window.pending:
+                    yield (next_emit, *texts.pop(next_emit))
+                    next_emit += 1
+    except BrokenProcessPool:
+        discard_ocr_pool()  # an OCR process died; the next document gets a fresh pool
+        raise
+    finally:
+        window.cancel()
+
+def extract_page_range(pdf_path: Path,
+                       start: int,
+                       stop: int,
+                       pdf_bytes: Optional[bytes] = None,
+                       with_side: bool = False,
+                       defer_ocr: bool = False):
+    """List form of iter_page_range, for running a page range in a pool worker.
+
+    The range runs under its own Watchdog (DOC_TIMEOUT_S for the range,
+    PAGE_TIMEOUT_S per page); an ExtractionTimeout reaches the coordinator
+    through the future. Returns the page list, or (page_list, timings, bands)
+    when with_side is set. With defer_ocr the range runs no OCR and returns
+    (page_list, timings, bands, ocr_candidates).
+    """
+    timings: Dict[int, Dict] = {}
+    bands: Dict[int, List[Tuple[str, str]]] = {}
+    candidates: Optional[Dict[int, str]] = {} if defer_ocr else None
+    with Watchdog():
+        pages = list(iter_page_range(pdf_path, start, stop, pdf_bytes, timings, bands, candidates))
+    if defer_ocr:
+        return pages, timings, bands, candidates
+    return (pages, timings, bands) if with_side else pages
+
+def _timed_call(fn: Callable, *args):
+    """Run fn(*args) and return (result, seconds); used to time work done in pool processes."""
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+def _iter_records(pages: Iterable[Tuple[int, str, Optional[str]]],
+                  source_name: str,
+                  doc_id: str,
+                  ts: str,
+                  env: Optional[str],
+                  zone: Optional[str],
+                  state: Optional[str],
+                  county: Optional[str],
+                  timings: Optional[Dict[int, Dict]] = None) -> Iterator[Dict]:
+    """Build page records from iter_page_range output (in page order).
+
+    Applies the per-document MAX_OCR_PAGES budget: the first MAX_OCR_PAGES
+    pages with an accepted OCR result keep it, later ones fall back to their
+    layout text. Both the sequential and the split path already stop OCR at
+    that budget, so this is only a safeguard.
+    """
+    ocr_used = 0
+    for i, txt, txt_ocr in pages:
+        page_num = i + 1
+        is_ocr = False
+        if txt_ocr is not None and ocr_used < MAX_OCR_PAGES:
+            txt = txt_ocr
+            is_ocr = True
+            ocr_used += 1
+
+        t0 = time.perf_counter()
+        if APPLY_ENUMERATOR_CLEAN and txt:
+            txt = remove_orphan_enumerators(txt)
+        if timings is not None:
+            timings.setdefault(i, {}).update(clean_s=time.perf_counter() - t0, is_ocr=is_ocr)
+
+        yield {
+            "doc_id": doc_id,
+            "source_name": source_name,
+            "page": page_num,
+            "text": txt,
+            "is_ocr": is_ocr,
+            "char_len": len(txt),
+            "sha256": sha256_text(f"{source_name}|{page_num}|{txt}"),
+            "extracted_at": ts,
+            "env": as_str(env),
+            "zone": as_str(zone),
+            "state": as_str(state),
+            "county": as_str(county),
+        }
+
 def extract_pdf_to_records(pdf_path: Path,
                            env: Optional[str],
                            zone: Optional[str],
                            state: Optional[str],
-                           county: Optional[str]) -> List[Dict]:
-    """Extract text from every page of a PDF and return one record per page.
+                           county: Optional[str],
+                           executor: Optional[Executor] = None,
+                           range_pages: int = 0,
+                           pdf_bytes: Optional[bytes] = None,
+                           timings: Optional[Dict[int, Dict]] = None) -> Iterator[Dict]:
+    """Extract text from every page of a PDF, yielding one record per page.
 
     For each page, attempts layout-aware text extraction first. Falls back to
     OCR if the extracted text is shorter than MIN_TEXT_LEN and the page has
     very few text blocks (likely a scanned image). Optionally cleans orphan
     enumerators. Each record includes the text, metadata, and a content hash.
 
+    Records are produced lazily, in page order, so a writer can stream them
+    without holding the whole document in memory. With STRIP_BOILERPLATE,
+    the layout pass also collects each page's top/bottom band lines; once
+    the last page is in, lines recurring on most pages (running headers and
+    footers) are stripped from the layout text before any record is built,
+    so the document's page texts are held until then. OCR text is left as is.
+
+    Large documents can be split into page ranges: when an executor is given
+    and the document has more than range_pages pages, each range is submitted
+    as extract_page_range (which opens its own fitz handle) and the results
+    are merged back in page order. Ranges only run the layout pass and report
+    their OCR candidates; this thread then OCRs candidates in page order
+    while the merge streams, until MAX_OCR_PAGES are accepted, so the
+    document's OCR work is capped exactly as in the unsplit path and the
+    output is identical to it. With OCR_WORKERS > 0 the candidates go to
+    this process's OCR pool through an OcrWindow, as in iter_page_range;
+    otherwise each is OCR'd inline under PAGE_TIMEOUT_S. Waiting on a range
+    or on OCR counts against the calling thread's Watchdog budget.
+
+    When pdf_bytes is given the document is opened from memory; pdf_path is
+    then only used for source_name/doc_id, so records match the on-disk path.
+
     Args:
         pdf_path: Path to the PDF file on disk.
         env: Environment label (e.g. 'prod') written into each record.
         zone: Zone label (e.g. 'text') written into each record.
         state: State metadata for this document.
         county: County metadata for this document.
-
-    Returns:
-        List of dicts, one per page, with keys: doc_id, source_name, page,
-        text, is_ocr, char_len, sha256, extracted_at, env, zone, state, county.
+        executor: Optional process pool for page-range extraction.
+        range_pages: Max pages per range when splitting (0 = never split).
+        pdf_bytes: PDF contents, if held in memory instead of at pdf_path.
+        timings: If given, filled with per-page timings keyed by page index
+            (layout_s, ocr_s, ocr_kind from iter_page_range; clean_s, is_ocr).
+
+    Yields:
+        Dicts, one per page, with keys: doc_id, source_name, page, text,
+        is_ocr, char_len, sha256, extracted_at, env, zone, state, county.
     """
     source_name = pdf_path.name
     doc_id = hashlib.sha1(str(pdf_path).encode("utf-8")).hexdigest()[:20]
     ts = now_iso()
-    records: List[Dict] = []
-    ocr_used = 0
 
-    with fitz.open(str(pdf_path)) as doc:
-        for i in range(doc.page_count):
-            page = doc.load_page(i)
-            page_num = i + 1
+    with open_pdf(pdf_path, pdf_bytes) as doc:
+        page_count = doc.page_count
 
-            txt = page_text_layout(page)
-            is_ocr = False
+    bands: Optional[Dict[int, List[Tuple[str, str]]]] = {} if STRIP_BOILERPLATE else None
 
-            needs_ocr = (
-                ALLOW_OCR
-                and len(txt.strip()) < MIN_TEXT_LEN
-                and ocr_used < MAX_OCR_PAGES
-            )
-            if needs_ocr:
-                items = _collect_items_dict(page)
-                if len(items) <= 2:
-                    txt_ocr = ocr_page_to_text(page, OCR_DPI, OCR_LANG)
-                    if len(txt_ocr.strip()) > len(txt.strip()):
-                        txt = txt_ocr
-                        is_ocr = True
-                        ocr_used += 1
-
-            if APPLY_ENUMERATOR_CLEAN and txt:
-                txt = remove_orphan_enumerators(txt)
-
-            rec = {
-                "doc_id": doc_id,
-                "source_name": source_name,
-                "page": page_num,
-                "text": txt,
-                "is_ocr": is_ocr,
-                "char_len": len(txt),
-                "sha256": sha256_text(f"{source_name}|{page_num}|{txt}"),
-                "extracted_at": ts,
-                "env": as_str(env),
-                "zone": as_str(zone),
-                "state": as_str(state),
-                "county": as_str(county),
-            }
-            records.append(rec)
+    def stripped(pages):
+        pages = list(pages)  # every page's bands are needed before the first record
+        keys = boilerplate_keys(bands)
+        for i, txt, txt_ocr in pages:
+            yield i, strip_boilerplate(txt, bands.get(i, []), keys) if keys else txt, txt_ocr
 
-    return records
+    ranges = split_page_ranges(page_count, range_pages) if executor is not None else [(0, page_count)]
+    if len(ranges) == 1:
+        pages = iter_page_range(pdf_path, 0, page_count, pdf_bytes, timings, bands)
+        if bands is not None:
+            pages = stripped(pages)
+        yield from _iter_records(pages, source_name, doc_id, ts, env, zone, state, county, timings)
+        return
+
+    futures = [executor.submit(extract_page_range, pdf_path, start, stop, pdf_bytes, True, True)
+               for start, stop in ranges]
+
+    def merged():
+        page_timings = timings if timings is not None else {}
+        texts: Dict[int, List] = {}  # page index -> [layout_text, ocr_text_or_None], until yielded
+        window = OcrWindow(texts, page_timings)  # only fed when OCR_WORKERS > 0
+        next_emit = 0
+        ocr_doc = None  # opened on the first OCR candidate
+        try:
+            for fut in futures:
+                while True:
+                    try:
+                        result = fut.result(timeout=watchdog_remaining())
+                        break
+                    except TimeoutError:
+                        watchdog_check()  # the document budget ran out waiting for this range
+                result, range_timings, range_bands, candidates = result
+                page_timings.update(range_timings)
+                if bands is not None:
+                    bands.update(range_bands)
+                for i, txt, _ in result:
+                    texts[i] = [txt, None]
+                    kind = candidates.get(i)
+                    if kind is not None and window.used < MAX_OCR_PAGES:
+                        page_timings[i]["ocr_kind"] = kind
+                        if kind != OCR_SKIP:
+                            if ocr_doc is None:
+                                ocr_doc = open_pdf(pdf_path, pdf_bytes)
+                            if OCR_WORKERS > 0:
+                                window.add(i, kind)
+                            else:
+                                watchdog_page(i)
+                                t0 = time.perf_counter()
+                                candidate = ocr_page_classified(ocr_doc.load_page(i), kind, OCR_LANG)
+                                page_timings[i]["ocr_s"] = time.perf_counter() - t0
+                                watchdog_page(None)
+                                if len(candidate.strip()) > len(txt.strip()):
+                                    texts[i][1] = candidate
+                                    window.used += 1
+                    if window.busy:
+                        window.settle(block=False)
+                        window.pump(ocr_doc)
+                    while next_emit <= i and next_emit not in window.pending:
+                        yield (next_emit, *texts.pop(next_emit))
+                        next_emit += 1
+
+            while window.busy:
+                window.pump(ocr_doc)
+                window.settle(block=True)
+                while next_emit < page_count and next_emit not in window.pending:
+                    yield (next_emit, *texts.pop(next_emit))
+                    next_emit += 1
+        except BrokenProcessPool:
+            discard_ocr_pool()  # an OCR process died; the next document gets a fresh pool
+            raise
+        finally:
+            window.cancel()
+            if ocr_doc is not None:
+                ocr_doc.close()
+
+    try:
+        pages = merged() if bands is None else stripped(merged())
+        yield from _iter_records(pages, source_name, doc_id, ts, env, zone, state, county, timings)
+    finally:
+        for fut in futures:
+            fut.cancel()
+
+# ------------------------ Chunking ------------------------
+
+PAGE_JOINER = "\n\n"  # placed between consecutive pages in the chunk stream
+
+def _chunk_end(buf: str, start: int, size: int) -> int:
+    """End of the window starting at start: start + size, pulled back to the last
+    whitespace in its second half so words are not cut (hard cut if there is none)."""
+    end = start + size
+    if end >= len(buf):
+        return len(buf)
+    cut = max(buf.rfind(" ", start + size // 2, end), buf.rfind("\n", start + size // 2, end))
+    return cut + 1 if cut > 0 else end
+
+def chunk_records(pages: Iterable[Dict],
+                  chunk_size: int,
+                  chunk_overlap: int) -> Iterator[Dict]:
+    """Sliding-window chunker over a document's page records, streamed.
+
+    Page texts are treated as one stream (pages joined by PAGE_JOINER), so a
+    chunk can cross a page boundary; each chunk records the page it starts on
+    and the page it ends on. Windows are chunk_size characters, ending at the
+    last whitespace in their second half, and consecutive windows overlap by
+    chunk_overlap characters. Only the text not yet fully chunked is
+    buffered, so memory stays around one page plus one window.
+
+    Args:
+        pages: Page records in page order (extract_pdf_to_records output).
+        chunk_size: Maximum characters per chunk (> 0).
+        chunk_overlap: Characters shared by consecutive chunks (< chunk_size).
+
+    Yields:
+        Dicts with keys: id, doc_id, source_name, chunk_index, page, end_page,
+        text, char_len, sha256, extracted_at, env, zone ('text_chunk'), state,
+        county.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError(f"chunk overlap ({chunk_overlap}) must be smaller than chunk size ({chunk_size})")
+
+    buf = ""                             # unchunked tail of the stream
+    base = 0                             # stream offset of buf[0]
+    starts: List[int] = []               # stream offset where each page's text begins
+    page_nums: List[int] = []
+    first: Optional[Dict] = None
+    index = 0
+    start = 0                            # next window start, relative to buf
+
+    def page_at(offset: int) -> int:
+        lo, hi = 0, len(starts) - 1
+        while lo < hi:                   # last page starting at or before offset
+            mid = (lo + hi + 1) // 2
+            if starts[mid] <= offset:
+                lo = mid
+            else:
+                hi = mid - 1
+        return page_nums[lo]
+
+    def emit(end: int) -> Optional[Dict]:
+        nonlocal index
+        raw = buf[start:end]
+        text = raw.strip()
+        if not text:
+            return None
+        lead = len(raw) - len(raw.lstrip())
+        first_char = base + start + lead
+        last_char = first_char + len(text) - 1
+        stem = os.path.splitext(first["source_name"])[0]
+        rec = {
+            "id": f"{first['state'] or ''}_{first['county'] or ''}_{stem}_{index}",
+            "doc_id": first["doc_id"],
+            "source_name": first["source_name"],
+            "chunk_index": index,
+            "page": page_at(first_char),
+            "end_page": page_at(last_char),
+            "text": text,
+            "char_len": len(text),
+            "sha256": sha256_text(f"{first['source_name']}|chunk{index}|{text}"),
+            "extracted_at": first["extracted_at"],
+            "env": first["env"],
+            "zone": "text_chunk",
+            "state": first["state"],
+            "county": first["county"],
+        }
+        index += 1
+        return rec
+
+    for rec in pages:
+        if first is None:
+            first = rec
+        elif buf:
+            buf += PAGE_JOINER
+        starts.append(base + len(buf))
+        page_nums.append(rec["page"])
+        buf += rec["text"] or ""
+
+        # Emit every window that is complete; the last one waits for more text
+        while len(buf) - start > chunk_size:
+            end = _chunk_end(buf, start, chunk_size)
+            out = emit(end)
+            if out is not None:
+                yield out
+            start = max(start + 1, end - chunk_overlap)
+        if start > 0:
+            base += start
+            buf = buf[start:]
+            start = 0
+
+    if first is not None:
+        out = emit(len(buf))
+        if out is not None:
+            yield out
+
+def chunk_path_for(out_path: str) -> str:
+    """Chunk parquet for a page parquet, always in a directory of its own.
+
+    zone=text → zone=text_chunk for partitioned outputs; flat outputs get a
+    zone=text_chunk/ subdirectory, so no partition mixes page and chunk
+    schemas. *_text → *_chunks.
+    """
+    head, name = os.path.split(out_path) if not out_path.startswith("s3://") else out_path.rsplit("/", 1)
+    stem = name[:-len("_text.parquet")] if name.endswith("_text.parquet") else os.path.splitext(name)[0]
+    sep = "/" if out_path.startswith("s3://") else os.sep
+    parts = head.split(sep) if head else []
+    if "zone=text" in parts:
+        parts = ["zone=text_chunk" if part == "zone=text" else part for part in parts]
+    else:
+        parts.append("zone=text_chunk")
+    return f"{sep.join(parts)}{sep}{stem}_chunks.parquet"
 
 # ------------------------ Parquet write ------------------------
 
-def write_parquet(records: List[Dict], out_path: str):
-    """Write a list of page records to a Parquet file, locally or on S3.
+RECORD_SCHEMA = pa.schema([
+    ("doc_id", pa.string()),
+    ("source_name", pa.string()),
+    ("page", pa.int64()),
+    ("text", pa.string()),
+    ("is_ocr", pa.bool_()),
+    ("char_len", pa.int64()),
+    ("sha256", pa.string()),
+    ("extracted_at", pa.string()),
+    ("env", pa.string()),
+    ("zone", pa.string()),
+    ("state", pa.string()),
+    ("county", pa.string()),
+    ("dup_of", pa.string()),       # set by `main.py dedup` (see dedup_main)
+])
+
+CHUNK_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("doc_id", pa.string()),
+    ("source_name", pa.string()),
+    ("chunk_index", pa.int64()),
+    ("page", pa.int64()),
+    ("end_page", pa.int64()),
+    ("text", pa.string()),
+    ("char_len", pa.int64()),
+    ("sha256", pa.string()),
+    ("extracted_at", pa.string()),
+    ("env", pa.string()),
+    ("zone", pa.string()),
+    ("state", pa.string()),
+    ("county", pa.string()),
+    ("dup_of", pa.string()),
+])
+
+def parquet_write_options(schema: pa.Schema) -> Dict:
+    """Keyword arguments for pq.ParquetWriter / pq.write_table used for every data file.
+
+    zstd at PARQUET_COMPRESSION_LEVEL; dictionary encoding only for the
+    PARQUET_DICT_COLUMNS present in schema (text and hashes stay plain, where
+    a dictionary would only be abandoned after costing a page of fallback);
+    min/max statistics and the page index for every column but text, so
+    readers can prune row groups and pages by doc_id, source_name or page.
+    """
+    codec = PARQUET_COMPRESSION.lower()
+    return {
+        "compression": codec,
+        "compression_level": PARQUET_COMPRESSION_LEVEL if codec in ("zstd", "gzip", "brotli") else None,
+        "use_dictionary": [c for c in PARQUET_DICT_COLUMNS if c in schema.names],
+        "write_statistics": [c for c in schema.names if c not in PARQUET_NO_STATS_COLUMNS],
+        "write_page_index": PARQUET_PAGE_INDEX,
+    }
+
+class ParquetRecordWriter:
+    """Incremental Parquet writer for record dicts, local or S3.
+
+    Records are buffered and flushed as one row group every ROW_GROUP_PAGES
+    records, so peak memory is bounded by the row group rather than the
+    document; files use parquet_write_options. The file is only opened on
+    the first record. Local files are written to <out>.tmp and renamed into
+    place by close(); S3 outputs are spooled to a temp file and uploaded
+    through the shared boto3 client (multipart above S3_PART_MB) by close().
+    abort() discards everything, so a failed document never leaves a
+    partial parquet behind.
+
+    With defer_upload, an S3 output is spooled to a named temp file instead
+    and close() returns without uploading; pending_upload then holds
+    (spool_path, out_path) for a BackgroundUploader, which owns (and
+    deletes) the spool from then on.
+
+    write_s (encoding and local writes), upload_s and out_bytes are kept
+    for the run metrics.
+    """
 
-    Converts records to a Pandas DataFrame, casts partition columns to string
-    type, then writes via PyArrow. For S3 paths, uses pyarrow.fs.S3FileSystem
-    with credentials from environment variables.
+    def __init__(self, out_path: str, schema: pa.Schema = RECORD_SCHEMA, defer_upload: bool = False):
+        self.out_path = out_path if out_path.startswith("s3://") else str(Path(out_path))
+        self.schema = schema
+        self.defer_upload = defer_upload and self.out_path.startswith("s3://")
+        self.pending_upload: Optional[Tuple[str, str]] = None
+        self.rows = 0
+        self.write_s = 0.0
+        self.upload_s = 0.0
+        self.out_bytes = 0
+        self._batch: List[Dict] = []
+        self._sink = None
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def _open(self):
+        if self.defer_upload:
+            self._sink = tempfile.NamedTemporaryFile(prefix="pdf-upload-", suffix=".parquet", delete=False)
+        elif self.out_path.startswith("s3://"):
+            self._sink = tempfile.TemporaryFile(prefix="pdf-extract-", suffix=".parquet")
+        else:
+            os.makedirs(os.path.dirname(self.out_path) or ".", exist_ok=True)
+            self._sink = self.out_path + ".tmp"
+        self._writer = pq.ParquetWriter(self._sink, self.schema, **parquet_write_options(self.schema))
+
+    def _flush(self):
+        if self._batch:
+            t0 = time.perf_counter()
+            self._writer.write_batch(pa.RecordBatch.from_pylist(self._batch, schema=self.schema))
+            self.write_s += time.perf_counter() - t0
+            self.rows += len(self._batch)
+            self._batch = []
+
+    @property
+    def started(self) -> bool:
+        """Whether any record has been written (i.e. close() will produce a file)."""
+        return self._writer is not None
+
+    def write(self, record: Dict):
+        if self._writer is None:
+            self._open()
+        self._batch.append(record)
+        if len(self._batch) >= ROW_GROUP_PAGES:
+            self._flush()
+
+    def close(self) -> int:
+        """Finish the file and move it into place. Returns the rows written."""
+        if self._writer is None:
+            print(f"[warn] No records to write for {self.out_path}")
+            return 0
+        try:
+            self._flush()
+            t0 = time.perf_counter()
+            self._writer.close()
+            self.write_s += time.perf_counter() - t0
+            if self.defer_upload:
+                self.out_bytes = self._sink.tell()
+                self._sink.close()
+                self.pending_upload = (self._sink.name, self.out_path)
+                self._sink = None  # handed over: abort() must not delete it
+                print(f"[ok] wrote {self.rows} rows → {self.out_path} (upload queued)")
+                return self.rows
+            if self.out_path.startswith("s3://"):
+                bucket, key = split_s3_uri(self.out_path)
+                self.out_bytes = self._sink.tell()
+                self._sink.seek(0)
+                t0 = time.perf_counter()
+                get_s3_client().upload_fileobj(self._sink, bucket, key, Config=s3_transfer_config())
+                self.upload_s = time.perf_counter() - t0
+            else:
+                self.out_bytes = os.path.getsize(self._sink)
+                os.replace(self._sink, self.out_path)
+        finally:
+            self.abort()
+        print(f"[ok] wrote {self.rows} rows → {self.out_path}")
+        return self.rows
+
+    def abort(self):
+        """Drop whatever was written so far (temp file or spool)."""
+        if self._writer is not None:
+            self._writer.close()
+        if isinstance(self._sink, str):
+            if os.path.exists(self._sink):
+                os.remove(self._sink)
+        elif self._sink is not None:
+            self._sink.close()
+            if self.defer_upload and os.path.exists(self._sink.name):
+                os.remove(self._sink.name)
+        self._writer = self._sink = None
+
+def write_parquet(records: Iterable[Dict], out_path: str, schema: pa.Schema = RECORD_SCHEMA) -> int:
+    """Stream records into a Parquet file, locally or on S3.
+
+    Records are consumed lazily through a ParquetRecordWriter using the
+    fixed schema (RECORD_SCHEMA for page records), one row group every
+    ROW_GROUP_PAGES records.
 
     Args:
-        records: List of page record dicts from extract_pdf_to_records.
+        records: Record dicts (any iterable, e.g. extract_pdf_to_records).
         out_path: Destination path — either a local file path or an s3:// URI.
+        schema: Arrow schema of the records.
+
+    Returns:
+        Number of rows written (0 if there were no records; no file is written).
     """
-    if not records:
-        print(f"[warn] No records to write for {out_path}")
-        return
-    df = pd.DataFrame.from_records(records)
-    for col in ("env", "zone", "state", "county", "source_name"):
-        if col in df.columns:
-            df[col] = df[col].astype("string")
-    table = pa.Table.from_pandas(df, preserve_index=False)
-
-    if out_path.startswith("s3://"):
-        if pafs is None:
-            raise RuntimeError("pyarrow.fs is not available; cannot write to S3")
-        _, _, rest = out_path.partition("s3://")
-        bucket, _, key = rest.partition("/")
-        fs = pafs.S3FileSystem(
-            region=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1")),
-            access_key=os.getenv("AWS_ACCESS_KEY_ID"),
-            secret_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        )
-        with fs.open_output_stream(f"{bucket}/{key}") as sink:
-            pq.write_table(table, sink)
-        print(f"[ok] wrote {len(df)} rows → {out_path}")
-    else:
-        out_path = str(Path(out_path))
-        os.makedirs(os.path.dirname(out_path), exist_ok=True)
-        pq.write_table(table, out_path)
-        print(f"[ok] wrote {len(df)} rows → {out_path}")
+    writer = ParquetRecordWriter(out_path, schema)
+    try:
+        for rec in records:
+            writer.write(rec)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
 
 # ------------------------ S3 helpers ------------------------
 
+_S3_CLIENT = None
+_S3_CLIENT_PID = None
+_S3_CLIENT_LOCK = threading.Lock()
+
+def get_s3_client():
+    """Return this process's shared S3 client, creating it on first use.
+
+    One client (and so one connection pool and one credential resolution) is
+    shared by every S3 helper and download thread in a process. boto3 clients
+    are thread-safe but not fork-safe, so pool workers build their own.
+    """
+    global _S3_CLIENT, _S3_CLIENT_PID
+    with _S3_CLIENT_LOCK:
+        if _S3_CLIENT is None or _S3_CLIENT_PID != os.getpid():
+            session = boto3.session.Session()
+            _S3_CLIENT = session.client(
+                "s3",
+                region_name=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1")),
+                config=Config(max_pool_connections=S3_MAX_POOL, retries={"mode": "adaptive"}),
+            )
+            _S3_CLIENT_PID = os.getpid()
+        return _S3_CLIENT
+
+def s3_transfer_config() -> TransferConfig:
+    """Transfer settings: objects above S3_PART_MB move as concurrent ranged parts."""
+    part = S3_PART_MB * 1024 * 1024
+    return TransferConfig(multipart_threshold=part,
+                          multipart_chunksize=part,
+                          max_concurrency=S3_RANGE_CONCURRENCY)
+
+class BackgroundUploader:
+    """Bounded background upload stage for spooled S3 outputs.
+
+    Writers created with defer_upload leave their finished parquet in a temp
+    file; the parent submits it here and moves on to the next PDF while the
+    upload (multipart, S3_RANGE_CONCURRENCY parts at a time, through the
+    shared client) runs on one of `workers` threads. At most max_pending
+    uploads are queued or running: submit() blocks beyond that, so spooled
+    outputs cannot pile up on disk when S3 is slower than extraction. Each
+    spool is deleted once its upload finishes, whether or not it succeeded.
+
+    Args:
+        workers: Upload threads.
+        max_pending: Uploads queued or in flight before submit() blocks.
+    """
+
+    def __init__(self, workers: int = UPLOAD_WORKERS, max_pending: int = UPLOAD_QUEUE):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="upload")
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+
+    @staticmethod
+    def _upload(spool_path: str, out_path: str) -> float:
+        bucket, key = split_s3_uri(out_path)
+        t0 = time.perf_counter()
+        try:
+            get_s3_client().upload_file(spool_path, bucket, key, Config=s3_transfer_config())
+        finally:
+            os.remove(spool_path)
+        return time.perf_counter() - t0
+
+    def submit(self, spool_path: str, out_path: str) -> Future:
+        """Queue one upload; the future's result is its duration in seconds."""
+        self._slots.acquire()
+        try:
+            fut = self._pool.submit(self._upload, spool_path, out_path)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+    def close(self):
+        """Wait for every queued upload to finish."""
+        self._pool.shutdown(wait=True)
+
 def discover_local_pdfs(input_path: Path) -> List[Path]:
     """Find PDF files from a local path.
 
@@ -495,20 +1917,32 @@ def list_s3_pdfs(bucket: str, prefix: str) -> List[str]:
     Returns:
         List of S3 keys ending in '.pdf'.
     """
-    s3 = boto3.client("s3", region_name=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1")))
-    keys = []
-    paginator = s3.get_paginator("list_objects_v2")
+    return [obj["key"] for obj in list_s3_pdf_objects(bucket, prefix)]
+
+def list_s3_pdf_objects(bucket: str, prefix: str) -> List[Dict]:
+    """List PDF objects under an S3 prefix with their ETag and size.
+
+    Args:
+        bucket: S3 bucket name.
+        prefix: Key prefix to search under (e.g. 'input/pdfs/').
+
+    Returns:
+        List of dicts with keys 'key', 'etag' (quotes stripped) and 'size'.
+    """
+    objs = []
+    paginator = get_s3_client().get_paginator("list_objects_v2")
     for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
         for obj in page.get("Contents", []) or []:
             k = obj["Key"]
             if k.lower().endswith(".pdf"):
-                keys.append(k)
-    return keys
+                objs.append({"key": k, "etag": obj.get("ETag", "").strip('"'), "size": obj.get("Size", 0)})
+    return objs
 
 def download_s3_object(bucket: str, key: str, local_dir: Path) -> Path:
     """Download a single S3 object to a local directory.
 
     The filename is sanitized via slugify_filename to avoid filesystem issues.
+    Objects larger than S3_PART_MB are fetched as concurrent ranged GETs.
 
     Args:
         bucket: S3 bucket name.
@@ -520,10 +1954,40 @@ def download_s3_object(bucket: str, key: str, local_dir: Path) -> Path:
     """
     local_dir.mkdir(parents=True, exist_ok=True)
     local_file = local_dir / slugify_filename(os.path.basename(key))
-    s3 = boto3.client("s3", region_name=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1")))
-    s3.download_file(bucket, key, str(local_file))
+    get_s3_client().download_file(bucket, key, str(local_file), Config=s3_transfer_config())
     return local_file
 
+def fetch_s3_pdf(bucket: str,
+                 key: str,
+                 local_dir: Path,
+                 inmem_max_bytes: int = 0) -> Tuple[Path, Optional[bytes]]:
+    """Fetch an S3 PDF into memory if it is small enough, otherwise to disk.
+
+    Objects up to inmem_max_bytes are downloaded into a memory buffer (as
+    concurrent ranged GETs above S3_PART_MB) and never touch local disk;
+    larger ones (or all, when inmem_max_bytes is 0) go through
+    download_s3_object. For in-memory objects the returned path
+    is where the file *would* have been written, so source_name and doc_id are
+    the same in both modes.
+
+    Args:
+        bucket: S3 bucket name.
+        key: Full S3 object key.
+        local_dir: Local directory used for the on-disk fallback.
+        inmem_max_bytes: Largest object kept in memory (0 = always use disk).
+
+    Returns:
+        Tuple of (local_path, pdf_bytes_or_None).
+    """
+    if inmem_max_bytes > 0:
+        s3 = get_s3_client()
+        size = s3.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        if size <= inmem_max_bytes:
+            buf = io.BytesIO()
+            s3.download_fileobj(bucket, key, buf, Config=s3_transfer_config())
+            return local_dir / slugify_filename(os.path.basename(key)), buf.getvalue()
+    return download_s3_object(bucket, key, local_dir), None
+
 # ------------------------ Output mapping for S3 inputs ------------------------
 
 # TODO: change these functions to not be specific to their directory structure and ultimately to also not write to s3
@@ -566,6 +2030,1500 @@ def build_out_key_from_input(input_bucket: str, input_key: str, out_base: str) -
     out_key = f"{out_key_base}/zone=text/state={state}/county={county}/{stem}"
     return f"s3://{out_bucket}/{out_key}"
 
+# ------------------------ Incremental manifest ------------------------
+
+# Bump whenever a change alters extracted output, so the next run re-extracts everything.
+# Options that change output are hashed into the manifest key separately (see extractor_version).
+EXTRACTOR_VERSION = "2"
+MANIFEST_NAME = "_extract_manifest.parquet"
+MANIFEST_FLUSH_EVERY = 100  # save the manifest every N finished PDFs, so a crashed run can resume
+QUARANTINE_NAME = "_quarantine.parquet"  # PDFs that timed out or killed their worker (see skip_quarantined)
+
+MANIFEST_SCHEMA = pa.schema([
+    ("input_key", pa.string()),
+    ("etag", pa.string()),
+    ("size", pa.int64()),
+    ("output_path", pa.string()),
+    ("chunk_path", pa.string()),         # chunk parquet (null when the run wrote no chunks)
+    ("extractor_version", pa.string()),
+    ("page_count", pa.int64()),
+    ("extracted_at", pa.string()),
+])
+
+QUARANTINE_SCHEMA = pa.schema([
+    ("input_key", pa.string()),
+    ("etag", pa.string()),
+    ("size", pa.int64()),
+    ("reason", pa.string()),     # DOC_TIMEOUT | PAGE_TIMEOUT | WORKER_DIED
+    ("page", pa.int64()),        # 1-based page a timeout hit (null when unknown)
+    ("error", pa.string()),
+    ("attempts", pa.int64()),    # runs that have given up on this input so far
+    ("failed_at", pa.string()),
+])
+
+def extractor_version() -> str:
+    """Manifest version key: EXTRACTOR_VERSION plus a hash of the output-affecting options.
+
+    Turning on --strip-boilerplate, --layout-mode fast, --ocr-classify,
+    chunking or OCR (or changing their settings) changes what a PDF
+    extracts to, so entries written under other options do not match and
+    those PDFs are re-extracted instead of mixing old and new output.
+    """
+    opts = {
+        "allow_ocr": ALLOW_OCR, "min_text_len": MIN_TEXT_LEN, "max_ocr_pages": MAX_OCR_PAGES,
+        "ocr_dpi": OCR_DPI, "ocr_lang": OCR_LANG, "ocr_classify": OCR_CLASSIFY,
+        "strip_boilerplate": STRIP_BOILERPLATE, "layout_mode": LAYOUT_MODE, "max_columns": MAX_COLUMNS,
+        "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP if CHUNK_SIZE > 0 else 0,
+    }
+    digest = hashlib.sha256(json.dumps(opts, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return f"{EXTRACTOR_VERSION}-{digest}"
+
+def input_key_for(task: Tuple) -> str:
+    """Stable manifest key for a task: s3://bucket/key, or the resolved local path."""
+    local_pdf, src_bucket, src_key = task[:3]
+    if src_bucket and src_key:
+        return f"s3://{src_bucket}/{src_key}"
+    return str(Path(local_pdf).resolve())
+
+def source_name_for(input_key: str) -> str:
+    """The source_name an input's records carry (S3 downloads are slugified, see download_s3_object)."""
+    if is_s3_uri(input_key):
+        return slugify_filename(os.path.basename(input_key))
+    return Path(input_key).name
+
+def local_fingerprint(path: Path) -> Tuple[str, int]:
+    """(etag, size) stand-in for local files: mtime and size, which change on rewrite."""
+    st = path.stat()
+    return f"{st.st_mtime_ns:x}-{st.st_size}", st.st_size
+
+def manifest_path_for(out_base: str, writer: str = "", name: str = MANIFEST_NAME) -> Optional[str]:
+    """Where the manifest for an --out lives (None when --out is a single parquet file).
+
+    Concurrent tasks (--shard-count/--queue) each pass a writer id and get
+    their own _extract_manifest.<writer>.parquet, so no two tasks ever
+    rewrite the same object; readers merge them with load_manifests. The
+    quarantine list (name=QUARANTINE_NAME) is kept the same way.
+    """
+    if out_base.lower().endswith(".parquet"):
+        return None
+    if writer:
+        name = name.replace(".parquet", f".{writer}.parquet")
+    return out_base.rstrip("/") + "/" + name
+
+def manifest_paths(out_base: str, name: str = MANIFEST_NAME) -> List[str]:
+    """Every manifest file (shared and per-writer) directly under an --out base."""
+    stem = name[:-len(".parquet")]
+    if out_base.startswith("s3://"):
+        bucket, prefix = split_s3_uri(out_base)
+        prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        paths = []
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix + stem, Delimiter="/"):
+            for obj in page.get("Contents", []) or []:
+                if obj["Key"].endswith(".parquet"):
+                    paths.append(f"s3://{bucket}/{obj['Key']}")
+        return sorted(paths)
+    return sorted(str(p) for p in Path(out_base).glob(stem + "*.parquet"))
+
+def load_manifests(out_base: str, name: str = MANIFEST_NAME, stamp: str = "extracted_at") -> Dict[str, Dict]:
+    """Merge every manifest file under out_base; the newest entry (by stamp) per input wins."""
+    merged: Dict[str, Dict] = {}
+    for path in manifest_paths(out_base, name):
+        for key, entry in load_manifest(path).items():
+            if key not in merged or entry[stamp] > merged[key][stamp]:
+                merged[key] = entry
+    return merged
+
+def load_manifest(path: str) -> Dict[str, Dict]:
+    """Read a manifest into {input_key: entry}; a missing manifest is empty.
+
+    Entries have keys: input_key, etag, size, output_path, chunk_path,
+    extractor_version, page_count, extracted_at (chunk_path is None in
+    manifests written before it existed).
+    """
+    try:
+        if path.startswith("s3://"):
+            bucket, key = split_s3_uri(path)
+            body = get_s3_client().get_object(Bucket=bucket, Key=key)["Body"].read()
+            table = pq.read_table(pa.BufferReader(body))
+        elif os.path.exists(path):
+            table = pq.read_table(path, partitioning=None)
+        else:
+            return {}
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return {}
+        raise
+    return {row["input_key"]: row for row in table.to_pylist()}
+
+def save_manifest(entries: Dict[str, Dict], path: str, schema: pa.Schema = MANIFEST_SCHEMA):
+    """Write the manifest entries as a single parquet file (local or S3)."""
+    table = pa.Table.from_pylist(sorted(entries.values(), key=lambda e: e["input_key"]), schema=schema)
+    if path.startswith("s3://"):
+        bucket, key = split_s3_uri(path)
+        sink = pa.BufferOutputStream()
+        pq.write_table(table, sink)
+        get_s3_client().put_object(Bucket=bucket, Key=key, Body=sink.getvalue().to_pybytes())
+    else:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        pq.write_table(table, path)
+
+def existing_outputs(out_base: str) -> set:
+    """All object paths currently under an s3:// --out (one paginated LIST, not a HEAD per file)."""
+    bucket, prefix = split_s3_uri(out_base)
+    prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+    found = set()
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []) or []:
+            found.add(f"s3://{bucket}/{obj['Key']}")
+    return found
+
+def skip_unchanged(tasks: List[Tuple],
+                   fingerprints: Dict[str, Tuple[str, int]],
+                   manifest: Dict[str, Dict],
+                   out_base: str) -> Tuple[List[Tuple], int]:
+    """Drop tasks whose input is unchanged since the manifest entry and whose output still exists.
+
+    Runs before any download. An entry only matches when the ETag, size and
+    extractor_version() (code version and output-affecting options) all agree;
+    with CHUNK_SIZE > 0 its chunk parquet must exist as well.
+
+    Returns:
+        Tuple of (remaining_tasks, skipped_count).
+    """
+    version = extractor_version()
+    candidates = []
+    for task in tasks:
+        ikey = input_key_for(task)
+        entry = manifest.get(ikey)
+        fp = fingerprints.get(ikey)
+        unchanged = (
+            entry is not None and fp is not None
+            and entry["etag"] == fp[0]
+            and entry["size"] == fp[1]
+            and entry["extractor_version"] == version
+        )
+        candidates.append((task, entry if unchanged else None))
+
+    if not any(entry for _, entry in candidates):
+        return tasks, 0
+
+    if out_base.startswith("s3://"):
+        present = existing_outputs(out_base)
+        exists = lambda p: p in present
+    else:
+        exists = os.path.exists
+
+    def outputs_exist(entry):
+        if not exists(entry["output_path"]):
+            return False
+        return CHUNK_SIZE <= 0 or (entry.get("chunk_path") is not None and exists(entry["chunk_path"]))
+
+    remaining = [task for task, entry in candidates if not (entry and outputs_exist(entry))]
+    return remaining, len(tasks) - len(remaining)
+
+def skip_quarantined(tasks: List[Tuple],
+                     fingerprints: Dict[str, Tuple[str, int]],
+                     quarantine: Dict[str, Dict],
+                     manifest: Optional[Dict[str, Dict]] = None) -> Tuple[List[Tuple], int]:
+    """Hold back tasks whose unchanged input is on the quarantine list.
+
+    A quarantined PDF timed out or killed its worker on an earlier run, so it
+    would most likely do so again; it is left out until --retry-quarantined
+    or until its ETag or size changes. An entry that a later successful
+    extraction (a newer manifest entry, possibly from another writer) has
+    superseded no longer holds its input back.
+
+    Returns:
+        Tuple of (remaining_tasks, held_count).
+    """
+    manifest = manifest or {}
+
+    def held(task):
+        ikey = input_key_for(task)
+        entry, fp, done = quarantine.get(ikey), fingerprints.get(ikey), manifest.get(ikey)
+        return (entry is not None and fp is not None and (entry["etag"], entry["size"]) == fp
+                and not (done is not None and done["extracted_at"] > entry["failed_at"]))
+
+    remaining = [task for task in tasks if not held(task)]
+    return remaining, len(tasks) - len(remaining)
+
+# ------------------------ Run metrics ------------------------
+
+METRICS_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("level", pa.string()),            # 'doc' or 'page'
+    ("input_key", pa.string()),
+    ("source_name", pa.string()),
+    ("out_path", pa.string()),
+    ("page", pa.int64()),              # page rows only (1-based)
+    ("pages", pa.int64()),             # doc rows: pages extracted
+    ("chunks", pa.int64()),
+    ("layout_s", pa.float64()),
+    ("ocr_s", pa.float64()),
+    ("ocr_kind", pa.string()),         # page rows: classify_page result, or 'full' without --ocr-classify
+    ("ocr_pages", pa.int64()),
+    ("is_ocr", pa.bool_()),
+    ("clean_s", pa.float64()),
+    ("write_s", pa.float64()),
+    ("upload_s", pa.float64()),
+    ("output_bytes", pa.int64()),
+    ("download_s", pa.float64()),
+    ("download_wait_s", pa.float64()),  # time extraction sat waiting on the download
+    ("download_bytes", pa.int64()),
+    ("total_s", pa.float64()),
+    ("predicted_s", pa.float64()),     # doc rows: the scheduler's cost estimate (see estimate_cost)
+    ("error", pa.string()),
+    ("pid", pa.int64()),
+    ("recorded_at", pa.string()),
+])
+
+def metrics_path_for(out_base: str, run_id: str, writer: str = "") -> Optional[str]:
+    """Where this run's metrics sidecar goes (None when --out is a single parquet file)."""
+    if out_base.lower().endswith(".parquet"):
+        return None
+    suffix = f".{writer}" if writer else ""
+    return out_base.rstrip("/") + f"/_metrics_{run_id}{suffix}.parquet"
+
+def task_metrics(timings: Dict[int, Dict],
+                 total_s: float,
+                 page_writer: Optional[ParquetRecordWriter] = None,
+                 chunk_writer: Optional[ParquetRecordWriter] = None) -> Dict:
+    """Summarise one document's timings: {"doc": {...}, "pages": [{...}, ...]}.
+
+    Computed in the worker from the per-page timings filled in by
+    extract_pdf_to_records and the writers' counters; the parent adds the
+    download figures (see run_tasks) and writes the rows with metrics_rows.
+    """
+    pages = [{
+        "page": i + 1,
+        "layout_s": t.get("layout_s"),
+        "ocr_s": t.get("ocr_s"),
+        "ocr_kind": t.get("ocr_kind"),
+        "is_ocr": t.get("is_ocr"),
+        "clean_s": t.get("clean_s"),
+    } for i, t in sorted(timings.items())]
+    writers = [w for w in (page_writer, chunk_writer) if w is not None]
+    doc = {
+        "pages": len(pages),
+        "layout_s": sum(p["layout_s"] or 0.0 for p in pages),
+        "ocr_s": sum(p["ocr_s"] or 0.0 for p in pages),
+        "ocr_pages": sum(1 for p in pages if p["is_ocr"]),
+        "clean_s": sum(p["clean_s"] or 0.0 for p in pages),
+        "write_s": sum(w.write_s for w in writers),
+        "upload_s": sum(w.upload_s for w in writers),
+        "output_bytes": sum(w.out_bytes for w in writers),
+        "total_s": total_s,
+        "pid": os.getpid(),
+    }
+    return {"doc": doc, "pages": pages}
+
+def metrics_rows(task: Tuple, res: Dict, run_id: str) -> Iterator[Dict]:
+    """METRICS_SCHEMA rows for one finished task: a 'doc' row, then one row per page."""
+    m = res.get("metrics") or {"doc": {}, "pages": []}
+    base = {
+        "run_id": run_id,
+        "input_key": input_key_for(task),
+        "source_name": Path(res["pdf"]).name,
+        "out_path": res.get("out_path"),
+        "recorded_at": now_iso(),
+    }
+    yield {**base, **m["doc"], "level": "doc", "chunks": res.get("chunks"), "error": res.get("error")}
+    for p in m["pages"]:
+        yield {**base, **p, "level": "page"}
+
+# ------------------------ Sharding and work queue ------------------------
+
+LEASE_TTL_S = int(os.getenv("LEASE_TTL_S", "1800"))  # a lease not renewed for this long can be taken over
+LEASE_RETRY_S = int(os.getenv("LEASE_RETRY_S", "3600"))  # a failed input can be claimed again after this long
+LEASE_MAX_ATTEMPTS = int(os.getenv("LEASE_MAX_ATTEMPTS", "3"))  # failed attempts before an input stays failed
+
+def shard_of(input_key: str, shard_count: int) -> int:
+    """Stable shard for an input: sha1 of its manifest key, independent of listing order and run."""
+    return int(hashlib.sha1(input_key.encode("utf-8")).hexdigest()[:8], 16) % shard_count
+
+def _shard(task: Tuple, shard_count: int, assignment: Optional[Dict[str, int]]) -> int:
+    key = input_key_for(task)
+    return assignment[key] if assignment is not None else shard_of(key, shard_count)
+
+def select_shard(tasks: List[Tuple], shard_index: int, shard_count: int,
+                 assignment: Optional[Dict[str, int]] = None) -> List[Tuple]:
+    """The tasks that belong to shard_index of shard_count (order preserved).
+
+    Shards come from shard_of unless an explicit {input_key: shard}
+    assignment is given (see lpt_shards).
+    """
+    return [t for t in tasks if _shard(t, shard_count, assignment) == shard_index]
+
+def own_shard_first(tasks: List[Tuple], shard_index: int, shard_count: int,
+                    assignment: Optional[Dict[str, int]] = None) -> List[Tuple]:
+    """All tasks, this shard's first, then the following shards' in turn (for work stealing)."""
+    return sorted(tasks, key=lambda t: (_shard(t, shard_count, assignment) - shard_index) % shard_count)
+
+class LeaseTable:
+    """Lease-based work queue shared by concurrent extraction tasks.
+
+    Each (input, version) pair gets a small JSON lease object under root
+    (<hash of input key and version>.json) recording its owner, state
+    ('leased', 'done' or 'failed'), failed attempts and expiry. The version
+    (see lease_version) holds the input's ETag and the extractor version, so
+    a PDF that changed, or a run with different output options, is claimable
+    again in a reused queue. acquire() creates the lease only if it does not
+    exist — S3 conditional writes (If-None-Match) or, for a local root, a
+    read-modify-write under an flock'd lock file — so exactly one task wins
+    each input. Leases held by a task are renewed by a heartbeat thread; one
+    whose owner died expires after LEASE_TTL_S and is taken over with a
+    compare-and-swap (If-Match on the ETag that was read), so work is never
+    lost and never duplicated while its owner is alive. A 'failed' lease
+    can be claimed again retry_s after the failure, until max_attempts
+    failures; 'done' leases are final.
+
+    Args:
+        root: s3://bucket/prefix or local directory holding the leases.
+        owner: Unique id of this task.
+        ttl_s: Lease lifetime without renewal.
+        retry_s: Wait before a failed input may be retried.
+        max_attempts: Failures after which an input is no longer retried.
+    """
+
+    def __init__(self, root: str, owner: str, ttl_s: int = LEASE_TTL_S,
+                 retry_s: int = LEASE_RETRY_S, max_attempts: int = LEASE_MAX_ATTEMPTS):
+        self.root = root.rstrip("/")
+        self.owner = owner
+        self.ttl_s = ttl_s
+        self.retry_s = retry_s
+        self.max_attempts = max_attempts
+        # (input_key, version) -> (ETag of our lease (None locally), failed attempts so far)
+        self._held: Dict[Tuple[str, str], Tuple[Optional[str], int]] = {}
+        self._mutex = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        if not self.root.startswith("s3://"):
+            os.makedirs(self.root, exist_ok=True)
+
+    # -- storage -----------------------------------------------------------
+
+    def _path(self, input_key: str, version: str = "") -> str:
+        lease_id = f"{input_key}\n{version}" if version else input_key
+        return f"{self.root}/{hashlib.sha1(lease_id.encode('utf-8')).hexdigest()[:24]}.json"
+
+    def _body(self, input_key: str, version: str, state: str, attempts: int) -> bytes:
+        return json.dumps({
+            "input_key": input_key,
+            "version": version,
+            "owner": self.owner,
+            "state": state,
+            "attempts": attempts,
+            "expires_at": time.time() + (self.retry_s if state == "failed" else self.ttl_s),
+            "updated_at": now_iso(),
+        }).encode("utf-8")
+
+    def _claimable(self, lease: Dict) -> bool:
+        """An existing lease can be taken: its owner stopped renewing it, or it failed and may be retried."""
+        if lease["expires_at"] > time.time():
+            return False
+        if lease["state"] == "failed":
+            return lease.get("attempts", 1) < self.max_attempts
+        return lease["state"] == "leased"
+
+    def _read(self, path: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """(lease, etag) or (None, None) when there is no lease yet."""
+        if path.startswith("s3://"):
+            bucket, key = split_s3_uri(path)
+            try:
+                obj = get_s3_client().get_object(Bucket=bucket, Key=key)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                    return None, None
+                raise
+            return json.loads(obj["Body"].read()), obj["ETag"]
+        try:
+            with open(path, "rb") as f:
+                return json.loads(f.read()), None
+        except FileNotFoundError:
+            return None, None
+
+    def _put(self, path: str, body: bytes, if_match: Optional[str] = None, create: bool = False) -> Optional[str]:
+        """Conditionally write a lease (S3). Returns the new ETag, or None if the condition failed."""
+        bucket, key = split_s3_uri(path)
+        cond = {"IfNoneMatch": "*"} if create else ({"IfMatch": if_match} if if_match else {})
+        try:
+            return get_s3_client().put_object(Bucket=bucket, Key=key, Body=body,
+                                              ContentType="application/json", **cond)["ETag"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict",
+                                                           "412", "409"):
+                return None
+            raise
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock over a local lease table (one lock file, held briefly)."""
+        with open(os.path.join(self.root, ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write_local(path: str, body: bytes):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _describe_takeover(lease: Dict, input_key: str):
+        if lease["state"] == "failed":
+            print(f"[info] retrying {input_key} (failed {lease.get('attempts', 1)} time(s) before)")
+        else:
+            print(f"[warn] took over expired lease of {lease['owner']} on {input_key}")
+
+    # -- protocol ----------------------------------------------------------
+
+    def acquire(self, input_key: str, version: str = "") -> bool:
+        """Claim an input. False if it is done, failed past retries, or leased by a live owner."""
+        path = self._path(input_key, version)
+        attempts = 0
+        if path.startswith("s3://"):
+            etag = self._put(path, self._body(input_key, version, "leased", 0), create=True)
+            if etag is None:
+                lease, seen = self._read(path)
+                if lease is None or not self._claimable(lease):
+                    return False
+                attempts = lease.get("attempts", 0)
+                # take over an expired or retryable lease
+                etag = self._put(path, self._body(input_key, version, "leased", attempts), if_match=seen)
+                if etag is None:
+                    return False
+                self._describe_takeover(lease, input_key)
+        else:
+            with self._locked():
+                lease, etag = self._read(path)
+                if lease is not None and not self._claimable(lease):
+                    return False
+                if lease is not None:
+                    attempts = lease.get("attempts", 0)
+                    self._describe_takeover(lease, input_key)
+                self._write_local(path, self._body(input_key, version, "leased", attempts))
+        with self._mutex:
+            self._held[(input_key, version)] = (etag, attempts)
+        return True
+
+    def complete(self, input_key: str, failed: bool = False, version: str = ""):
+        """Mark a claimed input done (or failed, counting the attempt) for this version."""
+        with self._mutex:
+            etag, attempts = self._held.pop((input_key, version), (None, 0))
+        path = self._path(input_key, version)
+        body = self._body(input_key, version, "failed" if failed else "done", attempts + 1 if failed else attempts)
+        if path.startswith("s3://"):
+            if self._put(path, body, if_match=etag) is None:
+                print(f"[warn] lease on {input_key} was taken over before completion", file=sys.stderr)
+        else:
+            with self._locked():
+                self._write_local(path, body)
+
+    def renew(self):
+        """Push the expiry of every lease this task holds forward by ttl_s."""
+        with self._mutex:
+            held = dict(self._held)
+        for (input_key, version), (etag, attempts) in held.items():
+            path = self._path(input_key, version)
+            body = self._body(input_key, version, "leased", attempts)
+            if path.startswith("s3://"):
+                new_etag = self._put(path, body, if_match=etag)
+                if new_etag is None:
+                    print(f"[warn] lost lease on {input_key}", file=sys.stderr)
+                    continue
+            else:
+                with self._locked():
+                    lease, _ = self._read(path)
+                    if lease is None or lease["owner"] != self.owner or lease["state"] != "leased":
+                        continue
+                    self._write_local(path, body)
+                new_etag = None
+            with self._mutex:
+                if (input_key, version) in self._held:
+                    self._held[(input_key, version)] = (new_etag, attempts)
+
+    def __enter__(self):
+        def beat():
+            while not self._stop.wait(max(1.0, self.ttl_s / 3)):
+                self.renew()
+
+        self._heartbeat = threading.Thread(target=beat, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+
+def lease_version(fingerprint: Optional[Tuple[str, int]]) -> str:
+    """Lease version of an input: its (etag, size) fingerprint plus extractor_version()."""
+    etag, size = fingerprint if fingerprint is not None else ("", 0)
+    return f"{etag}:{size}:{extractor_version()}"
+
+def leased_tasks(tasks: Iterable[Tuple], table: LeaseTable,
+                 fingerprints: Optional[Dict[str, Tuple[str, int]]] = None) -> Iterator[Tuple]:
+    """Yield only the tasks this process wins a lease for, claiming lazily as they are consumed.
+
+    With fingerprints, each input is leased under its lease_version, so a
+    changed PDF gets a fresh lease in a reused queue.
+    """
+    for task in tasks:
+        ikey = input_key_for(task)
+        version = lease_version(fingerprints.get(ikey)) if fingerprints is not None else ""
+        if table.acquire(ikey, version):
+            yield task
+
+# ------------------------ Scheduling ------------------------
+
+def probe_pdf(pdf_path: Path, sample_pages: int = PLAN_PROBE_PAGES) -> Tuple[int, Optional[float]]:
+    """(page_count, scanned_ratio) of a local PDF, cheaply.
+
+    Opens the PDF and reads the plain text layer of up to sample_pages evenly
+    spaced pages; a page whose text is shorter than MIN_TEXT_LEN would go to
+    OCR. Returns (0, None) if the PDF cannot be opened.
+    """
+    try:
+        with open_pdf(pdf_path) as doc:
+            n = doc.page_count
+            if n == 0:
+                return 0, 0.0
+            sample = sorted({(k * n) // min(n, sample_pages) for k in range(min(n, sample_pages))})
+            scanned = sum(1 for i in sample if len(doc[i].get_text("text").strip()) < MIN_TEXT_LEN)
+            return n, scanned / len(sample)
+    except Exception:
+        return 0, None
+
+def estimate_cost(size_bytes: int, page_count: int = 0, scanned_ratio: Optional[float] = None) -> float:
+    """Predicted extraction seconds for one PDF.
+
+    cost = PLAN_S_PER_MB × MB + pages × PLAN_S_PER_PAGE + OCR pages × PLAN_S_PER_OCR_PAGE,
+    with OCR pages capped at MAX_OCR_PAGES (and zero without OCR). An
+    unknown page count is guessed from the size; an unknown scanned ratio is
+    taken as 1 when the known page count makes pages heavier than
+    PLAN_SCANNED_BYTES_PER_PAGE, else 0.
+
+    Args:
+        size_bytes: Object size (listing size for S3, file size locally).
+        page_count: Pages, or 0 if unknown.
+        scanned_ratio: Fraction of pages without a usable text layer, or None.
+    """
+    pages = page_count or max(1, round(size_bytes / PLAN_BYTES_PER_PAGE))
+    if scanned_ratio is None:
+        scanned_ratio = 1.0 if page_count and size_bytes / page_count >= PLAN_SCANNED_BYTES_PER_PAGE else 0.0
+    ocr_pages = min(pages * scanned_ratio, MAX_OCR_PAGES) if ALLOW_OCR else 0.0
+    return (PLAN_S_PER_MB * size_bytes / (1024 * 1024)
+            + PLAN_S_PER_PAGE * pages
+            + PLAN_S_PER_OCR_PAGE * ocr_pages)
+
+def plan_costs(tasks: List[Tuple],
+               fingerprints: Dict[str, Tuple[str, int]],
+               page_hints: Optional[Dict[str, int]] = None,
+               probe: bool = True) -> Dict[str, float]:
+    """{input_key: predicted seconds} for every task.
+
+    S3 inputs are costed from their listing size, plus the page count a
+    previous run recorded in the manifest (page_hints) when there is one.
+    Local inputs are probed with probe_pdf unless probe is False.
+    """
+    costs = {}
+    for task in tasks:
+        key = input_key_for(task)
+        size = fingerprints.get(key, ("", 0))[1]
+        pages, ratio = (page_hints or {}).get(key) or 0, None
+        if probe and task[0] is not None:
+            pages, ratio = probe_pdf(task[0])
+        costs[key] = estimate_cost(size, pages, ratio)
+    return costs
+
+def largest_first(tasks: List[Tuple], costs: Dict[str, float]) -> List[Tuple]:
+    """Tasks in longest-processing-time-first order (ties keep listing order).
+
+    A pool that takes the next task whenever a worker frees up then runs the
+    LPT heuristic, so one huge PDF never starts last and doubles wall time.
+    """
+    return sorted(tasks, key=lambda t: -costs.get(input_key_for(t), 0.0))
+
+def predicted_makespan(costs: List[float], workers: int) -> float:
+    """Wall time of running costs, in order, on `workers` workers that each take the next task when free."""
+    free = [0.0] * max(1, workers)
+    for c in costs:
+        heapq.heappush(free, heapq.heappop(free) + c)
+    return max(free)
+
+def lpt_shards(tasks: List[Tuple], costs: Dict[str, float], shard_count: int) -> Dict[str, int]:
+    """Balance tasks over shards by cost: largest first, each to the least-loaded shard.
+
+    Deterministic for a given listing and costs, so concurrent tasks that
+    compute it independently agree on the assignment.
+    """
+    loads = [(0.0, i) for i in range(shard_count)]
+    assignment = {}
+    for key in sorted((input_key_for(t) for t in tasks), key=lambda k: (-costs.get(k, 0.0), k)):
+        load, shard = heapq.heappop(loads)
+        assignment[key] = shard
+        heapq.heappush(loads, (load + costs.get(key, 0.0), shard))
+    return assignment
+
+# ------------------------ Task execution ------------------------
+
+def resolve_out_path(local_pdf: Path,
+                     src_bucket: Optional[str],
+                     src_key: Optional[str],
+                     out_base: str) -> str:
+    """Decide where the parquet for one PDF should be written.
+
+    S3 inputs are mapped through build_out_key_from_input (state/county from
+    the input key). Local inputs write <stem>_text.parquet under --out, which
+    may itself be a local directory or an s3:// prefix.
+
+    Args:
+        local_pdf: Local path of the PDF being extracted.
+        src_bucket: Source S3 bucket, or None for local inputs.
+        src_key: Source S3 key, or None for local inputs.
+        out_base: The --out argument.
+
+    Returns:
+        Output path — a local file path or an s3:// URI.
+    """
+    if src_bucket and src_key:
+        # S3 input: build out path from input key + out base (env=prod)
+        return build_out_key_from_input(src_bucket, src_key, out_base)
+
+    # Local input: generic behavior
+    stem = Path(local_pdf).stem + "_text.parquet"
+    if out_base.startswith("s3://"):
+        out_bucket, out_key_base = split_s3_uri(out_base)
+        out_key_base = out_key_base.strip("/")
+        if out_key_base and not out_key_base.endswith("/"):
+            out_key_base = out_key_base + "/"
+        return f"s3://{out_bucket}/{out_key_base}{stem}"
+    outdir = Path(out_base)
+    outdir.mkdir(parents=True, exist_ok=True)
+    return str(outdir / stem)
+
+def process_pdf_task(local_pdf: Path,
+                     src_bucket: Optional[str],
+                     src_key: Optional[str],
+                     out_base: str,
+                     env: Optional[str],
+                     zone: Optional[str],
+                     state: Optional[str],
+                     county: Optional[str],
+                     executor: Optional[Executor] = None,
+                     range_pages: int = 0,
+                     pdf_bytes: Optional[bytes] = None,
+                     defer_upload: bool = False) -> Dict:
+    """Extract one PDF and write its parquet. Safe to run in a worker process.
+
+    Exceptions are caught and returned rather than raised so that a single bad
+    PDF never takes down a pool worker, and so the parent can report it the
+    same way in sequential and parallel runs. executor/range_pages/pdf_bytes
+    are passed through to extract_pdf_to_records.
+
+    With CHUNK_SIZE > 0 the same record stream is also cut into chunks by
+    chunk_records and written to chunk_path_for(out_path), in the same pass.
+
+    With defer_upload, S3 outputs are left spooled for the caller's
+    BackgroundUploader instead of being uploaded here (see run_tasks).
+
+    Extraction runs under a Watchdog (DOC_TIMEOUT_S / PAGE_TIMEOUT_S); the
+    writers are closed, and inline uploads made, outside of it. A timed-out
+    PDF writes nothing and comes back with 'quarantine' set, as does one
+    whose page ranges were lost to a dead pool worker.
+
+    Returns:
+        Dict with keys 'pdf' (str path), 'pages' (records written),
+        'chunks' (chunk records written), 'out_path', 'chunk_path' (None
+        without chunking), 'error' (message
+        string, or None on success), 'metrics' (see task_metrics),
+        'uploads' ((spool_path, out_path) pairs still to upload),
+        'quarantine' (DOC_TIMEOUT, PAGE_TIMEOUT, WORKER_DIED or None) and
+        'quarantine_page' (1-based page a timeout hit, or None).
+    """
+    out_path = None
+    timings: Dict[int, Dict] = {}
+    t_start = time.perf_counter()
+    page_writer = chunk_writer = None
+    res = {"pdf": str(local_pdf), "pages": 0, "chunks": 0, "out_path": None, "chunk_path": None,
+           "error": None, "uploads": [],
+           "quarantine": None, "quarantine_page": None}
+    try:
+        out_path = res["out_path"] = resolve_out_path(local_pdf, src_bucket, src_key, out_base)
+        records = extract_pdf_to_records(local_pdf, env, zone, state, county,
+                                         executor=executor, range_pages=range_pages,
+                                         pdf_bytes=pdf_bytes, timings=timings)
+        page_writer = ParquetRecordWriter(out_path, defer_upload=defer_upload)
+        if CHUNK_SIZE > 0:
+            res["chunk_path"] = chunk_path_for(out_path)
+            chunk_writer = ParquetRecordWriter(res["chunk_path"], CHUNK_SCHEMA, defer_upload=defer_upload)
+
+        def tee(recs):
+            for rec in recs:
+                page_writer.write(rec)
+                yield rec
+
+        try:
+            with Watchdog():
+                if chunk_writer is None:
+                    for rec in records:
+                        page_writer.write(rec)
+                else:
+                    for chunk in chunk_records(tee(records), CHUNK_SIZE, CHUNK_OVERLAP):
+                        chunk_writer.write(chunk)
+        except BaseException:
+            page_writer.abort()
+            if chunk_writer is not None:
+                chunk_writer.abort()
+            raise
+        if chunk_writer is not None:
+            res["chunks"] = chunk_writer.close()
+        res["pages"] = page_writer.close()
+        res["uploads"] = [w.pending_upload for w in (page_writer, chunk_writer)
+                          if w is not None and w.pending_upload is not None]
+    except Exception as e:
+        for w in (page_writer, chunk_writer):
+            if w is not None and w.pending_upload is not None:
+                os.remove(w.pending_upload[0])
+        res["pages"] = res["chunks"] = 0
+        res["error"] = str(e)
+        if isinstance(e, ExtractionTimeout):
+            res["quarantine"] = e.reason
+            res["quarantine_page"] = e.page + 1 if e.page is not None else None
+        elif isinstance(e, BrokenProcessPool):
+            res["quarantine"] = WORKER_DIED
+    res["metrics"] = task_metrics(timings, time.perf_counter() - t_start, page_writer, chunk_writer)
+    return res
+
+def _pdf_page_count(pdf_path: Path, pdf_bytes: Optional[bytes] = None) -> int:
+    """Page count of a PDF, or 0 if it cannot be opened (the worker reports the error)."""
+    try:
+        with open_pdf(pdf_path, pdf_bytes) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+def _worker_overrides() -> Dict:
+    """Module tunables that the CLI may have changed, to replay in pool workers."""
+    return {"ALLOW_OCR": ALLOW_OCR, "OCR_WORKERS": OCR_WORKERS, "OCR_ENGINE": OCR_ENGINE,
+            "OCR_CLASSIFY": OCR_CLASSIFY, "STRIP_BOILERPLATE": STRIP_BOILERPLATE, "LAYOUT_MODE": LAYOUT_MODE,
+            "CHUNK_SIZE": CHUNK_SIZE, "CHUNK_OVERLAP": CHUNK_OVERLAP,
+            "DOC_TIMEOUT_S": DOC_TIMEOUT_S, "PAGE_TIMEOUT_S": PAGE_TIMEOUT_S}
+
+def _init_worker(overrides: Dict):
+    """Pool initializer: carry CLI overrides of module tunables into workers."""
+    globals().update(overrides, _IN_POOL_WORKER=True)
+
+def prefetch_tasks(tasks: List[Tuple[Optional[Path], Optional[str], Optional[str]]],
+                   local_dir: Path,
+                   io_workers: int,
+                   depth: int,
+                   inmem_max_bytes: int = 0,
+                   stats: Optional[Dict[str, Dict]] = None) -> Iterator[Tuple[Path, Optional[str], Optional[str], Optional[bytes]]]:
+    """Yield tasks in order, downloading S3 sources on a thread pool ahead of use.
+
+    Tasks whose local path is None are fetched with download_s3_object, at
+    most `depth` downloads ahead of the consumer, so time-to-first-output does
+    not depend on corpus size and local disk holds only the prefetch window.
+    Each object lands in its own subdirectory (keyed by a hash of the S3 key)
+    so same-named PDFs from different counties never overwrite each other.
+    Failed downloads are reported and skipped, as before. Objects up to
+    inmem_max_bytes are held in memory instead (see fetch_s3_pdf).
+
+    Args:
+        tasks: (local_pdf_path_or_None, s3_bucket_if_any, s3_key_if_any) tuples.
+        local_dir: Directory to download into.
+        io_workers: Download threads.
+        depth: Max tasks fetched ahead of the consumer.
+        inmem_max_bytes: Largest S3 object kept in memory (0 = always use disk).
+        stats: If given, filled with {input_key: {"download_s",
+            "download_wait_s", "download_bytes"}} for every S3 download.
+
+    Yields:
+        (local_pdf_path, s3_bucket_if_any, s3_key_if_any, pdf_bytes_or_None) tuples.
+    """
+    pending = iter(tasks)
+    queue: deque = deque()
+    with ThreadPoolExecutor(max_workers=max(1, io_workers)) as downloads:
+
+        def fill():
+            while len(queue) < max(1, depth):
+                task = next(pending, None)
+                if task is None:
+                    return
+                local, bucket, key = task
+                fut = None
+                if local is None:
+                    subdir = local_dir / hashlib.sha1(f"{bucket}/{key}".encode("utf-8")).hexdigest()[:16]
+                    fut = downloads.submit(_timed_call, fetch_s3_pdf, bucket, key, subdir, inmem_max_bytes)
+                queue.append((task, fut))
+
+        fill()
+        while queue:
+            (local, bucket, key), fut = queue.popleft()
+            data = None
+            if fut is not None:
+                t0 = time.perf_counter()
+                try:
+                    (local, data), secs = fut.result()
+                except ClientError as e:
+                    print(f"[error] failed to download s3://{bucket}/{key}: {e}")
+                    fill()
+                    continue
+                if stats is not None:
+                    stats[input_key_for((local, bucket, key))] = {
+                        "download_s": secs,
+                        "download_wait_s": time.perf_counter() - t0,
+                        "download_bytes": len(data) if data is not None else local.stat().st_size,
+                    }
+            fill()
+            yield local, bucket, key, data
+
+def _discard_download(task: Tuple[Path, Optional[str], Optional[str], Optional[bytes]]):
+    """Delete a downloaded S3 source once its parquet is written (local inputs are kept)."""
+    local_pdf, src_bucket, src_key, _ = task
+    if src_bucket and src_key:
+        shutil.rmtree(local_pdf.parent, ignore_errors=True)
+
+def run_tasks(tasks: Iterable[Tuple[Optional[Path], Optional[str], Optional[str]]],
+              args: argparse.Namespace,
+              local_dir: Optional[Path] = None,
+              on_result: Optional[Callable[[Tuple, Dict], None]] = None) -> Tuple[int, int]:
+    """Run extraction for every task, sequentially or on a process pool.
+
+    S3 sources (local path None) are downloaded by prefetch_tasks into
+    local_dir while earlier PDFs are still extracting, and each download is
+    deleted as soon as its parquet has been written.
+
+    With --workers > 1, tasks are submitted to a ProcessPoolExecutor with at
+    most --max-inflight PDFs outstanding, so a long task list never gets
+    pickled into the pool queue all at once. Per-PDF failures come back as
+    results from process_pdf_task. A crashed worker (including one killed
+    by the Watchdog's CPU backstop) breaks the whole pool, so every PDF in
+    flight is re-run alone on a fresh pool, up to WORKER_RETRIES times; a
+    PDF that still takes its worker down is reported with quarantine set
+    to WORKER_DIED.
+
+    PDFs longer than --split-pages are coordinated from a parent thread that
+    fans their page ranges out onto the same pool, so one huge county code
+    does not pin a single core for the whole run.
+
+    With --upload-workers > 0, S3 outputs are spooled by the extractor and
+    uploaded by a BackgroundUploader in this process while the next PDFs
+    extract. A PDF is only reported to on_result (and so to the manifest)
+    once its uploads have finished; a failed upload is reported as that
+    PDF's error. Before returning, every queued upload is waited for, so
+    no output is silently lost at shutdown.
+
+    Args:
+        tasks: (local_pdf_path_or_None, s3_bucket_if_any, s3_key_if_any) tuples
+            (any iterable; consumed lazily, e.g. leased_tasks).
+        args: Parsed CLI arguments.
+        local_dir: Download directory for S3 sources.
+        on_result: Called in the parent with (task, result) for every PDF,
+            once its outputs are in place.
+
+    Returns:
+        Tuple of (pdfs_processed, pages_written).
+    """
+    total_pdfs = 0
+    total_pages = 0
+
+    def job(task):
+        local_pdf, src_bucket, src_key, _ = task
+        return (local_pdf, src_bucket, src_key, args.out,
+                args.env, args.zone, args.state, args.county)
+
+    downloads: Dict[str, Dict] = {}
+    upload_workers = getattr(args, "upload_workers", 0)
+    uploader = BackgroundUploader(upload_workers, UPLOAD_QUEUE) if upload_workers > 0 else None
+    uploading: List[Tuple[Tuple, Dict, List[Future]]] = []  # (task, res, upload futures) not yet reported
+
+    def collect(task, res: Dict):
+        _discard_download(task)
+        fetched = downloads.pop(input_key_for(task), None)
+        if fetched:
+            res.setdefault("metrics", {"doc": {}, "pages": []})["doc"].update(fetched)
+        if res.get("uploads"):
+            uploading.append((task, res, [uploader.submit(*u) for u in res.pop("uploads")]))
+        else:
+            finish(task, res)
+        settle_uploads(block=False)
+
+    def settle_uploads(block: bool):
+        """Report PDFs whose uploads are done (all of them when block is set)."""
+        for entry in list(uploading):
+            task, res, futs = entry
+            if not block and not all(f.done() for f in futs):
+                continue
+            uploading.remove(entry)
+            upload_s = 0.0
+            for fut in futs:
+                try:
+                    upload_s += fut.result()
+                except Exception as e:
+                    res["error"] = res["error"] or f"upload failed: {e}"
+            if res["error"] is not None:
+                res["pages"] = res["chunks"] = 0
+            res.setdefault("metrics", {"doc": {}, "pages": []})["doc"]["upload_s"] = upload_s
+            finish(task, res)
+
+    def finish(task, res: Dict):
+        nonlocal total_pdfs, total_pages
+        if on_result is not None:
+            on_result(task, res)
+        total_pdfs += 1
+        if res["error"] is not None:
+            print(f"[error] failed on {res['pdf']}: {res['error']}", file=sys.stderr)
+        else:
+            total_pages += res["pages"]
+
+    try:
+        _run_pool(tasks, args, local_dir, job, collect, downloads, defer_upload=uploader is not None)
+    finally:
+        if uploader is not None:
+            settle_uploads(block=True)  # barrier: every output is uploaded (or reported failed)
+            uploader.close()
+    return total_pdfs, total_pages
+
+def _run_pool(tasks: Iterable[Tuple],
+              args: argparse.Namespace,
+              local_dir: Optional[Path],
+              job: Callable[[Tuple], Tuple],
+              collect: Callable[[Tuple, Dict], None],
+              downloads: Dict[str, Dict],
+              defer_upload: bool = False):
+    """Extraction loop of run_tasks: sequential, or on a process pool with a bounded in-flight window."""
+    workers = max(1, args.workers)
+    max_inflight = args.max_inflight if args.max_inflight > 0 else INFLIGHT_PER_WORKER * workers
+    depth = args.prefetch if args.prefetch > 0 else max_inflight
+    ready = prefetch_tasks(tasks, local_dir or Path(tempfile.gettempdir()), args.io_workers, depth,
+                           int(args.inmem_max_mb * 1024 * 1024), stats=downloads)
+
+    if workers == 1:
+        for task in ready:
+            print(f"[info] extracting: {task[0]}")
+            collect(task, process_pdf_task(*job(task), pdf_bytes=task[3], defer_upload=defer_upload))
+        return
+
+    split_pages = args.split_pages
+    inflight = {}
+    suspects: deque = deque()  # tasks in flight when a worker died, re-run one at a time
+    retried: Counter = Counter()
+    broken = False
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_worker_overrides(),))
+
+    pool = new_pool()
+    try:
+        with ThreadPoolExecutor(max_workers=max_inflight) as coordinators:
+            while True:
+                while not broken and len(inflight) < max_inflight:
+                    if suspects:
+                        if inflight:
+                            break  # a suspect runs alone, so a second death is its own
+                        task = suspects.popleft()
+                    else:
+                        task = next(ready, None)
+                    if task is None:
+                        break
+                    if split_pages > 0 and _pdf_page_count(task[0], task[3]) > split_pages:
+                        print(f"[info] extracting: {task[0]} (split into {split_pages}-page ranges)")
+                        fut = coordinators.submit(process_pdf_task, *job(task), executor=pool,
+                                                  range_pages=split_pages, pdf_bytes=task[3],
+                                                  defer_upload=defer_upload)
+                    else:
+                        print(f"[info] extracting: {task[0]}")
+                        fut = pool.submit(process_pdf_task, *job(task), pdf_bytes=task[3],
+                                          defer_upload=defer_upload)
+                    inflight[fut] = task
+                if not inflight:
+                    if not broken:
+                        break
+                    # Every PDF the dead worker took down is back: carry on with a fresh pool
+                    pool.shutdown(wait=True)
+                    pool = new_pool()
+                    broken = False
+                    continue
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    task = inflight.pop(fut)
+                    try:
+                        res = fut.result()
+                    except Exception as e:  # worker died (OOM kill, segfault in MuPDF, watchdog CPU limit, ...)
+                        res = {"pdf": str(task[0]), "pages": 0, "chunks": 0, "out_path": None,
+                               "error": f"worker failed: {e}",
+                               "quarantine": WORKER_DIED if isinstance(e, BrokenProcessPool) else None}
+                    if res.get("quarantine") == WORKER_DIED:
+                        broken = True
+                        key = input_key_for(task)
+                        if retried[key] < WORKER_RETRIES:
+                            retried[key] += 1
+                            print(f"[warn] worker died with {task[0]} in flight; re-running it alone")
+                            suspects.append(task)
+                            continue
+                    collect(task, res)
+    finally:
+        pool.shutdown(wait=True)
+
+# ------------------------ Compaction ------------------------
+
+COMPACT_INDEX_NAME = "_files.json"  # per-partition list of compacted files and their row counts
+
+def list_partitions(out_base: str, prefix: str = "") -> Dict[str, List[Tuple[str, int]]]:
+    """Group the data parquet files under an --out base by directory.
+
+    Every directory that directly holds parquet files is a partition (the
+    zone=/state=/county= dirs for S3 inputs, or --out itself for flat local
+    runs). Files starting with "_" or "." (manifest, index, temp files) are
+    not data and are ignored.
+
+    Returns:
+        {partition_dir: [(file_path, size_bytes), ...]}, paths local or s3://.
+    """
+    parts: Dict[str, List[Tuple[str, int]]] = {}
+    if out_base.startswith("s3://"):
+        bucket, base_key = split_s3_uri(out_base)
+        base_key = base_key.strip("/") + "/" if base_key.strip("/") else ""
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=base_key + prefix.lstrip("/")):
+            for obj in page.get("Contents", []) or []:
+                d, name = os.path.split(obj["Key"])
+                if name.endswith(".parquet") and not name.startswith(("_", ".")):
+                    parts.setdefault(f"s3://{bucket}/{d}", []).append((f"s3://{bucket}/{obj['Key']}", obj["Size"]))
+    else:
+        root = Path(out_base)
+        for p in sorted(root.rglob("*.parquet")):
+            if p.name.startswith(("_", ".")) or not str(p.relative_to(root)).startswith(prefix):
+                continue
+            parts.setdefault(str(p.parent), []).append((str(p), p.stat().st_size))
+    return parts
+
+def _read_parquet_any(path: str) -> pa.Table:
+    """Read a whole parquet file from a local path or an s3:// URI."""
+    if path.startswith("s3://"):
+        bucket, key = split_s3_uri(path)
+        buf = io.BytesIO()
+        get_s3_client().download_fileobj(bucket, key, buf, Config=s3_transfer_config())
+        return pq.read_table(pa.BufferReader(buf.getvalue()))
+    return pq.read_table(path, partitioning=None)
+
+def _conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Select and cast a table to schema; columns older files lack (e.g. dup_of) come back all-null."""
+    columns = [table.column(f.name).cast(f.type) if f.name in table.schema.names
+               else pa.nulls(table.num_rows, f.type) for f in schema]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def _partition_path(part_dir: str, name: str) -> str:
+    return f"{part_dir}/{name}" if part_dir.startswith("s3://") else os.path.join(part_dir, name)
+
+def read_compact_index(part_dir: str) -> Optional[Dict]:
+    """Load a partition's _files.json index, or None when it has none."""
+    path = _partition_path(part_dir, COMPACT_INDEX_NAME)
+    try:
+        if path.startswith("s3://"):
+            bucket, key = split_s3_uri(path)
+            return json.loads(get_s3_client().get_object(Bucket=bucket, Key=key)["Body"].read())
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+
+def _write_compact_index(part_dir: str, index: Dict):
+    """Publish a partition index in one step (single PUT, or write + rename locally)."""
+    path = _partition_path(part_dir, COMPACT_INDEX_NAME)
+    body = json.dumps(index, indent=1).encode("utf-8")
+    if path.startswith("s3://"):
+        bucket, key = split_s3_uri(path)
+        get_s3_client().put_object(Bucket=bucket, Key=key, Body=body, ContentType="application/json")
+    else:
+        tmp = _partition_path(part_dir, "." + COMPACT_INDEX_NAME + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+def _write_table_any(table: pa.Table, path: str, sort_by: Tuple[str, ...] = ()):
+    """Write a table to a local path (via temp file + rename) or an s3:// URI.
+
+    Uses parquet_write_options with ROW_GROUP_PAGES rows per row group; sort_by
+    names the columns the table is already sorted by, recorded as the file's
+    sorting_columns so engines can rely on it.
+    """
+    options = dict(parquet_write_options(table.schema), row_group_size=ROW_GROUP_PAGES)
+    if sort_by:
+        options["sorting_columns"] = [pq.SortingColumn(table.schema.get_field_index(c)) for c in sort_by]
+
+    if path.startswith("s3://"):
+        bucket, key = split_s3_uri(path)
+        with tempfile.TemporaryFile(prefix="pdf-compact-", suffix=".parquet") as spool:
+            pq.write_table(table, spool, **options)
+            spool.seek(0)
+            get_s3_client().upload_fileobj(spool, bucket, key, Config=s3_transfer_config())
+    else:
+        d, name = os.path.split(path)
+        tmp = os.path.join(d, "." + name + ".tmp")
+        pq.write_table(table, tmp, **options)
+        os.replace(tmp, path)
+
+def _delete_any(paths: List[str]):
+    """Delete local files or S3 objects (batched DeleteObjects, 1000 keys per call)."""
+    by_bucket: Dict[str, List[str]] = {}
+    for p in paths:
+        if p.startswith("s3://"):
+            bucket, key = split_s3_uri(p)
+            by_bucket.setdefault(bucket, []).append(key)
+        elif os.path.exists(p):
+            os.remove(p)
+    for bucket, keys in by_bucket.items():
+        for i in range(0, len(keys), 1000):
+            get_s3_client().delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": k} for k in keys[i:i + 1000]], "Quiet": True},
+            )
+
+def compact_partition(part_dir: str,
+                      files: List[Tuple[str, int]],
+                      target_bytes: int,
+                      run_id: str) -> Tuple[Dict, Dict[Tuple[str, str], str]]:
+    """Rewrite one partition's parquet files into size-targeted, sorted part files.
+
+    Files are grouped by schema — page records (RECORD_SCHEMA) and chunk
+    records (CHUNK_SCHEMA) are never concatenated, so a directory that holds
+    both (e.g. from an older flat output) still compacts. Within a group, all
+    rows are read, cast to the group's schema (older pandas-written files may
+    carry all-null columns or lack dup_of), de-duplicated per source_name — a
+    PDF that was re-extracted after the last compaction keeps only its newest
+    extraction, by extracted_at — and sorted by (doc_id, page), or
+    (doc_id, chunk_index) for chunks. The sorted table is cut into
+    part-<run_id>-NNNNN.parquet files of roughly target_bytes, using the
+    inputs' on-disk bytes per row as the estimate.
+
+    Swap-in order: the new part files are written first, then _files.json is
+    replaced in one step (the commit point), and only then are the inputs
+    deleted. Readers that plan from _files.json see either the old or the new
+    file set; a crash before the index is replaced leaves extra part files
+    that the next compaction folds back in and de-duplicates.
+
+    Args:
+        part_dir: Partition directory (local path or s3:// prefix).
+        files: (path, size_bytes) of the partition's current data files.
+        target_bytes: Desired size of each output file.
+        run_id: Unique tag for this compaction run, used in output names.
+
+    Returns:
+        Tuple of (index, moved) where index is the published _files.json
+        content and moved maps (old file path, source_name) -> the new file
+        holding that PDF's pages or chunks.
+    """
+    groups: Dict[str, List] = {}  # order column -> [(path, size, table)]
+    for path, size in files:
+        t = _read_parquet_any(path)
+        order = "chunk_index" if "chunk_index" in t.schema.names else "page"
+        t = _conform_table(t, CHUNK_SCHEMA if order == "chunk_index" else RECORD_SCHEMA)
+        groups.setdefault(order, []).append((path, size, t))
+
+    index_files, moved = [], {}
+    in_rows = out_rows = 0
+    for order, group in sorted(groups.items(), key=lambda kv: kv[0] != "page"):
+        table = pa.concat_tables([t for _, _, t in group])
+        group_rows = table.num_rows
+        in_rows += group_rows
+
+        latest = table.group_by("source_name").aggregate([("extracted_at", "max")])
+        newest = dict(zip(latest.column("source_name").to_pylist(), latest.column("extracted_at_max").to_pylist()))
+        keep = [newest[s] == e for s, e in zip(table.column("source_name").to_pylist(),
+                                               table.column("extracted_at").to_pylist())]
+        table = table.filter(pa.array(keep, type=pa.bool_()))
+        table = table.sort_by([("doc_id", "ascending"), (order, "ascending")])
+        out_rows += table.num_rows
+
+        in_bytes = sum(size for _, size, _ in group)
+        rows_per_file = max(1, int(target_bytes * group_rows / max(1, in_bytes)))
+
+        home = {}
+        for offset in range(0, table.num_rows, rows_per_file):
+            chunk = table.slice(offset, rows_per_file)
+            path = _partition_path(part_dir, f"part-{run_id}-{len(index_files):05d}.parquet")
+            _write_table_any(chunk, path, sort_by=("doc_id", order))
+            for name in chunk.column("source_name").to_pylist():
+                home.setdefault(name, path)
+            index_files.append({
+                "path": path,
+                "rows": chunk.num_rows,
+                "min_doc_id": chunk.column("doc_id")[0].as_py(),
+                "max_doc_id": chunk.column("doc_id")[-1].as_py(),
+            })
+        for old, _, t in group:
+            for name in set(t.column("source_name").to_pylist()):
+                if name in home:
+                    moved[(old, name)] = home[name]
+
+    index = {
+        "compacted_at": now_iso(),
+        "rows": out_rows,
+        "files": index_files,
+    }
+    _write_compact_index(part_dir, index)
+
+    new_paths = {f["path"] for f in index_files}
+    _delete_any([path for path, _ in files if path not in new_paths])
+    print(f"[ok] compacted {part_dir}: {len(files)} files, {in_rows} rows → "
+          f"{len(index_files)} files, {out_rows} rows")
+    return index, moved
+
+def compact_main(argv: List[str]):
+    """CLI entry point for `main.py compact`: compact every partition under --out.
+
+    Partitions whose data files are exactly the ones listed in their
+    _files.json are already compacted and are left alone. Afterwards, the
+    extraction manifests' output_path entries (shared and per-writer) are
+    repointed at the part files now holding each PDF, so incremental runs
+    keep skipping them.
+    Do not run this concurrently with an extraction into the same --out.
+    """
+    ap = argparse.ArgumentParser(prog="main.py compact",
+                                 description="Rewrite per-PDF parquet outputs into large sorted files per partition")
+    ap.add_argument("--out", required=True, help="Extraction output base (local dir or s3://bucket/env=prod/)")
+    ap.add_argument("--prefix", default="", help="Only compact partitions under this sub-path, e.g. zone=text/state=GA/")
+    ap.add_argument("--target-mb", type=int, default=COMPACT_TARGET_MB, help="Target size of each compacted file")
+    args = ap.parse_args(argv)
+
+    t0 = time.time()
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    partitions = list_partitions(args.out, args.prefix)
+    print(f"[info] found {len(partitions)} partitions under {args.out}")
+
+    moved: Dict[Tuple[str, str], str] = {}
+    compacted = 0
+    for part_dir, files in sorted(partitions.items()):
+        index = read_compact_index(part_dir)
+        if index and {f["path"] for f in index["files"]} == {path for path, _ in files}:
+            continue
+        _, part_moved = compact_partition(part_dir, files, args.target_mb * 1024 * 1024, run_id)
+        moved.update(part_moved)
+        compacted += 1
+
+    if moved and manifest_path_for(args.out):
+        for manifest_path in manifest_paths(args.out):
+            manifest = load_manifest(manifest_path)
+            updated = 0
+            for entry in manifest.values():
+                name = source_name_for(entry["input_key"])
+                for col in ("output_path", "chunk_path"):
+                    new_path = moved.get((entry.get(col), name))
+                    if new_path:
+                        entry[col] = new_path
+                        updated += 1
+            if updated:
+                save_manifest(manifest, manifest_path)
+
+    print(f"[done] compacted {compacted} of {len(partitions)} partitions in {time.time() - t0:.1f}s")
+
+# ------------------------ Duplicate detection ------------------------
+
+_MERSENNE_61 = np.uint64((1 << 61) - 1)
+
+def normalize_for_dedup(text: Optional[str]) -> str:
+    """Lowercase and collapse whitespace, so layout-only differences still match exactly."""
+    return " ".join((text or "").lower().split())
+
+def shingle_hashes(norm: str, k: int = DEDUP_SHINGLE) -> np.ndarray:
+    """crc32 of every k-word shingle of normalized text (the whole text if it is shorter)."""
+    words = norm.split()
+    grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)] or [norm]
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)))
+
+class MinHashLSH:
+    """MinHash signatures with banded LSH, for near-duplicate lookups.
+
+    A signature holds, per permutation (a·h + b) mod 2^61−1, the minimum over
+    the shingle hashes, truncated to 32 bits. Signatures are split into bands;
+    records sharing any band are candidates, and a candidate matches when the
+    fraction of equal signature slots (the Jaccard estimate) reaches threshold.
+    The permutations come from a fixed seed, so results are reproducible.
+
+    Args:
+        num_perm: Signature length.
+        bands: Number of LSH bands (num_perm must divide evenly).
+        threshold: Estimated Jaccard similarity for a match.
+    """
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, bands: int = DEDUP_BANDS,
+                 threshold: float = DEDUP_THRESHOLD, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        rng = np.random.default_rng(seed)
+        # a, b < 2^32 and crc32 hashes < 2^32 keep a·h + b inside uint64
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._sigs: List[np.ndarray] = []
+        self._refs: List[str] = []
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        perm = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_61
+        return (perm & np.uint64(0xFFFFFFFF)).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray) -> Iterator[Tuple[int, bytes]]:
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def query(self, sig: np.ndarray) -> Optional[str]:
+        """ref of the most similar indexed record at or above threshold, or None."""
+        seen, best, best_sim = set(), None, self.threshold
+        for key in self._band_keys(sig):
+            for idx in self._buckets.get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                sim = float(np.mean(self._sigs[idx] == sig))
+                if sim >= best_sim:
+                    best, best_sim = self._refs[idx], sim
+        return best
+
+    def insert(self, sig: np.ndarray, ref: str):
+        idx = len(self._sigs)
+        self._sigs.append(sig)
+        self._refs.append(ref)
+        for key in self._band_keys(sig):
+            self._buckets.setdefault(key, []).append(idx)
+
+class DuplicateIndex:
+    """Exact and near-duplicate index over record texts; the first record seen is canonical.
+
+    Exact matches use a sha256 of the normalized text. The records' own
+    sha256 column mixes in source name and page, so it cannot match copies
+    across documents. Texts of at least min_chars also go through MinHashLSH.
+    Only canonical records are indexed, so every duplicate points at a record
+    that is not itself a duplicate.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, min_chars: int = DEDUP_MIN_CHARS):
+        self.min_chars = min_chars
+        self.lsh = MinHashLSH(threshold=threshold)
+        self._exact: Dict[bytes, str] = {}
+        self.exact_dups = 0
+        self.near_dups = 0
+
+    def check(self, ref: str, text: Optional[str]) -> Optional[str]:
+        """Register a record; return the canonical ref it duplicates, or None if it is new."""
+        norm = normalize_for_dedup(text)
+        if not norm:
+            return None
+        digest = hashlib.sha256(norm.encode("utf-8")).digest()[:16]
+        canonical = self._exact.get(digest)
+        if canonical is not None:
+            self.exact_dups += 1
+            return canonical
+        if len(norm) >= self.min_chars:
+            sig = self.lsh.signature(shingle_hashes(norm))
+            canonical = self.lsh.query(sig)
+            if canonical is not None:
+                self.near_dups += 1
+                self._exact[digest] = canonical
+                return canonical
+            self.lsh.insert(sig, ref)
+        self._exact[digest] = ref
+        return None
+
+def record_ref(row: Dict) -> str:
+    """How dup_of names a record: the chunk id, or <doc_id>:<page> for page records."""
+    return row["id"] if row.get("id") else f"{row['doc_id']}:{row['page']}"
+
+def dedup_file(path: str,
+               indexes: Dict[str, DuplicateIndex],
+               drop: bool = False,
+               threshold: float = DEDUP_THRESHOLD) -> Tuple[int, int, bool]:
+    """Mark (or drop) the duplicates in one record file, rewriting it only if anything changed.
+
+    Args:
+        path: Page or chunk parquet file (local or s3://).
+        indexes: {"page"|"chunk": DuplicateIndex}, shared across files and
+            filled in as needed; pages and chunks are never matched to each other.
+        drop: Remove duplicates instead of only setting dup_of.
+        threshold: Near-duplicate threshold for newly created indexes.
+
+    Returns:
+        (rows_read, rows_written, rewritten).
+    """
+    table = _read_parquet_any(path)
+    kind = "chunk" if "chunk_index" in table.schema.names else "page"
+    schema = CHUNK_SCHEMA if kind == "chunk" else RECORD_SCHEMA
+    table = _conform_table(table, schema)
+    if kind not in indexes:
+        indexes[kind] = DuplicateIndex(threshold=threshold)
+    index = indexes[kind]
+    refs = table.select([c for c in ("id", "doc_id", "page") if c in table.schema.names]).to_pylist()
+    dup_of = [index.check(record_ref(r), t) for r, t in zip(refs, table.column("text").to_pylist())]
+    changed = dup_of != table.column("dup_of").to_pylist()
+    table = table.set_column(schema.get_field_index("dup_of"), "dup_of", pa.array(dup_of, type=pa.string()))
+    if drop and any(d is not None for d in dup_of):
+        table = table.filter(pa.array([d is None for d in dup_of], type=pa.bool_()))
+        changed = True
+    if changed:
+        _write_table_any(table, path)
+    return len(dup_of), table.num_rows, changed
+
+def dedup_main(argv: List[str]):
+    """CLI entry point for `main.py dedup`: mark cross-document duplicates under --out.
+
+    Page partitions and chunk partitions are indexed separately. Partitions
+    and files are visited in sorted path order, so the first copy in that
+    order is canonical and the result is reproducible. Every other copy gets
+    dup_of = the canonical's ref (see record_ref). With --drop, duplicates
+    are removed from the files, so embedding jobs never see them. Compacted
+    partitions' _files.json row counts are updated to match.
+    Do not run this concurrently with an extraction or compaction into the same --out.
+    """
+    ap = argparse.ArgumentParser(prog="main.py dedup",
+                                 description="Mark (or drop) exact and near-duplicate records across documents")
+    ap.add_argument("--out", required=True, help="Extraction output base (local dir or s3://bucket/env=prod/)")
+    ap.add_argument("--prefix", default="", help="Only scan partitions under this sub-path, e.g. zone=text/")
+    ap.add_argument("--drop", action="store_true", help="Remove duplicates instead of only setting dup_of")
+    ap.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD,
+                    help="Estimated Jaccard similarity of word shingles for a near-duplicate")
+    args = ap.parse_args(argv)
+
+    t0 = time.time()
+    partitions = list_partitions(args.out, args.prefix)
+    print(f"[info] found {len(partitions)} partitions under {args.out}")
+    indexes: Dict[str, DuplicateIndex] = {}
+    rows_in = rows_out = rewritten = 0
+    for part_dir, files in sorted(partitions.items()):
+        compact_index = read_compact_index(part_dir)
+        counts = {}
+        for path, _ in sorted(files):
+            n_in, n_out, changed = dedup_file(path, indexes, drop=args.drop, threshold=args.threshold)
+            rows_in += n_in
+            rows_out += n_out
+            rewritten += changed
+            counts[path] = n_out
+        if compact_index and args.drop:
+            for f in compact_index["files"]:
+                f["rows"] = counts.get(f["path"], f["rows"])
+            compact_index["rows"] = sum(f["rows"] for f in compact_index["files"])
+            _write_compact_index(part_dir, compact_index)
+
+    exact = sum(i.exact_dups for i in indexes.values())
+    near = sum(i.near_dups for i in indexes.values())
+    print(f"[done] dedup: {rows_in} records, {exact} exact and {near} near duplicates"
+          f"{f', {rows_in - rows_out} dropped' if args.drop else ''}; "
+          f"{rewritten} files rewritten in {time.time() - t0:.1f}s")
+
 # ------------------------ CLI ------------------------
 
 def main():
@@ -576,9 +3534,17 @@ def main():
       - S3: a single key or prefix of PDFs, output auto-mapped by state/county
         parsed from the input key path.
 
-    Downloads S3 PDFs to a temp directory, processes each sequentially, and
-    cleans up the temp directory on exit.
+    Streams S3 PDFs through a temp directory (downloaded a few ahead of
+    extraction, deleted once written), processes them sequentially or on a
+    process pool (--workers), and cleans up the temp directory on exit.
     """
+    global ALLOW_OCR, OCR_WORKERS, OCR_ENGINE, OCR_CLASSIFY, STRIP_BOILERPLATE, CHUNK_SIZE, CHUNK_OVERLAP
+    global DOC_TIMEOUT_S, PAGE_TIMEOUT_S, LAYOUT_MODE
+    if len(sys.argv) > 1 and sys.argv[1] == "compact":
+        return compact_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "dedup":
+        return dedup_main(sys.argv[2:])
+
     ap = argparse.ArgumentParser(description="PDF → Parquet (local path OR S3 prefix)")
     ap.add_argument("--input", required=True, help="Local file/folder OR s3://bucket/prefix OR s3://bucket/file.pdf")
     ap.add_argument("--out",   required=True, help="For S3 input, use s3://bucket/env=prod[/]; for local input, a dir or s3 prefix")
@@ -587,15 +3553,78 @@ def main():
     ap.add_argument("--state", default=None)
     ap.add_argument("--county", default=None)
     ap.add_argument("--no-ocr", action="store_true", help="Disable OCR fallback entirely")
+    ap.add_argument("--ocr-workers", type=int, default=OCR_WORKERS,
+                    help="OCR processes per extracting process; OCR overlaps the layout pass (0 = inline)")
+    ap.add_argument("--ocr-engine", choices=("auto", "tesserocr", "pytesseract"), default=OCR_ENGINE,
+                    help="OCR backend: in-process tesserocr, pytesseract subprocesses, or auto (tesserocr if installed)")
+    ap.add_argument("--ocr-classify", action="store_true", default=OCR_CLASSIFY,
+                    help="Classify text-poor pages before rendering: skip blank/decorative pages, "
+                         "OCR image pages at low DPI first and escalate only on low confidence")
+    ap.add_argument("--strip-boilerplate", action="store_true", default=STRIP_BOILERPLATE,
+                    help="Strip running headers/footers (top/bottom band lines recurring on most pages of a PDF)")
+    ap.add_argument("--layout-mode", choices=("dict", "fast"), default=LAYOUT_MODE,
+                    help="Text-layer extraction: dict (span-level, default) or fast (word tuples, "
+                         "no image blocks; much higher pages/sec on born-digital PDFs)")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                    help="Also write zone=text_chunk chunk records of up to N characters (0 = page records only)")
+    ap.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP,
+                    help="Characters shared by consecutive chunks")
     ap.add_argument("--s3-max", type=int, default=0, help="Limit PDFs processed from S3 prefix (0 = no limit)")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes for extraction (1 = sequential)")
+    ap.add_argument("--max-inflight", type=int, default=0,
+                    help="Max PDFs submitted to the pool at once (0 = 2 × workers)")
+    ap.add_argument("--split-pages", type=int, default=SPLIT_PAGES,
+                    help="With --workers > 1, split PDFs longer than this into page ranges (0 = never)")
+    ap.add_argument("--io-workers", type=int, default=IO_WORKERS, help="Threads downloading S3 PDFs ahead of extraction")
+    ap.add_argument("--prefetch", type=int, default=0,
+                    help="Max S3 PDFs downloaded ahead of extraction (0 = --max-inflight)")
+    ap.add_argument("--inmem-max-mb", type=float, default=INMEM_MAX_MB,
+                    help="Keep S3 PDFs up to this size in memory instead of on disk (0 = always disk)")
+    ap.add_argument("--upload-workers", type=int, default=UPLOAD_WORKERS,
+                    help="Upload S3 outputs on N background threads while the next PDFs extract (0 = upload inline)")
+    ap.add_argument("--force", action="store_true",
+                    help="Re-extract every PDF even if the manifest says it is unchanged")
+    ap.add_argument("--doc-timeout", type=float, default=DOC_TIMEOUT_S,
+                    help="Wall-clock budget per PDF in seconds; a PDF over it is quarantined (0 = none)")
+    ap.add_argument("--page-timeout", type=float, default=PAGE_TIMEOUT_S,
+                    help="Wall-clock budget per page in seconds; a page over it quarantines its PDF (0 = none)")
+    ap.add_argument("--retry-quarantined", action="store_true",
+                    help="Try quarantined PDFs again instead of skipping them")
+    ap.add_argument("--shard-index", type=int, default=0, help="This task's shard (0-based) when --shard-count > 1")
+    ap.add_argument("--shard-count", type=int, default=1,
+                    help="Split the listed PDFs into N stable hash shards and process only --shard-index")
+    ap.add_argument("--queue", default=None,
+                    help="Lease-based work queue name: claim PDFs one at a time through lease objects, "
+                         "own shard first, then steal unclaimed work from other shards")
+    ap.add_argument("--lease-root", default=None,
+                    help="Where --queue keeps its leases (s3:// prefix or local dir; default <out>/_leases/<queue>)")
+    ap.add_argument("--schedule", choices=["cost", "listing"], default="cost",
+                    help="Order PDFs largest-predicted-cost first (default) or keep listing order")
+    ap.add_argument("--shard-by", choices=["hash", "cost"], default="hash",
+                    help="With --shard-count: stable hash shards (default) or cost-balanced shards")
+    ap.add_argument("--no-metrics", action="store_true",
+                    help="Do not write the per-document / per-page timing sidecar (<out>/_metrics_<run>.parquet)")
     args = ap.parse_args()
+    if args.shard_count < 1 or not 0 <= args.shard_index < args.shard_count:
+        ap.error("--shard-index must be in [0, --shard-count)")
+
+    if args.chunk_size > 0 and not 0 <= args.chunk_overlap < args.chunk_size:
+        ap.error("--chunk-overlap must be >= 0 and smaller than --chunk-size")
 
-    global ALLOW_OCR
+    # CLI overrides of the module tunables last for this run only
+    tunables = _worker_overrides()
     if args.no_ocr:
         ALLOW_OCR = False
+    OCR_WORKERS = max(0, args.ocr_workers)
+    OCR_ENGINE = args.ocr_engine
+    OCR_CLASSIFY = args.ocr_classify
+    STRIP_BOILERPLATE = args.strip_boilerplate
+    LAYOUT_MODE = args.layout_mode
+    CHUNK_SIZE = max(0, args.chunk_size)
+    CHUNK_OVERLAP = args.chunk_overlap
+    DOC_TIMEOUT_S = max(0.0, args.doc_timeout)
+    PAGE_TIMEOUT_S = max(0.0, args.page_timeout)
 
-    total_pdfs = 0
-    total_pages = 0
     t0 = time.time()
 
     tmp_root = Path(tempfile.mkdtemp(prefix="pdf-extract-"))
@@ -603,32 +3632,38 @@ def main():
     tmp_in.mkdir(parents=True, exist_ok=True)
 
     try:
-        tasks: List[Tuple[Path, Optional[str], Optional[str]]] = []
-        # Each task: (local_pdf_path, s3_bucket_if_any, s3_key_if_any)
+        tasks: List[Tuple[Optional[Path], Optional[str], Optional[str]]] = []
+        # Each task: (local_pdf_path_or_None, s3_bucket_if_any, s3_key_if_any);
+        # S3 sources start as None and are downloaded by prefetch_tasks.
+
+        fingerprints: Dict[str, Tuple[str, int]] = {}
+        # input_key -> (etag, size), used by the incremental manifest
 
         if is_s3_uri(args.input):
             in_bucket, in_key = split_s3_uri(args.input)
             if in_key and in_key.lower().endswith(".pdf"):
-                print(f"[info] downloading single PDF from s3://{in_bucket}/{in_key}")
-                local = download_s3_object(in_bucket, in_key, tmp_in)
-                tasks.append((local, in_bucket, in_key))
+                print(f"[info] single PDF from s3://{in_bucket}/{in_key}")
+                tasks.append((None, in_bucket, in_key))
+                try:
+                    head = get_s3_client().head_object(Bucket=in_bucket, Key=in_key)
+                    fingerprints[input_key_for(tasks[-1])] = (head["ETag"].strip('"'), head["ContentLength"])
+                except ClientError:
+                    pass  # the download reports it
             else:
                 prefix = in_key if in_key.endswith("/") else (in_key + "/") if in_key else ""
                 print(f"[info] listing PDFs under s3://{in_bucket}/{prefix} ...")
-                keys = list_s3_pdfs(in_bucket, prefix)
+                objs = list_s3_pdf_objects(in_bucket, prefix)
                 if args.s3_max and args.s3_max > 0:
-                    keys = keys[:args.s3_max]
-                print(f"[info] found {len(keys)} PDFs under prefix")
-                for k in keys:
-                    try:
-                        local = download_s3_object(in_bucket, k, tmp_in)
-                        tasks.append((local, in_bucket, k))
-                    except ClientError as e:
-                        print(f"[error] failed to download s3://{in_bucket}/{k}: {e}")
+                    objs = objs[:args.s3_max]
+                print(f"[info] found {len(objs)} PDFs under prefix")
+                for obj in objs:
+                    tasks.append((None, in_bucket, obj["key"]))
+                    fingerprints[input_key_for(tasks[-1])] = (obj["etag"], obj["size"])
         else:
             in_path = Path(args.input)
             for p in discover_local_pdfs(in_path):
                 tasks.append((p, None, None))
+                fingerprints[input_key_for(tasks[-1])] = local_fingerprint(p)
 
         if not tasks:
             print(f"[error] No PDFs found for input: {args.input}", file=sys.stderr)
@@ -645,42 +3680,157 @@ def main():
                   "Use an s3 prefix like s3://bucket/env=prod/ or a local directory.", file=sys.stderr)
             sys.exit(3)
 
-        for local_pdf, src_bucket, src_key in tasks:
-            total_pdfs += 1
-            print(f"[info] extracting: {local_pdf}")
-            try:
-                # Extract records
-                records = extract_pdf_to_records(local_pdf, args.env, args.zone, args.state, args.county)
-
-                # Decide output path
-                if src_bucket and src_key:
-                    # S3 input: build out path from input key + out base (env=prod)
-                    out_path = build_out_key_from_input(src_bucket, src_key, args.out)
-                else:
-                    # Local input: generic behavior
-                    stem = Path(local_pdf).stem + "_text.parquet"
-                    if args.out.startswith("s3://"):
-                        out_bucket, out_key_base = split_s3_uri(args.out)
-                        out_key_base = out_key_base.strip("/")
-                        if out_key_base and not out_key_base.endswith("/"):
-                            out_key_base = out_key_base + "/"
-                        out_path = f"s3://{out_bucket}/{out_key_base}{stem}"
-                    else:
-                        outdir = Path(args.out)
-                        outdir.mkdir(parents=True, exist_ok=True)
-                        out_path = str(outdir / stem)
+        # Sharding: a stable hash slice per task, or (with --queue) everything, own slice first.
+        # Cost-balanced shards are computed from the full listing only (no manifest hints),
+        # so every task derives the same assignment.
+        sharded = args.shard_count > 1
+        assignment = None
+        if sharded and args.shard_by == "cost":
+            assignment = lpt_shards(tasks, plan_costs(tasks, fingerprints), args.shard_count)
+        if args.queue:
+            if sharded:
+                tasks = own_shard_first(tasks, args.shard_index, args.shard_count, assignment)
+        elif sharded:
+            tasks = select_shard(tasks, args.shard_index, args.shard_count, assignment)
+            print(f"[info] shard {args.shard_index}/{args.shard_count}: {len(tasks)} PDFs")
+
+        # Concurrent tasks each write their own manifest / metrics file
+        owner = f"{socket.gethostname()}-{os.getpid()}"
+        writer = f"shard-{args.shard_index}-of-{args.shard_count}" if sharded else (owner if args.queue else "")
+
+        # Incremental runs: skip inputs whose ETag/size match the (merged) manifests
+        manifest_path = manifest_path_for(args.out, writer)
+        manifest = load_manifests(args.out) if manifest_path else {}
+        own_entries = load_manifest(manifest_path) if manifest_path else {}
+        skipped = 0
+        if manifest and not args.force:
+            tasks, skipped = skip_unchanged(tasks, fingerprints, manifest, args.out)
+            if skipped:
+                print(f"[info] skipping {skipped} unchanged PDFs (use --force to re-extract)")
+
+        # Quarantine: inputs that timed out or killed their worker before are held back
+        quarantine_path = manifest_path_for(args.out, writer, QUARANTINE_NAME)
+        quarantine = load_manifests(args.out, QUARANTINE_NAME, "failed_at") if quarantine_path else {}
+        own_quarantine = load_manifest(quarantine_path) if quarantine_path else {}
+        held = 0
+        if quarantine and not args.retry_quarantined:
+            tasks, held = skip_quarantined(tasks, fingerprints, quarantine, manifest)
+            if held:
+                print(f"[info] skipping {held} quarantined PDFs (use --retry-quarantined to try them again)")
+
+        # Plan: predicted cost per PDF, dispatched largest first (within each shard in queue mode)
+        costs: Dict[str, float] = {}
+        if args.schedule == "cost" and tasks:
+            hints = {k: e["page_count"] for k, e in manifest.items() if e.get("page_count")}
+            costs = plan_costs(tasks, fingerprints, page_hints=hints)
+            if args.queue and sharded:
+                rank = {input_key_for(t): r for r, t in enumerate(tasks)}
+                tasks = sorted(tasks, key=lambda t: (
+                    (_shard(t, args.shard_count, assignment) - args.shard_index) % args.shard_count,
+                    -costs[input_key_for(t)], rank[input_key_for(t)]))
+            else:
+                tasks = largest_first(tasks, costs)
+            plan = f"[info] plan: {len(tasks)} PDFs, predicted {sum(costs.values()):.1f}s of extraction"
+            if not args.queue:
+                plan += (f", ~{predicted_makespan([costs[input_key_for(t)] for t in tasks], args.workers):.1f}s"
+                         f" wall on {max(1, args.workers)} workers")
+            print(plan + " (largest first)")
+        done_predicted = done_actual = 0.0
+
+        dirty = 0
+        run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        metrics_path = None if args.no_metrics else metrics_path_for(args.out, run_id, writer)
+        metrics = ParquetRecordWriter(metrics_path, METRICS_SCHEMA) if metrics_path else None
+
+        lease_table = None
+        if args.queue:
+            lease_root = args.lease_root or f"{args.out.rstrip('/')}/_leases/{args.queue}"
+            lease_table = LeaseTable(lease_root, owner)
+            print(f"[info] work queue {args.queue}: leases under {lease_root}")
+
+        def record_quarantine(task, res):
+            ikey = input_key_for(task)
+            fp = fingerprints.get(ikey)
+            if quarantine_path is None or fp is None:
+                return
+            if res.get("quarantine"):
+                previous = quarantine.get(ikey) or {}
+                own_quarantine[ikey] = {
+                    "input_key": ikey,
+                    "etag": fp[0],
+                    "size": fp[1],
+                    "reason": res["quarantine"],
+                    "page": res.get("quarantine_page"),
+                    "error": res["error"],
+                    "attempts": (previous.get("attempts") or 0) + 1,
+                    "failed_at": now_iso(),
+                }
+                print(f"[warn] quarantined {res['pdf']}: {res['quarantine']}")
+            elif res["error"] is None and own_quarantine.pop(ikey, None) is None:
+                return
+            save_manifest(own_quarantine, quarantine_path, QUARANTINE_SCHEMA)  # rare: saved right away
+
+        def record_result(task, res):
+            nonlocal dirty, done_predicted, done_actual
+            record_quarantine(task, res)
+            predicted = costs.get(input_key_for(task))
+            if predicted is not None:
+                doc = res.setdefault("metrics", {"doc": {}, "pages": []})["doc"]
+                doc["predicted_s"] = predicted
+                done_predicted += predicted
+                done_actual += doc.get("total_s") or 0.0
+            if lease_table is not None:
+                lease_table.complete(input_key_for(task), failed=res["error"] is not None,
+                                     version=lease_version(fingerprints.get(input_key_for(task))))
+            if metrics is not None:
+                for row in metrics_rows(task, res, run_id):
+                    metrics.write(row)
+            fp = fingerprints.get(input_key_for(task))
+            if res["error"] is not None or fp is None or manifest_path is None:
+                return
+            own_entries[input_key_for(task)] = {
+                "input_key": input_key_for(task),
+                "etag": fp[0],
+                "size": fp[1],
+                "output_path": res["out_path"],
+                "chunk_path": res.get("chunk_path"),
+                "extractor_version": extractor_version(),
+                "page_count": res["pages"],
+                "extracted_at": now_iso(),
+            }
+            dirty += 1
+            if dirty % MANIFEST_FLUSH_EVERY == 0:
+                save_manifest(own_entries, manifest_path)
 
-                # Write parquet
-                write_parquet(records, out_path)
-                total_pages += len(records)
+        t_run = time.time()
+        try:
+            if lease_table is not None:
+                with lease_table:
+                    total_pdfs, total_pages = run_tasks(leased_tasks(tasks, lease_table, fingerprints), args, tmp_in,
+                                                        on_result=record_result)
+            else:
+                total_pdfs, total_pages = run_tasks(tasks, args, tmp_in, on_result=record_result)
+        finally:
+            if dirty and manifest_path:
+                save_manifest(own_entries, manifest_path)
+            if metrics is not None and metrics.started:
+                metrics.close()
 
-            except Exception as e:
-                print(f"[error] failed on {local_pdf}: {e}", file=sys.stderr)
+        if costs and total_pdfs:
+            print(f"[info] plan vs actual: predicted {done_predicted:.1f}s of extraction, took "
+                  f"{done_actual:.1f}s ({time.time() - t_run:.1f}s wall)")
 
         dt = time.time() - t0
-        print(f"[done] processed {total_pdfs} PDFs, {total_pages} pages in {dt:.1f}s")
+        summary = f"[done] processed {total_pdfs} PDFs, {total_pages} pages in {dt:.1f}s"
+        if skipped:
+            summary += f" ({skipped} unchanged PDFs skipped)"
+        if held:
+            summary += f" ({held} quarantined PDFs skipped)"
+        print(summary)
 
     finally:
+        discard_ocr_pool(wait=True)
+        globals().update(tunables)
         try:
             shutil.rmtree(tmp_root)
         except Exception:
@@ -0,0 +1,10 @@
+"""CLI argument namespaces for the tests that drive run_tasks directly."""
+
+import argparse
+
+
+def run_args(out: str, workers: int, split_pages: int = 0, upload_workers: int = 0) -> argparse.Namespace:
+    """Namespace with the options run_tasks reads, for a GA/Fulton prod text run."""
+    return argparse.Namespace(out=out, env="prod", zone="text", state="GA", county="Fulton",
+                              workers=workers, max_inflight=0, split_pages=split_pages,
+                              io_workers=2, prefetch=0, inmem_max_mb=0, upload_workers=upload_workers)
@@ -0,0 +1,190 @@
+"""Frozen copy of the original dict-based layout extraction.
+
+Used as the reference in equivalence tests for the array-backed and fast
+layout paths in main.py. Do not optimise this file.
+"""
+
+from typing import List
+
+import fitz
+
+Y_TOL = 2.0
+MIN_GAP_RATIO = 0.12
+EDGE_MARGIN_RATIO = 0.15
+MIN_BLOCKS_PER_COLUMN = 4
+GUTTER_MID_BAND = (0.35, 0.65)
+TRIM_TOP_BOTTOM_RATIO = 0.08
+
+
+def _collect_items_dict(page: fitz.Page):
+    """Extract all text line items from a page using PyMuPDF's dict mode.
+
+    Iterates over text blocks and their lines, collecting each non-empty line
+    as a dict with its block index, bounding-box coordinates (x, y, x1), and
+    concatenated span text. Non-text blocks (e.g. images) are skipped.
+
+    Args:
+        page: A PyMuPDF page object.
+
+    Returns:
+        List of dicts, each with keys: 'bidx' (block index), 'y' (top y),
+        'x' (left x), 'x1' (right x), 'text' (line text content).
+    """
+    d = page.get_text("dict") or {}
+    items = []
+    for b_idx, b in enumerate(d.get("blocks", [])):
+        if b.get("type", 0) != 0:
+            continue
+        for ln in b.get("lines", []):
+            spans = ln.get("spans", [])
+            if not spans:
+                continue
+            x0, y0, x1, y1 = ln.get("bbox", (0, 0, 0, 0))
+            txt = "".join((s.get("text") or "") for s in spans)
+            txt = txt.replace("\r\n", "\n").replace("\r", "\n")
+            if not txt.strip():
+                continue
+            items.append({"bidx": b_idx, "y": y0, "x": x0, "x1": x1, "text": txt.rstrip()})
+    return items
+
+def _items_to_columns(items: List[dict], page_width: float):
+    """Detect whether a page has a two-column layout and split items accordingly.
+
+    Finds the largest horizontal gap between line centers (the "gutter") after
+    trimming header/footer bands. The gutter must pass several sanity checks:
+    it must be in the central band of the page, wide enough relative to page
+    width, and have enough items on each side.
+
+    Args:
+        items: Line items from _collect_items_dict.
+        page_width: The width of the PDF page in points.
+
+    Returns:
+        Tuple of (left_items, right_items, gutter_x). If no two-column layout
+        is detected, returns (items, [], None).
+    """
+    # Need enough signals to even consider a split
+    need = max(4, 2 * MIN_BLOCKS_PER_COLUMN)
+    if len(items) < need:
+        return items, [], None
+
+    # Trim top/bottom bands to avoid headers/footers polluting gutter search
+    ys = sorted(it["y"] for it in items)
+    if ys:
+        k = int(len(ys) * TRIM_TOP_BOTTOM_RATIO)
+        y_lo = ys[k] if k < len(ys) else ys[0]
+        y_hi = ys[-k-1] if k > 0 else ys[-1]
+        trimmed = [it for it in items if y_lo <= it["y"] <= y_hi]
+        if len(trimmed) >= need:
+            work = trimmed
+        else:
+            work = items
+    else:
+        work = items
+
+    # Use true line centers (x0+x1)/2. Fallback to x if x1 missing.
+    centers = []
+    for it in work:
+        x0 = it.get("x", 0.0)
+        x1 = it.get("x1", None)
+        c  = 0.5 * (x0 + x1) if isinstance(x1, (int, float)) else float(x0)
+        centers.append(c)
+
+    if len(centers) < need:
+        return items, [], None
+
+    centers.sort()
+    max_gap, mid = 0.0, None
+    for i in range(len(centers) - 1):
+        gap = centers[i+1] - centers[i]
+        if gap > max_gap:
+            max_gap = gap
+            mid = 0.5 * (centers[i+1] + centers[i])
+
+    if mid is None:
+        return items, [], None
+
+    # Stronger interior checks
+    if not (EDGE_MARGIN_RATIO * page_width < mid < (1.0 - EDGE_MARGIN_RATIO) * page_width):
+        return items, [], None
+
+    lo_band, hi_band = GUTTER_MID_BAND
+    if not (lo_band * page_width <= mid <= hi_band * page_width):
+        return items, [], None
+
+    if max_gap < (MIN_GAP_RATIO * page_width):
+        return items, [], None
+
+    # Split by center (not x+100)
+    left, right = [], []
+    for it in items:
+        x0 = it.get("x", 0.0)
+        x1 = it.get("x1", None)
+        c  = 0.5 * (x0 + x1) if isinstance(x1, (int, float)) else float(x0)
+        (left if c <= mid else right).append(it)
+
+    if len(left) < MIN_BLOCKS_PER_COLUMN or len(right) < MIN_BLOCKS_PER_COLUMN:
+        return items, [], None
+
+    return left, right, mid
+
+
+def _sort_items(items: List[dict]):
+    """Sort line items into reading order (top-to-bottom, left-to-right).
+
+    Groups items into rows based on vertical proximity (within Y_TOL points),
+    sorts each row left-to-right by x-coordinate, then flattens into a single
+    ordered list.
+
+    Args:
+        items: Line items from _collect_items_dict or _items_to_columns.
+
+    Returns:
+        List of items reordered into natural reading sequence.
+    """
+    if not items:
+        return []
+    items = sorted(items, key=lambda it: it["y"])
+    rows, cur = [], []
+    last_y = None
+    for it in items:
+        if last_y is None or abs(it["y"] - last_y) <= Y_TOL:
+            cur.append(it)
+            last_y = it["y"] if last_y is None else (last_y + it["y"]) / 2.0
+        else:
+            cur.sort(key=lambda z: (round(z["x"], 2), z["bidx"]))
+            rows.append(cur)
+            cur = [it]
+            last_y = it["y"]
+    if cur:
+        cur.sort(key=lambda z: (round(z["x"], 2), z["bidx"]))
+        rows.append(cur)
+    return [it for row in rows for it in row]
+
+def page_text_layout(page: fitz.Page) -> str:
+    """Extract text from a PDF page with layout-aware reading order.
+
+    Handles both single-column and two-column layouts. For two-column pages,
+    text is read left column first (top to bottom), then right column, with
+    columns separated by a blank line. For single-column pages, items are
+    sorted in standard reading order.
+
+    Args:
+        page: A PyMuPDF page object.
+
+    Returns:
+        The full page text as a single string in reading order.
+    """
+    items = _collect_items_dict(page)
+    if not items:
+        return ""
+    left, right, gutter = _items_to_columns(items, page.rect.width)
+
+    def join_items(its: List[dict]) -> str:
+        ordered = _sort_items(its)
+        return "\n".join(it["text"] for it in ordered if it["text"].strip())
+
+    if gutter is None:
+        return join_items(items).strip()
+    return "\n\n".join(s for s in (join_items(left), join_items(right)) if s).strip()
+
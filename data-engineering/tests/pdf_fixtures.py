@@ -0,0 +1,45 @@
+"""Tiny PDFs built with PyMuPDF for the extractor tests."""
+
+from pathlib import Path
+from typing import List
+
+import fitz
+
+
+def make_text_pdf(path: Path, pages: List[List[str]]) -> Path:
+    """Write a born-digital PDF with one text line per entry on each page."""
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page(width=612, height=792)
+        y = 72
+        for line in lines:
+            page.insert_text((72, y), line, fontsize=11)
+            y += 14
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def make_two_column_pdf(path: Path, n_pages: int = 1, rows: int = 30) -> Path:
+    """Write a two-column legal-style layout: left and right columns per row."""
+    doc = fitz.open()
+    for p in range(n_pages):
+        page = doc.new_page(width=612, height=792)
+        page.insert_text((250, 40), f"CODE OF ORDINANCES page {p + 1}", fontsize=9)
+        for r in range(rows):
+            y = 80 + r * 20
+            page.insert_text((60, y), f"Sec. {p}-{r}. Left text {r}", fontsize=10)
+            page.insert_text((340, y), f"Right text {p}-{r} here", fontsize=10)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def sample_pages(n: int) -> List[List[str]]:
+    """Deterministic page contents long enough to skip the OCR fallback."""
+    return [
+        [f"Section {i + 1}. General provisions of the county code.",
+         f"(a) Paragraph text for page {i + 1} that is long enough.",
+         "(b) Another enumerated paragraph."]
+        for i in range(n)
+    ]
@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import fitz
+import pyarrow.parquet as pq
+
+import main
+from benchmarks.corpus import CORPUS_KINDS, make_corpus
+from benchmarks.parquet_layout import run_layout_benchmark
+from benchmarks.run import compare_reports, run_benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_corpus_is_deterministic(self):
+        for kind in CORPUS_KINDS:
+            with self.subTest(kind=kind):
+                a = make_corpus(self.tmp / f"{kind}-a.pdf", kind, 4, seed=1)
+                b = make_corpus(self.tmp / f"{kind}-b.pdf", kind, 4, seed=1)
+                self.assertEqual(a.read_bytes(), b.read_bytes())
+        with fitz.open(self.tmp / "scanned-a.pdf") as doc:
+            self.assertEqual(main.page_text_layout(doc[0]), "")
+        with fitz.open(self.tmp / "two_column-a.pdf") as doc:
+            self.assertIn("CODE OF ORDINANCES", main.page_text_layout(doc[0]))
+
+    def test_report_rows(self):
+        report = run_benchmarks([3], ["page_text_layout", "write_parquet"], self.tmp,
+                                repeat=1, isolate=False)
+        rows = report["results"]
+        self.assertEqual(len(rows), len(CORPUS_KINDS) + 1)
+        for row in rows:
+            self.assertEqual(row["pages"], 3)
+            self.assertGreater(row["pages_per_sec"], 0)
+            self.assertGreater(row["peak_rss_mb"], 0)
+
+        slower = {"results": [dict(r, pages_per_sec=r["pages_per_sec"] / 2) for r in rows]}
+        self.assertEqual(compare_reports(report, slower, 0.1)[0]["ratio"], 0.5)
+        self.assertEqual(compare_reports(slower, report, 0.1), [])
+
+    def test_parquet_layout(self):
+        with patch.object(main, "ROW_GROUP_PAGES", 20):
+            report = run_layout_benchmark(docs=8, pages=10, work_dir=self.tmp, repeat=1)
+        self.assertEqual(report["meta"]["rows"], 80)
+        self.assertLess(report["tuned"]["bytes"], report["default"]["bytes"])
+        self.assertEqual((report["tuned"]["row_groups"], report["tuned"]["lookup_row_groups"]), (4, 1))
+        meta = pq.ParquetFile(self.tmp / "tuned.parquet").metadata
+        self.assertEqual(meta.row_group(0).column(0).compression, "ZSTD")
+        self.assertEqual([c.column_index for c in meta.row_group(0).sorting_columns], [0, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
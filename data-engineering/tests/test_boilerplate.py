@@ -0,0 +1,95 @@
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import fitz
+
+import main
+
+HEADER = "CODE OF ORDINANCES - FULTON COUNTY"
+
+
+def make_paged_pdf(path: Path, n_pages: int, two_column: bool = False) -> Path:
+    """Pages with a running header, a 'Supp. No.' line and a numbered footer around body text."""
+    doc = fitz.open()
+    for p in range(n_pages):
+        page = doc.new_page(width=612, height=792)
+        page.insert_text((72, 36), HEADER, fontsize=9)
+        page.insert_text((480, 36), "Supp. No. 12", fontsize=9)
+        for r in range(12):
+            y = 120 + r * 20
+            if two_column:
+                page.insert_text((60, y), f"Sec. {p}-{r}. Left column text", fontsize=10)
+                page.insert_text((340, y), f"Right column text {p}-{r} here", fontsize=10)
+            else:
+                page.insert_text((72, y), f"Sec. {p}-{r}. Body text of page {p + 1}, line {r}.", fontsize=10)
+        if p == 1:
+            page.insert_text((72, 400), HEADER, fontsize=10)  # quoted in the body: kept
+        page.insert_text((290, 770), f"Page {p + 1}", fontsize=9)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+class TestBoilerplate(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _texts(self, pdf, **kwargs):
+        return [r["text"] for r in main.extract_pdf_to_records(pdf, None, None, None, None, **kwargs)]
+
+    def test_keys_need_recurrence(self):
+        bands = {i: [(main.TOP, HEADER), (main.BOTTOM, f"Page {i + 1}")] for i in range(4)}
+        bands[0].append((main.TOP, "Chapter 1 title"))
+        keys = main.boilerplate_keys(bands)
+        self.assertEqual(keys, {(main.TOP, main._boilerplate_key(HEADER)), (main.BOTTOM, "page #")})
+        self.assertEqual(main.boilerplate_keys({0: bands[0], 1: bands[1]}), set())
+
+    def test_strip_keeps_repeats_in_body(self):
+        text = "\n".join([HEADER, "Body", HEADER, "Page 2"])
+        keys = {(main.TOP, main._boilerplate_key(HEADER)), (main.BOTTOM, "page #")}
+        out = main.strip_boilerplate(text, [(main.TOP, HEADER), (main.BOTTOM, "Page 2")], keys)
+        self.assertEqual(out, "Body\n" + HEADER)
+
+    def test_headers_and_footers_stripped(self):
+        for two_column in (False, True):
+            with self.subTest(two_column=two_column):
+                pdf = make_paged_pdf(self.tmp / f"code{two_column}.pdf", 5, two_column)
+                with patch.object(main, "STRIP_BOILERPLATE", False):
+                    raw = self._texts(pdf)
+                with patch.object(main, "STRIP_BOILERPLATE", True):
+                    clean = self._texts(pdf)
+                self.assertTrue(all(HEADER in t and "Supp. No. 12" in t for t in raw))
+                for p, t in enumerate(clean):
+                    self.assertNotIn("Supp. No. 12", t)
+                    self.assertNotIn(f"Page {p + 1}", t)
+                    self.assertIn(f"Sec. {p}-0.", t)
+                    self.assertEqual(t.count(HEADER), 1 if p == 1 else 0)
+                    self.assertLess(len(t), len(raw[p]))
+
+    def test_short_documents_untouched(self):
+        pdf = make_paged_pdf(self.tmp / "short.pdf", 2)
+        with patch.object(main, "STRIP_BOILERPLATE", False):
+            raw = self._texts(pdf)
+        with patch.object(main, "STRIP_BOILERPLATE", True):
+            self.assertEqual(self._texts(pdf), raw)
+
+    def test_split_ranges_match(self):
+        pdf = make_paged_pdf(self.tmp / "big.pdf", 7)
+        with patch.object(main, "STRIP_BOILERPLATE", True):
+            whole = self._texts(pdf)
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                split = self._texts(pdf, executor=pool, range_pages=2)
+        self.assertEqual(whole, split)
+        self.assertNotIn("Supp. No. 12", "".join(split))
+
+
+if __name__ == "__main__":
+    unittest.main()
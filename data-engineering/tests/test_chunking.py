@@ -0,0 +1,97 @@
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+import main
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+
+def _pages(texts):
+    return [{
+        "doc_id": "d1", "source_name": "ordinance.pdf", "page": i + 1, "text": t,
+        "extracted_at": "2024-01-01T00:00:00+00:00", "env": "prod", "zone": "text",
+        "state": "GA", "county": "Fulton",
+    } for i, t in enumerate(texts)]
+
+
+def _words(rng, n):
+    return " ".join(rng.choice(["zoning", "ordinance", "section", "county", "shall", "permit", "a"])
+                    for _ in range(n))
+
+
+class TestChunker(unittest.TestCase):
+
+    def test_windows_cover_stream_and_cross_pages(self):
+        rng = random.Random(7)
+        for trial in range(50):
+            with self.subTest(trial=trial):
+                texts = [_words(rng, rng.randint(0, 120)) for _ in range(rng.randint(1, 6))]
+                size, overlap = rng.choice([(200, 50), (120, 0), (80, 30)])
+                chunks = list(main.chunk_records(_pages(texts), size, overlap))
+
+                stream = main.PAGE_JOINER.join(texts)
+                self.assertEqual([c["chunk_index"] for c in chunks], list(range(len(chunks))))
+                pos = 0
+                for c in chunks:
+                    self.assertLessEqual(c["char_len"], size)
+                    found = stream.find(c["text"], max(0, pos - overlap - 1))
+                    self.assertGreaterEqual(found, 0)
+                    self.assertEqual(stream[pos:found].strip(), "")  # no text is skipped between chunks
+                    first_page = stream.count(main.PAGE_JOINER, 0, found) + 1
+                    last_page = stream.count(main.PAGE_JOINER, 0, found + len(c["text"])) + 1
+                    self.assertEqual((c["page"], c["end_page"]), (first_page, last_page))
+                    pos = found + len(c["text"])
+                if stream.strip():
+                    self.assertEqual(pos, len(stream.rstrip()))
+                else:
+                    self.assertEqual(chunks, [])
+
+    def test_chunk_record_fields(self):
+        chunks = list(main.chunk_records(_pages(["alpha " * 30, "beta " * 30]), 100, 20))
+        self.assertTrue(any(c["page"] == 1 and c["end_page"] == 2 for c in chunks))
+        self.assertEqual(chunks[0]["id"], "GA_Fulton_ordinance_0")
+        self.assertEqual({c["zone"] for c in chunks}, {"text_chunk"})
+        with self.assertRaises(ValueError):
+            list(main.chunk_records(_pages(["x"]), 100, 100))
+
+    def test_chunk_path_for(self):
+        self.assertEqual(main.chunk_path_for("s3://b/env=prod/zone=text/state=GA/county=Fulton/a_text.parquet"),
+                         "s3://b/env=prod/zone=text_chunk/state=GA/county=Fulton/a_chunks.parquet")
+        self.assertEqual(main.chunk_path_for(str(Path("out") / "a_text.parquet")),
+                         str(Path("out") / "zone=text_chunk" / "a_chunks.parquet"))
+        self.assertEqual(main.chunk_path_for("s3://b/env=prod/a.parquet"),
+                         "s3://b/env=prod/zone=text_chunk/a_chunks.parquet")
+
+
+class TestChunkedExtraction(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_one_pass_writes_pages_and_chunks(self):
+        pdf = make_text_pdf(self.tmp / "doc.pdf", sample_pages(4))
+        out = self.tmp / "out"
+        with patch.object(main, "CHUNK_SIZE", 150), patch.object(main, "CHUNK_OVERLAP", 30):
+            res = main.process_pdf_task(pdf, None, None, str(out), "prod", "text", "GA", "Fulton")
+        self.assertIsNone(res["error"])
+        self.assertEqual(res["pages"], 4)
+
+        pages = pq.read_table(out / "doc_text.parquet")
+        chunks = pq.read_table(out / "zone=text_chunk" / "doc_chunks.parquet", partitioning=None)
+        self.assertEqual(res["chunks"], chunks.num_rows)
+        self.assertEqual(chunks.schema, main.CHUNK_SCHEMA)
+        self.assertEqual(chunks.column("page")[0].as_py(), 1)
+        self.assertEqual(chunks.column("end_page")[-1].as_py(), 4)
+        self.assertEqual(set(chunks.column("doc_id").to_pylist()), set(pages.column("doc_id").to_pylist()))
+
+
+if __name__ == "__main__":
+    unittest.main()
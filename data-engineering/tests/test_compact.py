@@ -0,0 +1,125 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+import main
+
+
+def _records(source_name, doc_id, pages, ts="2024-01-01T00:00:00+00:00", text="page"):
+    return [{
+        "doc_id": doc_id, "source_name": source_name, "page": p, "text": f"{text} {p}",
+        "is_ocr": False, "char_len": 6, "sha256": "x", "extracted_at": ts,
+        "env": "prod", "zone": "text", "state": "GA", "county": "Fulton",
+    } for p in pages]
+
+
+class TestCompaction(unittest.TestCase):
+
+    def setUp(self):
+        self.out = Path(tempfile.mkdtemp())
+        self.part = self.out / "zone=text" / "state=GA" / "county=Fulton"
+
+    def tearDown(self):
+        shutil.rmtree(self.out, ignore_errors=True)
+
+    def _write(self, name, records):
+        path = str(self.part / name)
+        main.write_parquet(records, path)
+        return path
+
+    def test_compacts_sorts_and_indexes(self):
+        paths = {}
+        for doc in ["c", "a", "b"]:
+            paths[f"{doc}.pdf"] = self._write(f"{doc}_text.parquet", _records(f"{doc}.pdf", doc, [3, 1, 2]))
+        main.save_manifest({f"s3://in/{name}": {
+            "input_key": f"s3://in/{name}", "etag": "e", "size": 1, "output_path": path,
+            "extractor_version": main.EXTRACTOR_VERSION, "page_count": 3, "extracted_at": "t",
+        } for name, path in paths.items()}, main.manifest_path_for(str(self.out)))
+
+        main.compact_main(["--out", str(self.out)])
+
+        index = json.loads((self.part / main.COMPACT_INDEX_NAME).read_text())
+        files = sorted(p.name for p in self.part.glob("*.parquet"))
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith("part-"))
+        self.assertEqual(index["rows"], 9)
+        self.assertEqual([f["rows"] for f in index["files"]], [9])
+
+        table = pq.read_table(index["files"][0]["path"], partitioning=None)
+        self.assertEqual(list(zip(table.column("doc_id").to_pylist(), table.column("page").to_pylist())),
+                         [(d, p) for d in "abc" for p in (1, 2, 3)])
+
+        manifest = main.load_manifest(main.manifest_path_for(str(self.out)))
+        self.assertEqual({e["output_path"] for e in manifest.values()}, {index["files"][0]["path"]})
+
+        # Already compacted: a second run leaves the partition alone
+        with patch.object(main, "compact_partition") as again:
+            main.compact_main(["--out", str(self.out)])
+        again.assert_not_called()
+
+    def test_size_target_and_reextracted_pdf_wins(self):
+        self._write("a_text.parquet", _records("a.pdf", "a", range(1, 41), text="old"))
+        main.compact_main(["--out", str(self.out)])
+        self._write("a_text.parquet", _records("a.pdf", "a2", range(1, 31), ts="2024-02-01T00:00:00+00:00"))
+        self._write("b_text.parquet", _records("b.pdf", "b", range(1, 31)))
+
+        size = sum(p.stat().st_size for p in self.part.glob("*.parquet"))
+        files = [(str(p), p.stat().st_size) for p in self.part.glob("*.parquet")]
+        main.compact_partition(str(self.part), files, target_bytes=size // 3, run_id="t2")
+
+        index = main.read_compact_index(str(self.part))
+        self.assertEqual(index["rows"], 60)  # the 40 stale pages of a.pdf are dropped
+        self.assertGreater(len(index["files"]), 1)
+        self.assertEqual(sorted(str(p) for p in self.part.glob("*.parquet")),
+                         sorted(f["path"] for f in index["files"]))
+        texts = pq.read_table(index["files"][0]["path"], partitioning=None).column("text").to_pylist()
+        self.assertNotIn("old 1", texts)
+
+    def test_manifest_repointed_per_partition(self):
+        entries = {}
+        for county in ("Fulton", "Cobb"):
+            path = self.out / "zone=text" / "state=GA" / f"county={county}" / "code_text.parquet"
+            main.write_parquet(_records("code.pdf", f"code-{county}", [1, 2]), str(path))
+            key = f"s3://in/GA/county={county}/code.pdf"
+            entries[key] = {
+                "input_key": key, "etag": "e", "size": 1, "output_path": str(path),
+                "extractor_version": main.extractor_version(), "page_count": 2, "extracted_at": "t",
+            }
+        main.save_manifest(entries, main.manifest_path_for(str(self.out)))
+
+        main.compact_main(["--out", str(self.out)])
+
+        manifest = main.load_manifest(main.manifest_path_for(str(self.out)))
+        for county in ("Fulton", "Cobb"):
+            with self.subTest(county=county):
+                new_path = manifest[f"s3://in/GA/county={county}/code.pdf"]["output_path"]
+                self.assertIn(f"county={county}", new_path)
+                self.assertEqual(pq.read_table(new_path, partitioning=None).column("doc_id")[0].as_py(),
+                                 f"code-{county}")
+
+    def test_mixed_schemas_compact_separately(self):
+        self._write("a_text.parquet", _records("a.pdf", "a", [1, 2]))
+        chunks = [{"id": f"a_{i}", "doc_id": "a", "source_name": "a.pdf", "chunk_index": i, "page": 1,
+                   "end_page": 2, "text": f"chunk {i}", "char_len": 7, "sha256": "x",
+                   "extracted_at": "2024-01-01T00:00:00+00:00", "env": "prod", "zone": "text_chunk",
+                   "state": "GA", "county": "Fulton"} for i in range(3)]
+        main.write_parquet(chunks, str(self.part / "a_chunks.parquet"), main.CHUNK_SCHEMA)
+
+        files = [(str(p), p.stat().st_size) for p in self.part.glob("*.parquet")]
+        index, moved = main.compact_partition(str(self.part), files, target_bytes=1 << 30, run_id="t")
+
+        self.assertEqual(index["rows"], 5)
+        self.assertEqual(len(index["files"]), 2)
+        schemas = {"chunk_index" in pq.read_table(f["path"], partitioning=None).schema.names
+                   for f in index["files"]}
+        self.assertEqual(schemas, {True, False})
+        self.assertEqual(len(set(moved.values())), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
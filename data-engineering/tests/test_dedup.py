@@ -0,0 +1,131 @@
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import main
+from tests.pdf_fixtures import make_text_pdf
+
+
+def fee_schedule(tweak: str = "") -> list:
+    """A page of boilerplate that several counties republish."""
+    lines = [f"Fee schedule item {i}: permit review charge of {10 * i} dollars per application." for i in range(12)]
+    if tweak:
+        lines[5] = tweak
+    return lines
+
+
+def unique_page(tag: str) -> list:
+    return [f"{tag} ordinance section {i} regulates local matters specific to {tag}." for i in range(10)]
+
+
+def read(path):
+    return pq.read_table(path, partitioning=None).to_pylist()
+
+
+class TestMinHash(unittest.TestCase):
+
+    def test_near_duplicates_match(self):
+        base = " ".join(fee_schedule())
+        near = " ".join(fee_schedule(tweak="Fee schedule item 5: permit charge waived."))
+        other = " ".join(unique_page("Fulton"))
+        lsh = main.MinHashLSH()
+        sig = lambda t: lsh.signature(main.shingle_hashes(main.normalize_for_dedup(t)))
+        self.assertTrue((sig(base) == sig(base)).all())
+        lsh.insert(sig(base), "a:1")
+        self.assertEqual(lsh.query(sig(near)), "a:1")
+        self.assertIsNone(lsh.query(sig(other)))
+
+    def test_duplicate_index(self):
+        index = main.DuplicateIndex()
+        text = " ".join(fee_schedule())
+        self.assertIsNone(index.check("a:1", text))
+        self.assertEqual(index.check("b:1", text.upper().replace(" ", "\n")), "a:1")
+        self.assertIsNone(index.check("a:2", "Reserved."))
+        self.assertEqual(index.check("b:2", "reserved."), "a:2")
+        self.assertIsNone(index.check("c:1", "Reserved. See Chapter 4."))  # short: exact matches only
+        self.assertIsNone(index.check("c:2", ""))
+        self.assertEqual((index.exact_dups, index.near_dups), (2, 0))
+
+    def test_bad_banding(self):
+        with self.assertRaises(ValueError):
+            main.MinHashLSH(num_perm=100, bands=16)
+
+
+class TestDedupCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.inp = self.tmp / "in"
+        self.inp.mkdir()
+        self.out = self.tmp / "out"
+        tweak = "Fee schedule item 5: permit review charge of 55 dollars per application."
+        make_text_pdf(self.inp / "a.pdf", [unique_page("Alpha"), fee_schedule()])
+        make_text_pdf(self.inp / "b.pdf", [fee_schedule(), unique_page("Bravo"), fee_schedule(tweak)])
+        make_text_pdf(self.inp / "c.pdf", [unique_page("Charlie")])
+        self._extract(self.out)
+
+    def _extract(self, out, *extra):
+        self._main("--input", str(self.inp), "--out", str(out), "--no-ocr", "--no-metrics", *extra)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _main(self, *argv):
+        buf = io.StringIO()
+        with patch("sys.argv", ["main.py", *argv]), redirect_stdout(buf), patch.object(main, "CHUNK_SIZE", 0):
+            main.main()
+        return buf.getvalue()
+
+    def _dedup(self, *extra, out=None):
+        return self._main("dedup", "--out", str(out or self.out), *extra)
+
+    def test_marks_exact_and_near_duplicates(self):
+        log = self._dedup()
+        a, b, c = (read(self.out / f"{n}_text.parquet") for n in "abc")
+        canonical = f"{a[1]['doc_id']}:2"
+        self.assertEqual([r["dup_of"] for r in a], [None, None])
+        self.assertEqual([r["dup_of"] for r in b], [canonical, None, canonical])
+        self.assertEqual([r["dup_of"] for r in c], [None])
+        self.assertIn("1 exact and 1 near duplicates", log)
+        # Idempotent: nothing changes on a second pass
+        self.assertIn("0 files rewritten", self._dedup())
+
+    def test_chunks_indexed_separately(self):
+        shutil.copy(self.inp / "c.pdf", self.inp / "d.pdf")
+        out = self.tmp / "chunked"
+        self._extract(out, "--chunk-size", "100000")
+        self.assertIn("3 exact and 1 near duplicates", self._dedup(out=out))
+        chunks = out / "zone=text_chunk"
+        c, d = read(chunks / "c_chunks.parquet"), read(chunks / "d_chunks.parquet")
+        self.assertEqual(d[0]["dup_of"], c[0]["id"])
+        self.assertEqual(read(out / "d_text.parquet")[0]["dup_of"], f"{c[0]['doc_id']}:1")
+
+    def test_drop_and_compact(self):
+        self.assertIn("2 dropped", self._dedup("--drop"))
+        self.assertEqual([r["page"] for r in read(self.out / "b_text.parquet")], [2])
+        self._main("compact", "--out", str(self.out))
+        rows = [r for p in self.out.glob("part-*.parquet") for r in read(p)]
+        self.assertEqual(len([r for r in rows if "chunk_index" not in r]), 4)
+        index = main.read_compact_index(str(self.out))
+        self.assertEqual(index["rows"], sum(f["rows"] for f in index["files"]))
+
+    def test_files_without_dup_of_column(self):
+        path = self.out / "a_text.parquet"
+        table = pq.read_table(path, partitioning=None)
+        pq.write_table(table.drop(["dup_of"]), path)
+        legacy = self.out / "legacy_text.parquet"
+        pq.write_table(pa.Table.from_pylist([{**read(self.out / "c_text.parquet")[0], "doc_id": "old"}])
+                       .drop(["dup_of"]), legacy)
+        self._dedup()
+        self.assertEqual(read(legacy)[0]["dup_of"], f"{read(self.out / 'c_text.parquet')[0]['doc_id']}:1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import random
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import fitz
+
+import main
+from tests import legacy_layout
+from tests.pdf_fixtures import make_text_pdf, make_two_column_pdf, sample_pages
+
+
+def layout_corpus(tmp: Path):
+    """Fixture pages covering single-column, two-column and near-empty layouts."""
+    pdfs = [
+        make_text_pdf(tmp / "single.pdf", sample_pages(3)),
+        make_two_column_pdf(tmp / "two_col.pdf", n_pages=3, rows=30),
+        make_two_column_pdf(tmp / "short_cols.pdf", n_pages=1, rows=3),
+        make_text_pdf(tmp / "sparse.pdf", [["A."], ["(1)", "(2)"], []]),
+    ]
+    doc = fitz.open()
+    page = doc.new_page()
+    for i in range(40):
+        # Same-row items in different blocks, jittered y, out-of-order inserts
+        page.insert_text((300 - (i % 3) * 100, 100 + (i // 3) * 12 + (i % 2) * 0.7), f"cell {i}")
+    doc.save(str(tmp / "table.pdf"))
+    pdfs.append(tmp / "table.pdf")
+
+    doc = fitz.open()
+    page = doc.new_page()
+    for i in range(25):
+        # Lines 1.5pt apart drift past Y_TOL within one run of small gaps
+        page.insert_text((72 + (i % 4) * 40.675, 100 + i * 1.5), f"d{i}", fontsize=4)
+    doc.save(str(tmp / "dense.pdf"))
+    pdfs.append(tmp / "dense.pdf")
+    pdfs.append(make_three_column_pdf(tmp / "three_col.pdf"))
+    return pdfs
+
+
+def make_three_column_pdf(path: Path) -> Path:
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    for r in range(25):
+        for c, x in enumerate((40, 240, 440)):
+            page.insert_text((x, 80 + r * 18), f"col{c} line {r:02d}", fontsize=10)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def random_items(rng: random.Random, n: int):
+    """Random line boxes shaped like code pages: rows, columns, jitter and ties."""
+    items = []
+    for _ in range(n):
+        y = rng.choice([rng.uniform(40, 760), round(rng.uniform(40, 760)), 100 + rng.randrange(30) * 1.5])
+        x = rng.choice([rng.uniform(40, 280), rng.uniform(320, 560), 72.0, 2.675 * rng.randrange(20, 200)])
+        items.append({"bidx": rng.randrange(12), "y": y, "x": x,
+                      "x1": x + rng.uniform(10, 240), "text": f"t{len(items)}"})
+    return items
+
+
+class TestPageLayout(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = Path(tempfile.mkdtemp())
+        cls.pdfs = layout_corpus(cls.tmp)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_matches_legacy_layout(self):
+        for pdf in self.pdfs:
+            with fitz.open(str(pdf)) as doc:
+                for page in doc:
+                    with self.subTest(pdf=pdf.name, page=page.number):
+                        self.assertEqual(main.page_text_layout(page), legacy_layout.page_text_layout(page))
+
+    def test_vectorized_matches_legacy_on_random_pages(self):
+        rng = random.Random(1234)
+        for trial in range(300):
+            items = random_items(rng, rng.randrange(0, 120))
+            layout = main.PageLayout([it["x"] for it in items], [it["y"] for it in items],
+                                     [it["x1"] for it in items], [it["bidx"] for it in items],
+                                     [it["text"] for it in items], 612.0, 792.0)
+            idx = main.np.arange(len(items))
+            with self.subTest(trial=trial):
+                self.assertEqual([it["text"] for it in legacy_layout._sort_items(items)],
+                                 [layout.text[r] for r in main._sort_items(layout, idx)])
+                l_left, l_right, l_mid = legacy_layout._items_to_columns(items, 612.0)
+                left, right, mid = main._items_to_columns(layout, idx)
+                self.assertEqual(l_mid, mid)
+                self.assertEqual([it["text"] for it in l_left], [layout.text[r] for r in left])
+                self.assertEqual([it["text"] for it in l_right], [layout.text[r] for r in right])
+
+    def test_three_columns_with_histogram(self):
+        with fitz.open(str(self.tmp / "three_col.pdf")) as doc:
+            page = doc[0]
+            with patch.object(main, "MAX_COLUMNS", 3):
+                text = main.page_text_layout(page)
+        lines = [ln for ln in text.splitlines() if ln]
+        self.assertEqual(lines[:25], [f"col0 line {r:02d}" for r in range(25)])
+        self.assertEqual(lines[25:50], [f"col1 line {r:02d}" for r in range(25)])
+        self.assertEqual(lines[50:], [f"col2 line {r:02d}" for r in range(25)])
+
+    def test_columns_in_layout_arrays(self):
+        with fitz.open(str(self.pdfs[0])) as doc:
+            page = doc[0]
+            layout = main.PageLayout.from_page(page)
+            items = legacy_layout._collect_items_dict(page)
+        self.assertEqual(len(layout), len(items))
+        self.assertEqual(layout.text, [it["text"] for it in items])
+        self.assertEqual(layout.y0.tolist(), [it["y"] for it in items])
+        self.assertEqual(layout.bidx.tolist(), [it["bidx"] for it in items])
+
+    def test_two_column_split(self):
+        with fitz.open(str(self.pdfs[1])) as doc:
+            layout = main.PageLayout.from_page(doc[0])
+        left, right, gutter = main._items_to_columns(layout, main.np.arange(len(layout)))
+        self.assertIsNotNone(gutter)
+        self.assertTrue(all(layout.text[r].startswith("Sec.") for r in left))
+        self.assertTrue(all(layout.text[r].startswith(("Right", "CODE OF")) for r in right))
+
+
+class TestFastLayout(unittest.TestCase):
+    """Equivalence harness: the word-tuple path against the dict path on the fixture corpus."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = Path(tempfile.mkdtemp())
+        cls.pdfs = layout_corpus(cls.tmp)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_page_text_matches_dict_path(self):
+        for max_columns in (2, 3):
+            for pdf in self.pdfs:
+                with fitz.open(str(pdf)) as doc, patch.object(main, "MAX_COLUMNS", max_columns):
+                    for page in doc:
+                        with self.subTest(pdf=pdf.name, page=page.number, max_columns=max_columns):
+                            self.assertEqual(main.layout_text(main.PageLayout.from_page_fast(page)),
+                                             main.layout_text(main.PageLayout.from_page(page)))
+
+    def test_lines_match_dict_path(self):
+        for pdf in self.pdfs:
+            with fitz.open(str(pdf)) as doc:
+                for page in doc:
+                    fast, full = main.PageLayout.from_page_fast(page), main.PageLayout.from_page(page)
+                    with self.subTest(pdf=pdf.name, page=page.number):
+                        self.assertEqual(fast.text, full.text)
+                        main.np.testing.assert_allclose(fast.x0, full.x0, atol=0.01)
+                        main.np.testing.assert_allclose(fast.y0, full.y0, atol=0.01)
+                        main.np.testing.assert_allclose(fast.x1, full.x1, atol=0.01)
+
+    def test_layout_mode_selects_path(self):
+        with fitz.open(str(self.pdfs[0])) as doc:
+            page = doc[0]
+            with patch.object(main, "LAYOUT_MODE", "fast"), \
+                 patch.object(main.PageLayout, "from_page", side_effect=AssertionError("dict path")):
+                text = main.page_text_layout(page)
+        self.assertTrue(text.startswith("Section 1. General provisions"))
+
+
+if __name__ == "__main__":
+    unittest.main()
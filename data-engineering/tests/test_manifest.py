@@ -0,0 +1,83 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import main
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+
+class TestIncrementalManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.inp = self.tmp / "in"
+        self.inp.mkdir()
+        self.out = self.tmp / "out"
+        for i in range(3):
+            make_text_pdf(self.inp / f"doc{i}.pdf", sample_pages(2))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _run(self, *extra):
+        argv = ["main.py", "--input", str(self.inp), "--out", str(self.out), "--no-ocr", *extra]
+        buf = io.StringIO()
+        with patch("sys.argv", argv), redirect_stdout(buf):
+            main.main()
+        return buf.getvalue()
+
+    def test_second_run_skips_unchanged(self):
+        first = self._run()
+        self.assertIn("processed 3 PDFs, 6 pages", first)
+        entries = main.load_manifest(str(self.out / main.MANIFEST_NAME))
+        self.assertEqual(len(entries), 3)
+        entry = entries[str((self.inp / "doc0.pdf").resolve())]
+        self.assertEqual(entry["page_count"], 2)
+        with patch.object(main, "ALLOW_OCR", False):  # as set by --no-ocr for the run
+            self.assertEqual(entry["extractor_version"], main.extractor_version())
+
+        second = self._run()
+        self.assertIn("processed 0 PDFs, 0 pages", second)
+        self.assertIn("3 unchanged PDFs skipped", second)
+
+    def test_changed_or_missing_outputs_are_redone(self):
+        self._run()
+        make_text_pdf(self.inp / "doc1.pdf", sample_pages(4))
+        os.remove(self.out / "doc2_text.parquet")
+        out = self._run()
+        self.assertIn("processed 2 PDFs, 6 pages", out)
+        self.assertIn("1 unchanged PDFs skipped", out)
+
+    def test_force_and_version_bump(self):
+        self._run()
+        self.assertIn("processed 3 PDFs", self._run("--force"))
+        with patch.object(main, "EXTRACTOR_VERSION", "next"):
+            self.assertIn("processed 3 PDFs", self._run())
+
+    def test_output_options_are_fingerprinted(self):
+        tunables = (main.LAYOUT_MODE, main.STRIP_BOILERPLATE, main.ALLOW_OCR)
+        self._run()
+        self.assertIn("processed 3 PDFs", self._run("--strip-boilerplate"))
+        self.assertIn("processed 0 PDFs", self._run("--strip-boilerplate"))
+        self.assertIn("processed 3 PDFs", self._run("--layout-mode", "fast"))
+        # The options apply to their run only
+        self.assertEqual((main.LAYOUT_MODE, main.STRIP_BOILERPLATE, main.ALLOW_OCR), tunables)
+
+    def test_enabling_chunks_reprocesses(self):
+        self._run()
+        out = self._run("--chunk-size", "100", "--chunk-overlap", "10")
+        self.assertIn("processed 3 PDFs", out)
+        self.assertEqual(len(list((self.out / "zone=text_chunk").glob("*_chunks.parquet"))), 3)
+        self.assertIn("processed 0 PDFs", self._run("--chunk-size", "100", "--chunk-overlap", "10"))
+
+        os.remove(self.out / "zone=text_chunk" / "doc0_chunks.parquet")
+        self.assertIn("processed 1 PDFs", self._run("--chunk-size", "100", "--chunk-overlap", "10"))
+
+
+if __name__ == "__main__":
+    unittest.main()
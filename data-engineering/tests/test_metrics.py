@@ -0,0 +1,75 @@
+import io
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+import main
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+
+def slow_ocr(page, dpi, lang):
+    time.sleep(0.02)
+    return "Scanned ordinance text recovered by OCR, long enough to win."
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_page_and_stage_timings(self):
+        pdf = make_text_pdf(self.tmp / "doc.pdf", sample_pages(2) + [[]])
+        with patch.object(main, "ALLOW_OCR", True), patch.object(main, "ocr_page_to_text", slow_ocr):
+            res = main.process_pdf_task(pdf, None, None, str(self.tmp / "out"), None, None, None, None)
+        doc, pages = res["metrics"]["doc"], res["metrics"]["pages"]
+        self.assertEqual([p["page"] for p in pages], [1, 2, 3])
+        self.assertEqual([p["is_ocr"] for p in pages], [False, False, True])
+        self.assertEqual([p["ocr_kind"] for p in pages], [None, None, main.OCR_FULL])
+        self.assertGreaterEqual(pages[2]["ocr_s"], 0.02)
+        self.assertTrue(all(p["layout_s"] > 0 and p["clean_s"] >= 0 for p in pages))
+        self.assertEqual((doc["pages"], doc["ocr_pages"]), (3, 1))
+        self.assertGreaterEqual(doc["total_s"], doc["layout_s"] + doc["ocr_s"])
+        self.assertGreater(doc["write_s"], 0)
+        self.assertEqual(doc["output_bytes"], (self.tmp / "out" / "doc_text.parquet").stat().st_size)
+
+    def test_split_document_timings_come_back(self):
+        pdf = make_text_pdf(self.tmp / "big.pdf", sample_pages(5))
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            res = main.process_pdf_task(pdf, None, None, str(self.tmp / "out"), None, None, None, None,
+                                        executor=pool, range_pages=2)
+        self.assertEqual([p["page"] for p in res["metrics"]["pages"]], [1, 2, 3, 4, 5])
+
+    def test_sidecar_written_by_cli(self):
+        inp = self.tmp / "in"
+        inp.mkdir()
+        for i in range(2):
+            make_text_pdf(inp / f"doc{i}.pdf", sample_pages(3))
+        out = self.tmp / "out"
+        argv = ["main.py", "--input", str(inp), "--out", str(out), "--no-ocr"]
+        with patch("sys.argv", argv), redirect_stdout(io.StringIO()):
+            main.main()
+        [sidecar] = out.glob("_metrics_*.parquet")
+        rows = pq.read_table(sidecar).to_pylist()
+        docs = [r for r in rows if r["level"] == "doc"]
+        self.assertEqual(sorted(r["source_name"] for r in docs), ["doc0.pdf", "doc1.pdf"])
+        self.assertEqual(sum(r["level"] == "page" for r in rows), 6)
+        self.assertTrue(all(r["error"] is None and r["pages"] == 3 for r in docs))
+
+        # a run with nothing to do writes no sidecar
+        with patch("sys.argv", argv), redirect_stdout(io.StringIO()):
+            main.main()
+        self.assertEqual(len(list(out.glob("_metrics_*.parquet"))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import fitz
+
+import main
+
+
+def _add_image(page, rect, shade=40):
+    pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 64, 64), False)
+    pix.set_rect(pix.irect, (shade,))
+    page.insert_image(rect, pixmap=pix)
+
+
+def _add_outlined_text(page, n=80):
+    for k in range(n):  # many small paths, like glyphs converted to outlines
+        x, y = 72 + (k % 20) * 20, 100 + (k // 20) * 20
+        page.draw_rect(fitz.Rect(x, y, x + 8, y + 12), color=(0, 0, 0), fill=(0, 0, 0))
+
+
+def make_mixed_pdf(path: Path, kinds):
+    doc = fitz.open()
+    for kind in kinds:
+        page = doc.new_page(width=612, height=792)
+        if kind == "scan":
+            _add_image(page, page.rect)
+        elif kind == "logo":
+            _add_image(page, fitz.Rect(270, 40, 340, 110))
+        elif kind == "outlines":
+            _add_outlined_text(page)
+        elif kind == "rule":
+            page.draw_line((72, 400), (540, 400))
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def fake_ocr(samples, width, height, lang="eng", dpi=250, bytes_per_pixel=1, bytes_per_line=None):
+    return f"Recovered scanned ordinance text at {dpi} dpi, long enough to win."
+
+
+def fake_ocr_conf(samples, width, height, lang="eng", dpi=250, bytes_per_pixel=1, bytes_per_line=None):
+    """Low-DPI pass: pages rendered above 1000 px wide 'read' confidently."""
+    return fake_ocr(samples, width, height, lang, dpi), 90.0 if width > 1000 else 40.0
+
+
+class TestClassifier(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_classify_page(self):
+        pdf = make_mixed_pdf(self.tmp / "mixed.pdf", ["blank", "scan", "logo", "outlines", "rule"])
+        with fitz.open(pdf) as doc:
+            kinds = [main.classify_page(page) for page in doc]
+        self.assertEqual(kinds, [main.OCR_SKIP, main.OCR_LOW, main.OCR_SKIP, main.OCR_FULL, main.OCR_SKIP])
+
+    def test_low_pass_escalates_only_on_low_confidence(self):
+        page = MagicMock()
+        cases = [(("Sec. 1 text", 85.0), False), (("Sec. 1 t3xt", 40.0), True), (("", 0.0), False)]
+        for low_result, escalated in cases:
+            with self.subTest(low_result=low_result), \
+                 patch.object(main, "render_page_for_ocr", return_value=(MagicMock(), 150)), \
+                 patch.object(main, "ocr_image_from_pixmap", return_value=(b"", 1, 1, 1, 1)), \
+                 patch.object(main, "ocr_pixels_to_text_conf", return_value=low_result), \
+                 patch.object(main, "ocr_page_to_text", return_value="full dpi text") as full:
+                txt = main.ocr_page_classified(page, main.OCR_LOW)
+            self.assertEqual(full.called, escalated)
+            self.assertEqual(txt, "full dpi text" if escalated else low_result[0])
+
+        with patch.object(main, "ocr_page_to_text", return_value="full dpi text") as full:
+            self.assertEqual(main.ocr_page_classified(page, main.OCR_SKIP), "")
+            self.assertEqual(main.ocr_page_classified(page, main.OCR_FULL), "full dpi text")
+        full.assert_called_once_with(page, main.OCR_DPI, main.OCR_LANG)
+
+    def test_pytesseract_confidence(self):
+        data = {"text": ["", "Sec.", "1-1", "Zoning", " "], "conf": ["-1", "90", "70", "50", "-1"],
+                "block_num": [1, 1, 1, 1, 1], "par_num": [1, 1, 1, 1, 1], "line_num": [0, 1, 1, 2, 2]}
+        with patch.object(main, "OCR_ENGINE", "pytesseract"), \
+             patch.object(main.pytesseract, "image_to_data", return_value=data):
+            txt, conf = main.ocr_pixels_to_text_conf(b"\xff" * 4, 2, 2)
+        self.assertEqual((txt, conf), ("Sec. 1-1\nZoning", 70.0))
+
+    def test_pool_matches_inline_with_escalation(self):
+        kinds = ["scan", "blank", "outlines", "scan", "logo", "scan", "scan"]
+        pdf = make_mixed_pdf(self.tmp / "batch.pdf", kinds)
+        with patch.object(main, "ocr_pixels_to_text", fake_ocr), \
+             patch.object(main, "ocr_pixels_to_text_conf", fake_ocr_conf), \
+             patch.object(main, "ALLOW_OCR", True), patch.object(main, "OCR_CLASSIFY", True), \
+             patch.object(main, "OCR_DPI", 144), patch.object(main, "OCR_LOW_DPI", 72), \
+             patch.object(main, "MAX_OCR_PAGES", 4):
+            inline = main.extract_page_range(pdf, 0, len(kinds))
+            with patch.object(main, "OCR_WORKERS", 2):
+                pooled = main.extract_page_range(pdf, 0, len(kinds))
+
+        # 612 pt at 72 dpi is 612 px: every low pass is unsure and escalates to 144 dpi
+        self.assertEqual([p[2] and "144 dpi" in p[2] for p in inline],
+                         [True, None, True, True, None, True, None])
+        self.assertEqual(inline, pooled)
+
+
+if __name__ == "__main__":
+    unittest.main()
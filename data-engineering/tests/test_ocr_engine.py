@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import fitz
+
+import main
+
+
+class TestOcrEngine(unittest.TestCase):
+
+    def setUp(self):
+        main._OCR_LOCAL.__dict__.clear()
+
+    def tearDown(self):
+        main._OCR_LOCAL.__dict__.clear()
+
+    def test_resolve(self):
+        with patch.object(main, "OCR_ENGINE", "pytesseract"):
+            self.assertEqual(main.resolve_ocr_engine(), "pytesseract")
+        with patch.object(main, "OCR_ENGINE", "auto"), patch.object(main, "tesserocr", None):
+            self.assertEqual(main.resolve_ocr_engine(), "pytesseract")
+        with patch.object(main, "OCR_ENGINE", "auto"), patch.object(main, "tesserocr", MagicMock()):
+            self.assertEqual(main.resolve_ocr_engine(), "tesserocr")
+        with patch.object(main, "OCR_ENGINE", "bogus"):
+            self.assertRaises(ValueError, main.resolve_ocr_engine)
+
+    def test_tesserocr_api_kept_warm_per_thread(self):
+        fake = MagicMock()
+        fake.PyTessBaseAPI.return_value.Recognize.return_value = True
+        fake.PyTessBaseAPI.return_value.GetUTF8Text.return_value = "Sec. 1-1.\r\nText\n"
+        with patch.object(main, "OCR_ENGINE", "tesserocr"), patch.object(main, "tesserocr", fake), \
+             patch.object(main, "TESSDATA_PATH", ""):
+            for _ in range(3):
+                self.assertEqual(main.ocr_pixels_to_text(b"\xff" * 4, 2, 2, "eng", 300), "Sec. 1-1.\nText")
+            self.assertEqual(fake.PyTessBaseAPI.call_count, 1)
+            api = fake.PyTessBaseAPI.return_value
+            api.SetImageBytes.assert_called_with(b"\xff" * 4, 2, 2, 1, 2)
+            api.SetSourceResolution.assert_called_with(300)
+            api.Recognize.assert_called_with(timeout=main.OCR_TIMEOUT_S * 1000)
+
+            t = threading.Thread(target=main.ocr_pixels_to_text, args=(b"\xff" * 12, 2, 2))
+            t.start()
+            t.join()
+            self.assertEqual(fake.PyTessBaseAPI.call_count, 2)
+
+    def test_timeout_returns_empty(self):
+        fake = MagicMock()
+        fake.PyTessBaseAPI.return_value.Recognize.return_value = False
+        with patch.object(main, "OCR_ENGINE", "tesserocr"), patch.object(main, "tesserocr", fake):
+            self.assertEqual(main.ocr_pixels_to_text(b"\xff" * 12, 2, 2), "")
+        fake.PyTessBaseAPI.return_value.GetUTF8Text.assert_not_called()
+
+    def test_auto_falls_back_when_engine_cannot_init(self):
+        fake = MagicMock()
+        fake.PyTessBaseAPI.side_effect = RuntimeError("Failed to init API")
+        with patch.object(main, "OCR_ENGINE", "auto"), patch.object(main, "tesserocr", fake), \
+             patch.object(main.pytesseract, "image_to_string", return_value="from cli") as cli, \
+             patch("sys.stderr"):
+            self.assertEqual(main.ocr_pixels_to_text(b"\xff" * 12, 2, 2), "from cli")
+            self.assertEqual(main.ocr_pixels_to_text(b"\xff" * 12, 2, 2), "from cli")
+        self.assertEqual(fake.PyTessBaseAPI.call_count, 1)
+        self.assertEqual(cli.call_count, 2)
+
+        with patch.object(main, "OCR_ENGINE", "tesserocr"), patch.object(main, "tesserocr", fake):
+            self.assertRaises(RuntimeError, main.ocr_pixels_to_text, b"\xff" * 12, 2, 2)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork", "the fake engine reaches OCR processes by fork")
+    def test_engine_warm_across_documents_in_ocr_pool(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        pdfs = []
+        for n in range(3):
+            doc = fitz.open()
+            page = doc.new_page(width=612, height=792)
+            page.draw_rect(fitz.Rect(100, 100, 300, 200), color=(0, 0, 0), fill=(0, 0, 0))
+            doc.save(str(tmp / f"scan{n}.pdf"))
+            doc.close()
+            pdfs.append(tmp / f"scan{n}.pdf")
+
+        fake = MagicMock()
+        api = fake.PyTessBaseAPI.return_value
+        api.Recognize.return_value = True
+        api.GetUTF8Text.side_effect = lambda: f"pid={os.getpid()} inits={fake.PyTessBaseAPI.call_count}"
+        with patch.object(main, "OCR_ENGINE", "tesserocr"), patch.object(main, "tesserocr", fake), \
+             patch.object(main, "TESSDATA_PATH", ""), patch.object(main, "ALLOW_OCR", True), \
+             patch.object(main, "OCR_DPI", 36), patch.object(main, "OCR_WORKERS", 1):
+            try:
+                texts = [main.extract_page_range(pdf, 0, 1)[0][2] for pdf in pdfs]
+            finally:
+                main.discard_ocr_pool(wait=True)
+
+        self.assertEqual(len(set(texts)), 1, texts)  # one OCR process, one engine init, for every document
+        self.assertTrue(texts[0].endswith("inits=1"))
+        self.assertNotIn(f"pid={os.getpid()} ", texts[0])
+
+
+class TestOcrRendering(unittest.TestCase):
+
+    def setUp(self):
+        doc = fitz.open()
+        self.page = doc.new_page(width=612, height=792)
+        self.page.draw_rect(fitz.Rect(0, 0, 306, 792), color=(0, 0, 0), fill=(0, 0, 0))
+        self.doc = doc
+
+    def tearDown(self):
+        self.doc.close()
+
+    def test_grayscale_render(self):
+        pix, dpi = main.render_page_for_ocr(self.page, 144)
+        self.assertEqual((pix.n, pix.width, pix.height, dpi), (1, 1224, 1584, 144))
+        samples, w, h, bpp, stride = main.ocr_image_from_pixmap(pix, copy=False)
+        self.assertIsInstance(samples, memoryview)
+        self.assertEqual((w, h, bpp, stride), (1224, 1584, 1, pix.stride))
+        self.assertIsInstance(main.ocr_image_from_pixmap(pix, copy=True)[0], bytes)
+
+    def test_downscale_cap(self):
+        with patch.object(main, "OCR_MAX_MPIX", 1.0):
+            pix, dpi = main.render_page_for_ocr(self.page, 300)
+        self.assertLessEqual(pix.width * pix.height, 1.01e6)
+        self.assertLess(dpi, 300)
+
+    def test_binarize_packs_bits(self):
+        pix, _ = main.render_page_for_ocr(self.page, 72)
+        with patch.object(main, "OCR_BINARIZE", True):
+            samples, w, h, bpp, stride = main.ocr_image_from_pixmap(pix, copy=False)
+        self.assertEqual((w, h, bpp, stride), (612, 792, 0, 77))
+        row = samples[:stride]
+        self.assertEqual(row[0], 0x00)    # black (left half) -> 0 bits
+        self.assertEqual(row[-2], 0xFF)   # white -> 1 bits
+
+    def test_pytesseract_gets_gray_image(self):
+        pix, _ = main.render_page_for_ocr(self.page, 72)
+        samples, w, h, bpp, stride = main.ocr_image_from_pixmap(pix, copy=False)
+        with patch.object(main, "OCR_ENGINE", "pytesseract"), \
+             patch.object(main.pytesseract, "image_to_string", return_value="x") as cli:
+            main.ocr_pixels_to_text(samples, w, h, bytes_per_pixel=bpp, bytes_per_line=stride)
+        img = cli.call_args.args[0]
+        self.assertEqual((img.mode, img.size), ("L", (612, 792)))
+        self.assertEqual(img.getpixel((0, 0)), 0)
+        self.assertEqual(img.getpixel((611, 0)), 255)
+
+
+if __name__ == "__main__":
+    unittest.main()
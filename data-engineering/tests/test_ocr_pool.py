@@ -0,0 +1,85 @@
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import fitz
+
+import main
+
+
+def fake_ocr(samples, width, height, lang="eng", dpi=250, bytes_per_pixel=1, bytes_per_line=None):
+    """Stand-in for Tesseract: 'reads' text only from pages with dark pixels."""
+    return "Recovered scanned ordinance text, long enough to win." if min(samples) < 128 else ""
+
+
+def make_scanned_pdf(path: Path, inked_pages):
+    doc = fitz.open()
+    for i in range(7):
+        page = doc.new_page(width=612, height=792)
+        if i in inked_pages:
+            page.draw_rect(fitz.Rect(100, 100, 300, 200), color=(0, 0, 0), fill=(0, 0, 0))
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+class TestOcrPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        main.discard_ocr_pool(wait=True)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_pool_picks_same_pages_as_inline(self):
+        pdf = make_scanned_pdf(self.tmp / "scan.pdf", inked_pages={1, 3, 4, 5, 6})
+        with patch.object(main, "ocr_pixels_to_text", fake_ocr), \
+             patch.object(main, "ALLOW_OCR", True), \
+             patch.object(main, "OCR_DPI", 36), \
+             patch.object(main, "MAX_OCR_PAGES", 3):
+            inline = main.extract_page_range(pdf, 0, 7)
+            with patch.object(main, "OCR_WORKERS", 2):
+                pooled = main.extract_page_range(pdf, 0, 7)
+
+        self.assertEqual([p[2] is not None for p in inline],
+                         [False, True, False, True, True, False, False])
+        self.assertEqual(inline, pooled)
+
+    def test_split_document_ocr_uses_pool(self):
+        pdf = make_scanned_pdf(self.tmp / "scan.pdf", inked_pages={1, 3, 4, 5, 6})
+        with patch.object(main, "ocr_pixels_to_text", fake_ocr), \
+             patch.object(main, "ALLOW_OCR", True), \
+             patch.object(main, "OCR_DPI", 36), \
+             patch.object(main, "MAX_OCR_PAGES", 3):
+            whole = list(main.extract_pdf_to_records(pdf, None, None, None, None))
+            with patch.object(main, "OCR_WORKERS", 2), \
+                 patch.object(main, "ocr_page_to_text", side_effect=AssertionError("OCR'd inline")), \
+                 ThreadPoolExecutor(max_workers=3) as ranges:
+                split = list(main.extract_pdf_to_records(pdf, None, None, None, None,
+                                                         executor=ranges, range_pages=2))
+
+        self.assertEqual([r["is_ocr"] for r in split], [False, True, False, True, True, False, False])
+        self.assertEqual([(r["page"], r["text"]) for r in whole], [(r["page"], r["text"]) for r in split])
+
+    def test_pool_outlives_documents(self):
+        pdfs = [make_scanned_pdf(self.tmp / f"scan{n}.pdf", inked_pages={1}) for n in range(2)]
+        with patch.object(main, "ocr_pixels_to_text", fake_ocr), \
+             patch.object(main, "ALLOW_OCR", True), \
+             patch.object(main, "OCR_DPI", 36), \
+             patch.object(main, "OCR_WORKERS", 1):
+            pools = []
+            for pdf in pdfs:
+                pages = main.extract_page_range(pdf, 0, 7)
+                self.assertIsNotNone(pages[1][2])
+                pools.append(main.get_ocr_pool())
+            self.assertIs(pools[0], pools[1])
+            with patch.object(main, "OCR_WORKERS", 2):
+                self.assertIsNot(main.get_ocr_pool(), pools[0])  # rebuilt for new tunables
+
+
+if __name__ == "__main__":
+    unittest.main()
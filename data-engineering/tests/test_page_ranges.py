@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import main
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+
+def _strip_ts(records):
+    return [{k: v for k, v in r.items() if k != "extracted_at"} for r in records]
+
+
+class TestPageRanges(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_split_page_ranges(self):
+        self.assertEqual(main.split_page_ranges(5, 0), [(0, 5)])
+        self.assertEqual(main.split_page_ranges(5, 5), [(0, 5)])
+        self.assertEqual(main.split_page_ranges(5, 2), [(0, 2), (2, 4), (4, 5)])
+
+    def test_split_matches_unsplit(self):
+        pdf = make_text_pdf(self.tmp / "big.pdf", sample_pages(9))
+        whole = list(main.extract_pdf_to_records(pdf, "prod", "text", "GA", "Fulton"))
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            split = list(main.extract_pdf_to_records(pdf, "prod", "text", "GA", "Fulton",
+                                                     executor=pool, range_pages=2))
+        self.assertEqual([r["page"] for r in split], list(range(1, 10)))
+        self.assertEqual(_strip_ts(whole), _strip_ts(split))
+
+    def test_in_memory_matches_disk(self):
+        pdf = make_text_pdf(self.tmp / "mem.pdf", sample_pages(5))
+        on_disk = list(main.extract_pdf_to_records(pdf, None, None, "GA", "Fulton"))
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            in_mem = list(main.extract_pdf_to_records(pdf, None, None, "GA", "Fulton", executor=pool,
+                                                      range_pages=2, pdf_bytes=pdf.read_bytes()))
+        self.assertEqual(_strip_ts(on_disk), _strip_ts(in_mem))
+
+    def test_ocr_budget_enforced_across_ranges(self):
+        # Blank pages have no text layer, so every page is an OCR candidate.
+        pdf = make_text_pdf(self.tmp / "scanned.pdf", [[] for _ in range(7)])
+        fake_ocr = "Scanned ordinance text recovered by OCR, long enough to win."
+        with patch.object(main, "MAX_OCR_PAGES", 3), patch.object(main, "ALLOW_OCR", True), \
+             patch.object(main, "ocr_page_to_text", return_value=fake_ocr) as ocr:
+            whole = list(main.extract_pdf_to_records(pdf, None, None, None, None))
+            self.assertEqual(ocr.call_count, 3)
+            ocr.reset_mock()
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                timings = {}
+                split = list(main.extract_pdf_to_records(pdf, None, None, None, None,
+                                                         executor=pool, range_pages=2, timings=timings))
+            self.assertEqual(ocr.call_count, 3)  # the budget limits OCR work, not just output rows
+        self.assertEqual([r["is_ocr"] for r in split], [True] * 3 + [False] * 4)
+        self.assertEqual(_strip_ts(whole), _strip_ts(split))
+        self.assertEqual([timings[i].get("ocr_kind") for i in range(7)], [main.OCR_FULL] * 3 + [None] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
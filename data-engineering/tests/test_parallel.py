@@ -0,0 +1,47 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+import main
+from tests.cli_fixtures import run_args
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+
+class TestRunTasks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.pdfs = [make_text_pdf(self.tmp / f"doc{i}.pdf", sample_pages(i + 2)) for i in range(4)]
+        self.tasks = [(p, None, None) for p in self.pdfs]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_parallel_matches_sequential(self):
+        seq_out = self.tmp / "seq"
+        par_out = self.tmp / "par"
+        self.assertEqual(main.run_tasks(self.tasks, run_args(str(seq_out), 1, split_pages=3)), (4, 2 + 3 + 4 + 5))
+        self.assertEqual(main.run_tasks(self.tasks, run_args(str(par_out), 2, split_pages=3)), (4, 2 + 3 + 4 + 5))
+
+        for p in self.pdfs:
+            name = p.stem + "_text.parquet"
+            a = pq.read_table(seq_out / name).drop(["extracted_at"])
+            b = pq.read_table(par_out / name).drop(["extracted_at"])
+            self.assertTrue(a.equals(b))
+
+    def test_failure_is_reported_not_raised(self):
+        bad = self.tmp / "bad.pdf"
+        bad.write_bytes(b"not a pdf")
+        tasks = self.tasks[:1] + [(bad, None, None)]
+        with patch("sys.stderr") as err:
+            total_pdfs, total_pages = main.run_tasks(tasks, run_args(str(self.tmp / "out"), 2, split_pages=3))
+        self.assertEqual((total_pdfs, total_pages), (2, 2))
+        self.assertIn("failed on", "".join(str(c) for c in err.write.call_args_list))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+import main
+
+
+class TestPrefetchTasks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.started = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _fake_download(self, bucket, key, local_dir):
+        with self.lock:
+            self.started.append(key)
+        if key == "bad.pdf":
+            raise ClientError({"Error": {"Code": "404", "Message": "nope"}}, "GetObject")
+        local_dir.mkdir(parents=True, exist_ok=True)
+        path = local_dir / key
+        path.write_bytes(b"%PDF")
+        return path
+
+    def test_in_order_bounded_and_cleaned_up(self):
+        keys = ["a.pdf", "bad.pdf", "b.pdf", "c.pdf", "d.pdf", "e.pdf"]
+        tasks = [(None, "bucket", k) for k in keys]
+        seen = []
+        stats = {}
+        with patch.object(main, "download_s3_object", side_effect=self._fake_download):
+            for task in main.prefetch_tasks(tasks, self.tmp, io_workers=2, depth=2, stats=stats):
+                seen.append(task[2])
+                self.assertTrue(task[0].exists())
+                # Never more than `depth` tasks fetched beyond what was consumed (+ the failure).
+                self.assertLessEqual(len(self.started), len(seen) + 1 + 2)
+                main._discard_download(task)
+                self.assertFalse(task[0].parent.exists())
+        self.assertEqual(seen, ["a.pdf", "b.pdf", "c.pdf", "d.pdf", "e.pdf"])
+        self.assertEqual(sorted(stats), [f"s3://bucket/{k}" for k in seen])
+        self.assertEqual({s["download_bytes"] for s in stats.values()}, {4})
+
+    def test_local_tasks_pass_through(self):
+        local = self.tmp / "x.pdf"
+        local.write_bytes(b"%PDF")
+        with patch.object(main, "download_s3_object") as dl:
+            out = list(main.prefetch_tasks([(local, None, None)], self.tmp, io_workers=1, depth=1))
+        dl.assert_not_called()
+        self.assertEqual(out, [(local, None, None, None)])
+        main._discard_download(out[0])
+        self.assertTrue(local.exists())
+
+    @patch("main.get_s3_client")
+    def test_small_objects_stay_in_memory(self, mock_client):
+        mock_client.return_value.head_object.return_value = {"ContentLength": 10}
+        mock_client.return_value.download_fileobj.side_effect = lambda b, k, buf, Config: buf.write(b"%PDF-small")
+        tasks = [(None, "bucket", "state=GA/county=Fulton/code.pdf")]
+        with patch.object(main, "download_s3_object") as dl:
+            out = list(main.prefetch_tasks(tasks, self.tmp, io_workers=1, depth=1, inmem_max_bytes=1024))
+        dl.assert_not_called()
+        local, _, _, data = out[0]
+        self.assertEqual(data, b"%PDF-small")
+        self.assertEqual(local.name, "code.pdf")
+        self.assertFalse(local.exists())
+
+    @patch("main.get_s3_client")
+    def test_large_objects_fall_back_to_disk(self, mock_client):
+        mock_client.return_value.head_object.return_value = {"ContentLength": 4096}
+        with patch.object(main, "download_s3_object", side_effect=self._fake_download) as dl:
+            out = list(main.prefetch_tasks([(None, "bucket", "a.pdf")], self.tmp,
+                                           io_workers=1, depth=1, inmem_max_bytes=1024))
+        dl.assert_called_once()
+        mock_client.return_value.download_fileobj.assert_not_called()
+        self.assertIsNone(out[0][3])
+        self.assertTrue(out[0][0].exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
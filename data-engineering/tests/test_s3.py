@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+import main
+
+
+class TestS3Client(unittest.TestCase):
+
+    def setUp(self):
+        main._S3_CLIENT = None
+        main._S3_CLIENT_PID = None
+
+    def tearDown(self):
+        main._S3_CLIENT = None
+        main._S3_CLIENT_PID = None
+
+    @patch("main.boto3.session.Session")
+    def test_client_is_shared_within_a_process(self, mock_session):
+        a = main.get_s3_client()
+        b = main.get_s3_client()
+        self.assertIs(a, b)
+        mock_session.assert_called_once()
+        config = mock_session.return_value.client.call_args.kwargs["config"]
+        self.assertEqual(config.max_pool_connections, main.S3_MAX_POOL)
+
+    @patch("main.boto3.session.Session")
+    def test_client_rebuilt_after_fork(self, mock_session):
+        main.get_s3_client()
+        main._S3_CLIENT_PID = -1  # as seen from a forked child
+        main.get_s3_client()
+        self.assertEqual(mock_session.call_count, 2)
+
+    @patch("main.get_s3_client")
+    def test_helpers_use_shared_client(self, mock_client):
+        s3 = mock_client.return_value
+        s3.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "state=GA/county=Fulton/a.pdf"}, {"Key": "notes.txt"}]}
+        ]
+        self.assertEqual(main.list_s3_pdfs("bucket", "state=GA/"), ["state=GA/county=Fulton/a.pdf"])
+
+        uploaded = {}
+
+        def fake_upload(fileobj, bucket, key, Config):
+            uploaded["table"] = pq.read_table(fileobj)
+            uploaded["dest"] = (bucket, key)
+            self.assertEqual(Config.max_concurrency, main.S3_RANGE_CONCURRENCY)
+
+        s3.upload_fileobj.side_effect = fake_upload
+        main.write_parquet([{"doc_id": "d", "page": 1, "text": "hello"}], "s3://out/env=prod/x.parquet")
+        self.assertEqual(uploaded["dest"], ("out", "env=prod/x.parquet"))
+        self.assertEqual(uploaded["table"].num_rows, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+import main
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+
+class TestCostModel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_probe_counts_pages_and_scans(self):
+        pdf = make_text_pdf(self.tmp / "mixed.pdf", sample_pages(3) + [[], []] + sample_pages(5))
+        pages, ratio = main.probe_pdf(pdf, sample_pages=20)
+        self.assertEqual((pages, ratio), (10, 0.2))
+        self.assertEqual(main.probe_pdf(self.tmp / "missing.pdf"), (0, None))
+
+    def test_estimate_cost(self):
+        with patch.object(main, "ALLOW_OCR", True), patch.object(main, "MAX_OCR_PAGES", 20):
+            text = main.estimate_cost(1_000_000, 50, 0.0)
+            scanned = main.estimate_cost(1_000_000, 50, 1.0)
+            self.assertGreater(scanned, text)
+            # OCR is capped per document, like extraction
+            self.assertAlmostEqual(main.estimate_cost(1_000_000, 50, 1.0) - text,
+                                   20 * main.PLAN_S_PER_OCR_PAGE)
+            # Unknown scan ratio: heavy pages are treated as scans
+            self.assertEqual(main.estimate_cost(10_000_000, 10), main.estimate_cost(10_000_000, 10, 1.0))
+            # Unknown page count: guessed from the size
+            self.assertLess(main.estimate_cost(100_000), main.estimate_cost(10_000_000))
+        with patch.object(main, "ALLOW_OCR", False):
+            self.assertEqual(main.estimate_cost(1_000_000, 50, 1.0), main.estimate_cost(1_000_000, 50, 0.0))
+
+    def test_largest_first_and_makespan(self):
+        tasks = [(Path(f"/in/{c}.pdf"), None, None) for c in "abcde"]
+        costs = dict(zip((main.input_key_for(t) for t in tasks), [1.0, 1.0, 1.0, 1.0, 4.0]))
+        ordered = main.largest_first(tasks, costs)
+        self.assertEqual([t[0].stem for t in ordered], ["e", "a", "b", "c", "d"])
+        in_order = [costs[main.input_key_for(t)] for t in tasks]
+        self.assertEqual(main.predicted_makespan(in_order, 2), 6.0)  # the big one starts last
+        self.assertEqual(main.predicted_makespan(sorted(in_order, reverse=True), 2), 4.0)
+
+    def test_lpt_shards_balance(self):
+        tasks = [(Path(f"/in/doc{i}.pdf"), None, None) for i in range(12)]
+        costs = {main.input_key_for(t): float(i + 1) for i, t in enumerate(tasks)}
+        assignment = main.lpt_shards(tasks, costs, 3)
+        self.assertEqual(assignment, main.lpt_shards(list(reversed(tasks)), costs, 3))
+        loads = [sum(costs[k] for k, s in assignment.items() if s == i) for i in range(3)]
+        self.assertEqual(loads, [26.0, 26.0, 26.0])
+        shards = [main.select_shard(tasks, i, 3, assignment) for i in range(3)]
+        self.assertEqual(sorted(t for s in shards for t in s), sorted(tasks))
+
+
+class TestScheduledRun(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.inp = self.tmp / "in"
+        self.inp.mkdir()
+        self.out = self.tmp / "out"
+        make_text_pdf(self.inp / "a_small.pdf", sample_pages(1))
+        make_text_pdf(self.inp / "b_scanned.pdf", [[] for _ in range(4)])
+        make_text_pdf(self.inp / "c_long.pdf", sample_pages(12))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _run(self, *extra):
+        argv = ["main.py", "--input", str(self.inp), "--out", str(self.out), *extra]
+        buf = io.StringIO()
+        fake_ocr = "Scanned ordinance text recovered by OCR, long enough to win."
+        with patch("sys.argv", argv), redirect_stdout(buf), patch.object(main, "ALLOW_OCR", True), \
+             patch.object(main, "ocr_page_to_text", return_value=fake_ocr):
+            main.main()
+        return buf.getvalue()
+
+    def _order(self, log):
+        return [Path(l.split("extracting: ")[1]).stem for l in log.splitlines() if "extracting: " in l]
+
+    def test_largest_first_with_predicted_vs_actual(self):
+        log = self._run()
+        self.assertEqual(self._order(log), ["b_scanned", "c_long", "a_small"])
+        self.assertIn("[info] plan: 3 PDFs, predicted", log)
+        self.assertIn("[info] plan vs actual: predicted", log)
+        metrics = pq.read_table(next(self.out.glob("_metrics_*.parquet")), partitioning=None).to_pylist()
+        docs = [m for m in metrics if m["level"] == "doc"]
+        self.assertTrue(all(m["predicted_s"] > 0 for m in docs))
+        self.assertTrue(all(m["predicted_s"] is None for m in metrics if m["level"] == "page"))
+
+    def test_listing_order(self):
+        log = self._run("--schedule", "listing", "--no-ocr")
+        self.assertEqual(self._order(log), ["a_small", "b_scanned", "c_long"])
+        self.assertNotIn("plan vs actual", log)
+
+
+if __name__ == "__main__":
+    unittest.main()
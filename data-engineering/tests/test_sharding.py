@@ -0,0 +1,188 @@
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+import main
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+MAIN = Path(main.__file__).resolve()
+
+
+def _tasks(n):
+    return [(Path(f"/in/doc{i}.pdf"), None, None) for i in range(n)]
+
+
+class TestShards(unittest.TestCase):
+
+    def test_shards_are_disjoint_and_complete(self):
+        tasks = _tasks(50)
+        shards = [main.select_shard(tasks, i, 4) for i in range(4)]
+        self.assertEqual(sorted(t for s in shards for t in s), sorted(tasks))
+        self.assertTrue(all(shards))  # 50 keys spread over every shard
+        self.assertEqual(main.select_shard(list(reversed(tasks)), 1, 4), list(reversed(shards[1])))
+
+    def test_own_shard_first(self):
+        tasks = _tasks(20)
+        ordered = main.own_shard_first(tasks, 2, 3)
+        self.assertEqual(sorted(ordered), sorted(tasks))
+        own = main.select_shard(tasks, 2, 3)
+        self.assertEqual(ordered[:len(own)], own)
+
+
+class TestLocalLeaseTable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_single_winner_and_done_blocks(self):
+        a = main.LeaseTable(self.tmp, "a")
+        b = main.LeaseTable(self.tmp, "b")
+        self.assertTrue(a.acquire("k"))
+        self.assertFalse(b.acquire("k"))
+        a.complete("k")
+        self.assertFalse(b.acquire("k"))
+        self.assertFalse(a.acquire("k"))
+
+    def test_expired_lease_is_taken_over(self):
+        dead = main.LeaseTable(self.tmp, "dead", ttl_s=0)
+        self.assertTrue(dead.acquire("k"))
+        alive = main.LeaseTable(self.tmp, "alive")
+        self.assertTrue(alive.acquire("k"))
+        dead.renew()  # the old owner no longer holds it and must not extend it
+        self.assertFalse(main.LeaseTable(self.tmp, "other").acquire("k"))
+
+    def test_new_version_is_claimable_after_done(self):
+        a = main.LeaseTable(self.tmp, "a")
+        self.assertTrue(a.acquire("k", "etag1"))
+        a.complete("k", version="etag1")
+        self.assertFalse(main.LeaseTable(self.tmp, "b").acquire("k", "etag1"))
+        self.assertTrue(main.LeaseTable(self.tmp, "b").acquire("k", "etag2"))
+
+    def test_failed_lease_is_retried_up_to_max_attempts(self):
+        tables = [main.LeaseTable(self.tmp, f"t{i}", retry_s=0, max_attempts=2) for i in range(3)]
+        self.assertTrue(tables[0].acquire("k"))
+        tables[0].complete("k", failed=True)
+        self.assertTrue(tables[1].acquire("k"))  # retry window (retry_s=0) has passed
+        tables[1].complete("k", failed=True)
+        self.assertFalse(tables[2].acquire("k"))  # two failures: no more retries
+
+        waiting = main.LeaseTable(self.tmp, "w", retry_s=3600)
+        self.assertTrue(waiting.acquire("j"))
+        waiting.complete("j", failed=True)
+        self.assertFalse(main.LeaseTable(self.tmp, "x", retry_s=3600).acquire("j"))
+
+    def test_leased_tasks_split_between_owners(self):
+        tasks = _tasks(10)
+        a = main.LeaseTable(self.tmp, "a")
+        b = main.LeaseTable(self.tmp, "b")
+        got_a, got_b = [], []
+        ia, ib = main.leased_tasks(tasks, a), main.leased_tasks(tasks, b)
+        for t in ia:  # interleave: each owner claims lazily as it consumes
+            got_a.append(t)
+            got_b.append(next(ib, None))
+        got_b.extend(ib)
+        got_b = [t for t in got_b if t is not None]
+        self.assertEqual(sorted(got_a + got_b), sorted(tasks))
+        self.assertFalse(set(got_a) & set(got_b))
+
+
+def _client_error(code):
+    return ClientError({"Error": {"Code": code}}, "PutObject")
+
+
+class TestS3LeaseTable(unittest.TestCase):
+
+    @patch("main.get_s3_client")
+    def test_conditional_create_and_takeover(self, mock_client):
+        s3 = mock_client.return_value
+        table = main.LeaseTable("s3://leases/q", "me", ttl_s=60)
+
+        s3.put_object.return_value = {"ETag": '"e1"'}
+        self.assertTrue(table.acquire("k"))
+        self.assertEqual(s3.put_object.call_args.kwargs["IfNoneMatch"], "*")
+
+        # Held by a live owner: the create fails and the lease is left alone
+        s3.put_object.side_effect = _client_error("PreconditionFailed")
+        body = main.json.dumps({"owner": "x", "state": "leased", "expires_at": main.time.time() + 60})
+        s3.get_object.return_value = {"Body": main.io.BytesIO(body.encode()), "ETag": '"e2"'}
+        self.assertFalse(table.acquire("other"))
+        self.assertEqual(s3.put_object.call_count, 2)
+
+        # Expired: compare-and-swap on the ETag that was read
+        s3.put_object.side_effect = [_client_error("PreconditionFailed"), {"ETag": '"e3"'}]
+        body = main.json.dumps({"owner": "x", "state": "leased", "expires_at": 0})
+        s3.get_object.return_value = {"Body": main.io.BytesIO(body.encode()), "ETag": '"e2"'}
+        self.assertTrue(table.acquire("stale"))
+        self.assertEqual(s3.put_object.call_args.kwargs["IfMatch"], '"e2"')
+
+        s3.put_object.side_effect = None
+        s3.put_object.return_value = {"ETag": '"e4"'}
+        table.complete("stale")
+        self.assertEqual(s3.put_object.call_args.kwargs["IfMatch"], '"e3"')
+        self.assertIn(b'"done"', s3.put_object.call_args.kwargs["Body"])
+
+
+class TestConcurrentRuns(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.inp = self.tmp / "in"
+        self.inp.mkdir()
+        self.out = self.tmp / "out"
+        for i in range(8):
+            make_text_pdf(self.inp / f"doc{i}.pdf", sample_pages(2))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _spawn(self, *extra):
+        argv = [sys.executable, str(MAIN), "--input", str(self.inp), "--out", str(self.out),
+                "--no-ocr", "--workers", "1", "--no-metrics", *extra]
+        return subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+    def _processed(self, log):
+        line = next(l for l in log.splitlines() if "processed" in l)
+        return int(line.split("processed ")[1].split(" PDFs")[0])
+
+    def _check_outputs(self, procs):
+        logs = [p.communicate(timeout=120)[0] for p in procs]
+        for p, log in zip(procs, logs):
+            self.assertEqual(p.returncode, 0, log)
+        self.assertEqual(sum(self._processed(log) for log in logs), 8, logs)
+        self.assertEqual(sorted(p.name for p in self.out.glob("*_text.parquet")),
+                         sorted(f"doc{i}_text.parquet" for i in range(8)))
+        manifests = main.manifest_paths(str(self.out))
+        self.assertEqual(len(manifests), len(procs))
+        self.assertEqual(len(main.load_manifests(str(self.out))), 8)
+
+    def test_static_shards(self):
+        self._check_outputs([self._spawn("--shard-index", str(i), "--shard-count", "2") for i in range(2)])
+
+    def test_queue_with_shards(self):
+        self._check_outputs([self._spawn("--shard-index", str(i), "--shard-count", "2", "--queue", "q")
+                             for i in range(2)])
+        self.assertEqual(len(list((self.out / "_leases" / "q").glob("*.json"))), 8)
+
+    def test_reused_queue_picks_up_changed_pdf(self):
+        self._check_outputs([self._spawn("--queue", "nightly")])
+        make_text_pdf(self.inp / "doc3.pdf", sample_pages(3))
+        log = self._spawn("--queue", "nightly", "--force").communicate(timeout=120)[0]
+        self.assertEqual(self._processed(log), 1, log)
+
+    def test_later_unsharded_run_skips_sharded_work(self):
+        self._check_outputs([self._spawn("--shard-index", str(i), "--shard-count", "2") for i in range(2)])
+        log = self._spawn().communicate(timeout=120)[0]
+        self.assertIn("8 unchanged PDFs skipped", log)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+import main
+from tests.cli_fixtures import run_args
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+
+class TestBackgroundUploads(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.spool = self.tmp / "spool"
+        self.spool.mkdir()
+        self.pdfs = [make_text_pdf(self.tmp / f"doc{i}.pdf", sample_pages(i + 2)) for i in range(3)]
+        self.tasks = [(p, None, None) for p in self.pdfs]
+        self.uploaded = {}
+        self._patches = [patch("main.get_s3_client"), patch.object(tempfile, "tempdir", str(self.spool))]
+        s3 = self._patches[0].start().return_value
+        self._patches[1].start()
+        s3.upload_file.side_effect = self._fake_upload
+        self.fail_keys = set()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _fake_upload(self, path, bucket, key, Config):
+        time.sleep(0.02)
+        if key in self.fail_keys:
+            raise OSError("connection reset")
+        self.uploaded[key] = pq.read_table(path, partitioning=None).num_rows
+
+    def test_uploads_overlap_and_report_after_completion(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                self.uploaded.clear()
+                seen = []
+
+                def on_result(task, res):
+                    key = f"run/{task[0].stem}_text.parquet"
+                    seen.append((key in self.uploaded, res["pages"], res["error"]))
+                    self.assertGreaterEqual(res["metrics"]["doc"]["upload_s"], 0.02)
+
+                total = main.run_tasks(self.tasks, run_args("s3://out/run", workers, upload_workers=2), on_result=on_result)
+                self.assertEqual(total, (3, 2 + 3 + 4))
+                self.assertEqual(self.uploaded, {f"run/doc{i}_text.parquet": i + 2 for i in range(3)})
+                self.assertTrue(all(up and err is None for up, _, err in seen))
+                self.assertEqual(list(self.spool.iterdir()), [])
+
+    def test_failed_upload_surfaces_as_pdf_error(self):
+        self.fail_keys = {"run/doc1_text.parquet"}
+        results = {}
+        total = main.run_tasks(self.tasks, run_args("s3://out/run", 1, upload_workers=2),
+                               on_result=lambda task, res: results.__setitem__(task[0].stem, res))
+        self.assertEqual(total, (3, 2 + 4))
+        self.assertIn("upload failed: connection reset", results["doc1"]["error"])
+        self.assertEqual(results["doc1"]["pages"], 0)
+        self.assertIsNone(results["doc0"]["error"])
+        self.assertEqual(list(self.spool.iterdir()), [])
+
+    def test_inline_upload_when_disabled(self):
+        s3 = main.get_s3_client()
+        s3.upload_fileobj.side_effect = lambda f, b, k, Config: self.uploaded.__setitem__(k, 1)
+        main.run_tasks(self.tasks, run_args("s3://out/run", 1))
+        self.assertEqual(len(self.uploaded), 3)
+        s3.upload_file.assert_not_called()
+
+    def test_queue_is_bounded(self):
+        release = threading.Event()
+        running = []
+
+        def slow(path, bucket, key, Config):
+            running.append(key)
+            release.wait(5)
+
+        main.get_s3_client().upload_file.side_effect = slow
+        uploader = main.BackgroundUploader(workers=1, max_pending=2)
+        spools = []
+        for i in range(3):
+            p = self.spool / f"s{i}.parquet"
+            p.write_bytes(b"x")
+            spools.append(p)
+        uploader.submit(str(spools[0]), "s3://b/k0")
+        uploader.submit(str(spools[1]), "s3://b/k1")
+        third = threading.Thread(target=uploader.submit, args=(str(spools[2]), "s3://b/k2"))
+        third.start()
+        third.join(0.2)
+        self.assertTrue(third.is_alive())  # blocked: two uploads already pending
+        release.set()
+        third.join(5)
+        uploader.close()
+        self.assertEqual(running, ["k0", "k1", "k2"])
+        self.assertFalse(any(p.exists() for p in spools))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,236 @@
+import io
+import os
+import pickle
+import resource
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+import main
+from tests.cli_fixtures import run_args
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+_from_page = main.PageLayout.from_page
+
+
+def _stall_slow_pages(page):
+    """Stand-in for a pathological page: page 2 of any *slow* PDF takes seconds."""
+    if "slow" in page.parent.name and page.number == 1:
+        time.sleep(1.5)
+    return _from_page(page)
+
+
+def _kill_poison(page):
+    """A PDF that takes its worker down, as a MuPDF segfault or OOM kill would."""
+    if "poison" in page.parent.name:
+        os.kill(os.getpid(), signal.SIGKILL)
+    return _from_page(page)
+
+
+def _spin_poison(page):
+    """A PDF stuck in one long C call: SIGALRM never gets through, the CPU limit does."""
+    if "poison" in page.parent.name:
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+        while True:
+            pass
+    return _from_page(page)
+
+
+class TestWatchdog(unittest.TestCase):
+
+    def test_page_budget_interrupts(self):
+        handler = signal.getsignal(signal.SIGALRM)
+        t0 = time.monotonic()
+        with self.assertRaises(main.ExtractionTimeout) as ctx:
+            with main.Watchdog(doc_s=0, page_s=0.2):
+                main.watchdog_page(0)
+                main.watchdog_page(1)
+                time.sleep(2)
+        self.assertLess(time.monotonic() - t0, 1.0)
+        self.assertEqual((ctx.exception.reason, ctx.exception.page), (main.PAGE_TIMEOUT, 1))
+        self.assertEqual(str(ctx.exception), "page exceeded its 0.2s budget on page 2")
+        self.assertIs(signal.getsignal(signal.SIGALRM), handler)
+        self.assertEqual(signal.getitimer(signal.ITIMER_REAL), (0.0, 0.0))
+
+    def test_document_budget_spans_pages(self):
+        with self.assertRaises(main.ExtractionTimeout) as ctx:
+            with main.Watchdog(doc_s=0.3, page_s=1.0):
+                for i in range(10):
+                    main.watchdog_page(i)
+                    time.sleep(0.1)
+        self.assertEqual(ctx.exception.reason, main.DOC_TIMEOUT)
+        self.assertGreaterEqual(ctx.exception.page, 2)
+
+    def test_threads_check_at_page_boundaries(self):
+        caught = []
+
+        def run():
+            try:
+                with main.Watchdog(doc_s=0, page_s=0.1):
+                    main.watchdog_page(0)
+                    time.sleep(0.2)  # not interrupted off the main thread
+                    main.watchdog_page(1)
+            except main.ExtractionTimeout as e:
+                caught.append(e)
+
+        t = threading.Thread(target=run)
+        t.start()
+        t.join(5)
+        self.assertEqual([(e.reason, e.page) for e in caught], [(main.PAGE_TIMEOUT, 0)])
+
+    def test_nested_and_disabled_watchdogs_are_inert(self):
+        with main.Watchdog(doc_s=10, page_s=0) as outer:
+            with main.Watchdog(doc_s=0.01, page_s=0.01) as inner:
+                main.watchdog_page(0)
+                time.sleep(0.05)
+                main.watchdog_page(1)
+            self.assertFalse(inner.active)
+            self.assertIs(main._WATCHDOG.current, outer)
+        self.assertIsNone(main._WATCHDOG.current)
+        with main.Watchdog(doc_s=0, page_s=0):
+            self.assertIsNone(main.watchdog_remaining())
+
+    def test_timeout_pickles(self):
+        e = pickle.loads(pickle.dumps(main.ExtractionTimeout(main.DOC_TIMEOUT, 4, 60)))
+        self.assertEqual((e.reason, e.page, e.budget_s), (main.DOC_TIMEOUT, 4, 60))
+
+
+class TestTimedOutPdfs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.out = self.tmp / "out"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_slow_page_quarantines_pdf(self):
+        pdf = make_text_pdf(self.tmp / "slow.pdf", sample_pages(4))
+        t0 = time.monotonic()
+        with patch.object(main.PageLayout, "from_page", _stall_slow_pages), \
+             patch.object(main, "PAGE_TIMEOUT_S", 0.3), patch.object(main, "DOC_TIMEOUT_S", 0):
+            res = main.process_pdf_task(pdf, None, None, str(self.out), "prod", "text", None, None)
+        self.assertLess(time.monotonic() - t0, 1.2)
+        self.assertEqual((res["quarantine"], res["quarantine_page"], res["pages"]), (main.PAGE_TIMEOUT, 2, 0))
+        self.assertIn("page exceeded its 0.3s budget on page 2", res["error"])
+        self.assertFalse((self.out / "slow_text.parquet").exists())
+
+    def test_split_pdf_document_budget(self):
+        pdf = make_text_pdf(self.tmp / "slow_split.pdf", sample_pages(6))
+        with patch.object(main.PageLayout, "from_page", _stall_slow_pages), \
+             patch.object(main, "PAGE_TIMEOUT_S", 0), patch.object(main, "DOC_TIMEOUT_S", 0.4), \
+             ThreadPoolExecutor(max_workers=3) as pool:
+            t0 = time.monotonic()
+            res = main.process_pdf_task(pdf, None, None, str(self.out), "prod", "text", None, None,
+                                        executor=pool, range_pages=2)
+            waited = time.monotonic() - t0
+        self.assertLess(waited, 1.2)
+        self.assertEqual(res["quarantine"], main.DOC_TIMEOUT)
+        self.assertFalse((self.out / "slow_split_text.parquet").exists())
+
+
+class TestDeadWorkers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.pdfs = [make_text_pdf(self.tmp / f"{name}.pdf", sample_pages(2))
+                     for name in ("a", "b", "poison", "c", "d")]
+        self.tasks = [(p, None, None) for p in self.pdfs]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _run(self):
+        results = {}
+        buf = io.StringIO()
+        with redirect_stdout(buf):
+            total = main.run_tasks(self.tasks, run_args(str(self.tmp / "out"), 2),
+                                   on_result=lambda task, res: results.__setitem__(task[0].stem, res))
+        return total, results, buf.getvalue()
+
+    def _check(self, total, results, log):
+        self.assertEqual(total, (5, 8))
+        self.assertEqual(results["poison"]["quarantine"], main.WORKER_DIED)
+        self.assertIn("worker failed", results["poison"]["error"])
+        for name in "abcd":
+            self.assertIsNone(results[name]["error"], name)
+        self.assertEqual(log.count("extracting: " + str(self.pdfs[2])), 1 + main.WORKER_RETRIES)
+
+    def test_killed_worker_restarts_pool(self):
+        with patch.object(main.PageLayout, "from_page", _kill_poison):
+            self._check(*self._run())
+
+    def test_cpu_backstop_kills_stuck_worker(self):
+        with patch.object(main.PageLayout, "from_page", _spin_poison), \
+             patch.object(main, "DOC_TIMEOUT_S", 0.5), patch.object(main, "WATCHDOG_CPU_GRACE_S", 0):
+            self._check(*self._run())
+
+
+class TestQuarantineRuns(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.inp = self.tmp / "in"
+        self.inp.mkdir()
+        self.out = self.tmp / "out"
+        make_text_pdf(self.inp / "good.pdf", sample_pages(2))
+        make_text_pdf(self.inp / "slow.pdf", sample_pages(3))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _main(self, *extra, stall=False):
+        argv = ["main.py", "--input", str(self.inp), "--out", str(self.out), "--no-ocr", "--no-metrics",
+                "--page-timeout", "0.3", *extra]
+        buf = io.StringIO()
+        from_page = _stall_slow_pages if stall else _from_page
+        with patch("sys.argv", argv), redirect_stdout(buf), patch.object(main, "ALLOW_OCR", True), \
+             patch.object(main, "CHUNK_SIZE", 0), patch.object(main, "PAGE_TIMEOUT_S", main.PAGE_TIMEOUT_S), \
+             patch.object(main, "DOC_TIMEOUT_S", main.DOC_TIMEOUT_S), patch.object(main.PageLayout, "from_page", from_page):
+            main.main()
+        return buf.getvalue()
+
+    def _quarantine(self):
+        return pq.read_table(self.out / main.QUARANTINE_NAME, partitioning=None).to_pylist()
+
+    def test_quarantined_pdf_held_back_until_retried(self):
+        log = self._main(stall=True)
+        self.assertIn("[warn] quarantined", log)
+        self.assertTrue((self.out / "good_text.parquet").exists())
+        [entry] = self._quarantine()
+        self.assertEqual((Path(entry["input_key"]).name, entry["reason"], entry["page"], entry["attempts"]),
+                         ("slow.pdf", main.PAGE_TIMEOUT, 2, 1))
+
+        log = self._main(stall=True)
+        self.assertIn("skipping 1 quarantined PDFs", log)
+        self.assertIn("processed 0 PDFs", log)
+
+        log = self._main("--retry-quarantined", stall=True)
+        self.assertEqual(self._quarantine()[0]["attempts"], 2)
+
+        log = self._main("--retry-quarantined")
+        self.assertIn("processed 1 PDFs, 3 pages", log)
+        self.assertEqual(self._quarantine(), [])
+
+    def test_changed_or_superseded_inputs_not_held(self):
+        task = (self.inp / "slow.pdf", None, None)
+        key = main.input_key_for(task)
+        entry = {"etag": "e1", "size": 10, "failed_at": "2026-01-02T00:00:00Z"}
+        self.assertEqual(main.skip_quarantined([task], {key: ("e1", 10)}, {key: entry}), ([], 1))
+        self.assertEqual(main.skip_quarantined([task], {key: ("e2", 10)}, {key: entry}), ([task], 0))
+        done = {key: {"extracted_at": "2026-01-03T00:00:00Z"}}
+        self.assertEqual(main.skip_quarantined([task], {key: ("e1", 10)}, {key: entry}, done), ([task], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+import main
+from tests.pdf_fixtures import make_text_pdf, sample_pages
+
+
+class TestStreamingWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_row_groups_and_schema(self):
+        pdf = make_text_pdf(self.tmp / "doc.pdf", sample_pages(7))
+        out = self.tmp / "out" / "doc.parquet"
+        with patch.object(main, "ROW_GROUP_PAGES", 3):
+            n = main.write_parquet(main.extract_pdf_to_records(pdf, "prod", "text", "GA", "Fulton"), str(out))
+        self.assertEqual(n, 7)
+        meta = pq.ParquetFile(out).metadata
+        self.assertEqual([meta.row_group(i).num_rows for i in range(meta.num_row_groups)], [3, 3, 1])
+        table = pq.read_table(out)
+        self.assertEqual(table.schema, main.RECORD_SCHEMA)
+        self.assertEqual(table.column("page").to_pylist(), list(range(1, 8)))
+        self.assertEqual(table.column("county").to_pylist(), ["Fulton"] * 7)
+        self.assertFalse(Path(str(out) + ".tmp").exists())
+
+    def test_empty_writes_nothing(self):
+        out = self.tmp / "empty.parquet"
+        self.assertEqual(main.write_parquet(iter([]), str(out)), 0)
+        self.assertFalse(out.exists())
+
+    def test_failed_stream_leaves_no_file(self):
+        def records():
+            yield {"doc_id": "d", "page": 1, "text": "ok"}
+            raise RuntimeError("extraction failed")
+
+        out = self.tmp / "partial.parquet"
+        with self.assertRaises(RuntimeError):
+            main.write_parquet(records(), str(out))
+        self.assertEqual(list(self.tmp.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()